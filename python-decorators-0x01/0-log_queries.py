@@ -1,15 +1,37 @@
 import sqlite3
 import functools
-import sys
+import time
+
+from query_profiler import count_rows, profiler, start_logging
+
+start_logging()
 
 #### decorator to lof SQL queries
 def log_queries(func):
+    """Logs each query with its wall time and row count, profiling it per statement.
+
+    Records go through a queue to a background logging thread; slow
+    queries are logged with their EXPLAIN QUERY PLAN and failed ones with
+    their error (see query_profiler).
+    """
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        query = kwargs.get('query') or args[0] if args else None
-        if query:
-            print(f"Executing query: {query}", file=sys.stderr)
-        return func(*args, **kwargs)
+        query = kwargs.get('query') or next((arg for arg in args if isinstance(arg, str)), None)
+        if not query:
+            return func(*args, **kwargs)
+        conn = next((arg for arg in args if isinstance(arg, sqlite3.Connection)), None)
+        result = error = None
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+            return result
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            profiler.record(query, elapsed, count_rows(result), conn, kwargs.get('params', ()),
+                            error)
     return wrapper
 
 @log_queries
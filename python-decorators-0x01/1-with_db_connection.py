@@ -1,17 +1,34 @@
 import sqlite3
 import functools
 
-def with_db_connection(func):
-    """A decorator that automatically handles opening and closing database connections."""
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = sqlite3.connect('users.db')
-        try:
-            result = func(conn, *args, **kwargs)
-        finally:
-            conn.close()
-        return result
-    return wrapper
+from db_pool import database_path, get_pool
+
+def with_db_connection(func=None, *, pooled=True, path=None):
+    """A decorator that automatically handles opening and closing database connections.
+
+    By default the connection is this thread's long-lived, tuned connection
+    from db_pool (WAL, synchronous=NORMAL, page cache, mmap, statement
+    cache). pooled=False opens and closes a plain connection around every
+    call instead. `path` defaults to db_pool's configured path (users.db).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if pooled:
+                pool = get_pool(path)
+                conn = pool.acquire()
+                try:
+                    return func(conn, *args, **kwargs)
+                finally:
+                    pool.release(conn)
+            conn = sqlite3.connect(path or database_path())
+            try:
+                result = func(conn, *args, **kwargs)
+            finally:
+                conn.close()
+            return result
+        return wrapper
+    return decorator(func) if func is not None else decorator
 
 @with_db_connection
 def get_user_by_id(conn, user_id):
@@ -20,5 +37,7 @@ def get_user_by_id(conn, user_id):
     return cursor.fetchone()
 
 #### Fetch user by ID with automatic connection handling
-user = get_user_by_id(user_id=1)
-print(user)
+# Guarded so that benchmark.py can import the decorator without touching users.db.
+if __name__ == "__main__":
+    user = get_user_by_id(user_id=1)
+    print(user)
@@ -1,6 +1,8 @@
 import sqlite3
 import functools
 
+from transactions import get_committer, in_transaction_scope, transaction
+
 def with_db_connection(func):
     """A decorator that automatically handles opening and closing database connections."""
     @functools.wraps(func)
@@ -13,18 +15,33 @@ def with_db_connection(func):
         return result
     return wrapper
 
-def transactional(func):
-    """A decorator that manages database transactions (commit/rollback)."""
-    @functools.wraps(func)
-    def wrapper(conn, *args, **kwargs):
-        try:
-            result = func(conn, *args, **kwargs)
-            conn.commit()
-            return result
-        except Exception as e:
-            conn.rollback()
-            raise e
-    return wrapper
+def transactional(func=None, *, writes=None, group_commit=False):
+    """A decorator that manages database transactions (commit/rollback).
+
+    A transactional function called from inside another one on the same
+    connection runs in a SAVEPOINT: its failure rolls back only its own
+    work, and nothing is committed until the outermost function returns.
+    After a commit, cached query results that read the tables the function
+    wrote are invalidated. The tables are taken from `writes` when given,
+    otherwise from the statements run on the connection (seen through its
+    trace callback).
+
+    With group_commit=True (or a transactions.GroupCommitter), outermost
+    calls are handed to a committer thread that commits the work of many
+    concurrent callers at once; the function then runs on the committer's
+    connection, not the one it was called with. Each call still returns its
+    own result or raises its own error, and only after the commit.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(conn, *args, **kwargs):
+            if group_commit and not in_transaction_scope(conn):
+                committer = get_committer() if group_commit is True else group_commit
+                return committer.submit(func, args, kwargs, writes).result()
+            with transaction(conn, writes):
+                return func(conn, *args, **kwargs)
+        return wrapper
+    return decorator(func) if func is not None else decorator
 
 @with_db_connection
 def get_user_by_id(conn, user_id):
@@ -3,6 +3,9 @@ import sqlite3
 import functools
 import sys
 
+from retry_policy import (CircuitOpenError, backoff_delay, is_transient, shared_breaker,
+                          shared_budget)
+
 def with_db_connection(func):
     """A decorator that automatically handles opening and closing database connections."""
     @functools.wraps(func)
@@ -15,24 +18,62 @@ def with_db_connection(func):
         return result
     return wrapper
 
-def retry_on_failure(retries=3, delay=1):
-    """A decorator that retries a function a certain number of times if it raises an exception."""
+def retry_on_failure(retries=3, delay=1, *, max_delay=30, deadline=None, transient=is_transient,
+                     budget=shared_budget, breaker=shared_breaker):
+    """A decorator that retries a function on transient database errors.
+
+    Up to `retries` attempts are made, with full-jitter exponential backoff
+    starting at `delay` seconds and capped at `max_delay`. Errors that
+    `transient` does not accept are raised at once, and no retry is started
+    that would sleep past `deadline` seconds from the first attempt.
+    Retries draw on a RetryBudget and calls go through a CircuitBreaker,
+    both shared process-wide by default, so a failing database is not
+    hammered; pass budget=None or breaker=None to opt out.
+    """
     def decorator(func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
+            start = time.monotonic()
+            last_error = None
             for i in range(retries):
+                if breaker is not None and not breaker.allow():
+                    raise CircuitOpenError(
+                        f"{func.__name__}: database circuit open, not calling") from last_error
                 try:
-                    return func(*args, **kwargs)
+                    result = func(*args, **kwargs)
                 except Exception as e:
+                    if not transient(e):
+                        if breaker is not None:
+                            breaker.succeeded()  # the database answered
+                        raise
+                    if breaker is not None:
+                        breaker.failed()
+                    last_error = e
                     print(f"Attempt {i + 1}/{retries} failed: {e}", file=sys.stderr)
-                    if i < retries - 1:
-                        time.sleep(delay)
-            raise # Re-raise the last exception if all retries fail
+                    pause = backoff_delay(i, delay, max_delay)
+                    if i == retries - 1:
+                        raise
+                    if deadline is not None and time.monotonic() + pause - start > deadline:
+                        raise
+                    if budget is not None and not budget.spend():
+                        raise
+                    time.sleep(pause)
+                except BaseException:
+                    # Interrupted (e.g. KeyboardInterrupt): no outcome, but free a half-open trial.
+                    if breaker is not None:
+                        breaker.abandon()
+                    raise
+                else:
+                    if breaker is not None:
+                        breaker.succeeded()
+                    if budget is not None:
+                        budget.earn()
+                    return result
         return wrapper
     return decorator
 
 @with_db_connection
-@retry_on_failure(retries=3, delay=1)
+@retry_on_failure(retries=3, delay=1, deadline=10)
 def fetch_users_with_retry(conn):
     cursor = conn.cursor()
     # Simulate a transient error on the first two attempts
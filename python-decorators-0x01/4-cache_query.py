@@ -2,7 +2,10 @@ import time
 import sqlite3
 import functools
 
-query_cache = {}
+from result_cache import ResultCache, cache_key, read_tables
+
+# Bounded: at most 256 results / 16 MiB, each kept for 5 minutes.
+query_cache = ResultCache(max_entries=256, max_bytes=16 * 1024 * 1024, ttl=300)
 
 def with_db_connection(func):
     """A decorator that automatically handles opening and closing database connections."""
@@ -16,19 +19,26 @@ def with_db_connection(func):
         return result
     return wrapper
 
-def cache_query(func):
-    """A decorator that caches query results based on the SQL query string."""
-    @functools.wraps(func)
-    def wrapper(conn, query):
-        if query in query_cache:
-            print("Fetching from cache")
-            return query_cache[query]
-        else:
-            print("Fetching from database")
-            result = func(conn, query)
-            query_cache[query] = result
+def cache_query(func=None, *, tables=None, cache=None):
+    """A decorator that caches query results based on the normalized SQL and its parameters.
+
+    Each result is tagged with the tables its SQL reads (or the explicit
+    `tables`), so a @transactional commit that writes one of them drops it.
+    Results go to `query_cache` unless another store is passed as `cache`,
+    e.g. a shared_result_cache.SQLiteResultCache shared by worker processes.
+    """
+    def decorator(func):
+        store = cache if cache is not None else query_cache
+
+        @functools.wraps(func)
+        def wrapper(conn, query, *params):
+            key = cache_key(query, params)
+            hit, result = store.fetch(key, lambda: func(conn, query, *params),
+                                            tables=tables or read_tables(query))
+            print("Fetching from cache" if hit else "Fetching from database")
             return result
-    return wrapper
+        return wrapper
+    return decorator(func) if func is not None else decorator
 
 @with_db_connection
 @cache_query
@@ -46,3 +56,5 @@ print(users)
 print("\nSecond call:")
 users_again = fetch_users_with_cache(query="SELECT * FROM users")
 print(users_again)
+
+print(f"\nCache stats: {query_cache.stats()}")
@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+"""Calls/sec of get_user_by_id with a connection per call vs the tuned per-thread pool.
+
+    python3 benchmark.py --users 10000 --calls 20000 --threads 1 --threads 4
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+import db_pool
+with_db_connection = __import__("1-with_db_connection").with_db_connection
+
+
+def prepare_database(path, users):
+    """Creates a users table with `users` rows at `path`."""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL UNIQUE
+        )
+    """)
+    conn.executemany(
+        "INSERT OR IGNORE INTO users (id, name, email) VALUES (?, ?, ?)",
+        ((i, f"User {i}", f"user{i}@example.com") for i in range(1, users + 1)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_user_by_id(conn, user_id):
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+    return cursor.fetchone()
+
+
+def measure(func, users, calls, threads):
+    """Runs `calls` lookups of random ids split over `threads` threads; returns calls/sec."""
+    per_thread = calls // threads
+
+    def worker(seed):
+        rng = random.Random(seed)
+        for _ in range(per_thread):
+            func(user_id=rng.randint(1, users))
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--threads", type=int, action="append",
+                        help="thread counts to run (default: 1 and 4)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "users.db")
+        prepare_database(path, args.users)
+        db_pool.configure_pool(path=path)
+        variants = [
+            ("connect per call", with_db_connection(pooled=False)(get_user_by_id)),
+            ("pooled + tuned", with_db_connection(get_user_by_id)),
+        ]
+        print(f"{'mode':<20} {'threads':>8} {'calls/sec':>12}")
+        for threads in args.threads or (1, 4):
+            for label, func in variants:
+                rate = measure(func, args.users, args.calls, threads)
+                print(f"{label:<20} {threads:>8} {rate:>12,.0f}")
+        db_pool.get_pool().close()
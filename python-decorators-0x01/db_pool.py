@@ -0,0 +1,169 @@
+import os
+import sqlite3
+import threading
+import weakref
+
+DEFAULT_SETTINGS = {
+    "path": "users.db",
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size_kib": 16 * 1024,
+    "mmap_size": 256 * 1024 * 1024,
+    "cached_statements": 512,
+    "busy_timeout_ms": 5000,
+}
+
+
+def open_connection(settings):
+    """Opens a connection to settings["path"] and applies the tuning pragmas once."""
+    conn = sqlite3.connect(
+        settings["path"],
+        timeout=settings["busy_timeout_ms"] / 1000,
+        cached_statements=settings["cached_statements"],
+        check_same_thread=False,
+    )
+    conn.execute(f"PRAGMA journal_mode={settings['journal_mode']}")
+    conn.execute(f"PRAGMA synchronous={settings['synchronous']}")
+    # A negative cache_size is in KiB rather than pages.
+    conn.execute(f"PRAGMA cache_size=-{int(settings['cache_size_kib'])}")
+    conn.execute(f"PRAGMA mmap_size={int(settings['mmap_size'])}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+class _Slot:
+    """One thread's connection, its nesting depth and the pool generation it belongs to."""
+
+    __slots__ = ("conn", "depth", "generation", "lock", "__weakref__")
+
+    def __init__(self, conn, generation):
+        self.conn = conn
+        self.depth = 0
+        self.generation = generation
+        self.lock = threading.Lock()
+
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except sqlite3.ProgrammingError:
+        pass
+
+
+class ConnectionPool:
+    """Hands each thread its own long-lived, tuned SQLite connection.
+
+    Connections are opened on a thread's first acquire() and reused for
+    every later call on that thread, so the connect/pragma cost and the
+    prepared statement cache survive between calls. Nested acquires on one
+    thread share the connection; when the outermost user releases it, any
+    transaction it left open is rolled back. A thread's connection is
+    closed when the thread finishes. Connections are never reused across a
+    fork.
+    """
+
+    def __init__(self, **settings):
+        unknown = set(settings) - set(DEFAULT_SETTINGS)
+        if unknown:
+            raise TypeError(f"Unknown connection settings: {', '.join(sorted(unknown))}")
+        self.settings = {**DEFAULT_SETTINGS, **settings}
+        self.opened = 0
+        self._local = threading.local()
+        self._slots = weakref.WeakSet()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def acquire(self):
+        if self._pid != os.getpid():
+            # Forked child: the parent's connections are unusable here.
+            self._local = threading.local()
+            self._slots = weakref.WeakSet()
+            self._pid = os.getpid()
+        slot = getattr(self._local, "slot", None)
+        if slot is not None and slot.depth:
+            slot.depth += 1
+            return slot.conn
+        if slot is not None:
+            with slot.lock:
+                if slot.conn is not None and slot.generation == self._generation:
+                    slot.depth = 1
+                    return slot.conn
+                if slot.conn is not None:
+                    _close_quietly(slot.conn)
+                    slot.conn = None
+        conn = open_connection(self.settings)
+        slot = _Slot(conn, self._generation)
+        slot.depth = 1
+        # The thread-local holds the only strong reference to the slot, so the
+        # connection is closed once the thread has finished.
+        weakref.finalize(slot, _close_quietly, conn)
+        self._local.slot = slot
+        with self._lock:
+            self._slots.add(slot)
+            self.opened += 1
+        return conn
+
+    def release(self, conn):
+        slot = getattr(self._local, "slot", None)
+        if slot is None or slot.conn is not conn or slot.depth <= 0:
+            return
+        if slot.depth > 1:
+            slot.depth -= 1
+            return
+        with slot.lock:
+            slot.depth = 0
+            if conn.in_transaction:
+                conn.rollback()
+            if slot.generation != self._generation:
+                # The pool was closed while this thread was using the connection.
+                _close_quietly(conn)
+                slot.conn = None
+
+    def close(self):
+        """Closes idle connections now and busy ones when their thread releases them.
+
+        Threads open a fresh connection on their next acquire().
+        """
+        with self._lock:
+            self._generation += 1
+            slots = list(self._slots)
+        for slot in slots:
+            with slot.lock:
+                if slot.depth == 0 and slot.conn is not None:
+                    _close_quietly(slot.conn)
+                    slot.conn = None
+
+
+_settings = {}
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def configure_pool(**settings):
+    """Sets the settings for pools created from now on, e.g. configure_pool(path="/data/users.db").
+
+    Connections of existing pools are closed.
+    """
+    global _settings
+    ConnectionPool(**settings)  # validates the names
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+        _settings = dict(settings)
+
+
+def database_path():
+    """The database path set with configure_pool(), or users.db."""
+    return _settings.get("path", DEFAULT_SETTINGS["path"])
+
+
+def get_pool(path=None):
+    """Returns the process-wide pool for `path` (default: the configured path)."""
+    path = path or database_path()
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = _pools[path] = ConnectionPool(**{**_settings, "path": path})
+        return pool
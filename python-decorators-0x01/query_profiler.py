@@ -0,0 +1,181 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import re
+import sqlite3
+import sys
+import threading
+
+from db_pool import get_pool
+from result_cache import normalize_sql
+
+# Literals replaced by ? so that statements differing only in values are grouped.
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+# Latency buckets are powers of two in microseconds: bucket i holds [2**(i-1), 2**i) us.
+BUCKETS = 32
+
+logger = logging.getLogger("queries")
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def statement_shape(query):
+    """Normalizes a query and replaces its literals with ?, e.g. "... WHERE id = ?"."""
+    return _LITERALS.sub("?", normalize_sql(query))
+
+
+def start_logging(handler=None):
+    """Sends the "queries" logger through a QueueHandler so callers never block on I/O.
+
+    A QueueListener thread writes the records to `handler` (stderr by
+    default). Safe to call more than once; stopped at interpreter exit.
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return _listener
+        records = queue.SimpleQueue()
+        handler = handler or logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(logging.handlers.QueueHandler(records))
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        _listener = logging.handlers.QueueListener(records, handler)
+        _listener.start()
+        atexit.register(stop_logging)
+        return _listener
+
+
+def stop_logging():
+    """Flushes queued records and stops the listener thread."""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+class StatementStats:
+    """Call count, rows and a log2 latency histogram for one statement shape."""
+
+    def __init__(self, shape):
+        self.shape = shape
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = [0] * BUCKETS
+        self.plan = None
+
+    def add(self, elapsed, rows, failed=False):
+        self.calls += 1
+        self.errors += failed
+        self.rows += rows
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.histogram[min(int(elapsed * 1e6).bit_length(), BUCKETS - 1)] += 1
+
+    def percentile(self, q):
+        """Upper bound in seconds of the histogram bucket holding the q-quantile, capped at max."""
+        target = q * self.calls
+        seen = 0
+        for index, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= target:
+                return min((1 << index) / 1e6, self.max)
+        return 0.0
+
+
+class QueryProfiler:
+    """Records wall time and rows per query, aggregated by statement shape.
+
+    Queries slower than `slow_ms` are logged at WARNING with their
+    EXPLAIN QUERY PLAN, captured once per shape on the query's own
+    connection or, when that is unknown, on a db_pool connection. Other
+    queries are logged at INFO for the first `sample_first` calls of a
+    shape and then once every `sample_every` calls, so hot statements
+    cannot flood the log. Queries that raised are always logged, at ERROR.
+    """
+
+    def __init__(self, slow_ms=100, sample_first=10, sample_every=100, explain=True):
+        self.slow = slow_ms / 1000
+        self.sample_first = sample_first
+        self.sample_every = sample_every
+        self.explain = explain
+        self._statements = {}
+        self._lock = threading.Lock()
+
+    def record(self, query, elapsed, rows, conn=None, params=(), error=None):
+        """Records one execution; `error` is the exception it raised, if any."""
+        shape = statement_shape(query)
+        slow = elapsed >= self.slow
+        with self._lock:
+            stats = self._statements.get(shape)
+            if stats is None:
+                stats = self._statements[shape] = StatementStats(shape)
+            stats.add(elapsed, rows, error is not None)
+            calls = stats.calls
+            needs_plan = slow and self.explain and stats.plan is None and error is None
+        if error is not None:
+            logger.error("Query failed (%.2f ms, call %d): %s (%s: %s)", elapsed * 1000, calls,
+                         query, type(error).__name__, error)
+            return
+        if needs_plan:
+            if conn is not None:
+                stats.plan = explain_query_plan(conn, query, params)
+            else:
+                pool = get_pool()
+                pooled = pool.acquire()
+                try:
+                    stats.plan = explain_query_plan(pooled, query, params)
+                finally:
+                    pool.release(pooled)
+        if slow:
+            plan = "\n".join(f"  {line}" for line in stats.plan or ())
+            logger.warning("Slow query (%.1f ms, %d rows): %s%s", elapsed * 1000, rows, query,
+                           f"\n{plan}" if plan else "")
+        elif calls <= self.sample_first or calls % self.sample_every == 0:
+            logger.info("Executing query (%.2f ms, %d rows, call %d): %s",
+                        elapsed * 1000, rows, calls, query)
+
+    def stats(self):
+        """Returns {shape: StatementStats}, a snapshot copy of the per-statement stats."""
+        with self._lock:
+            return dict(self._statements)
+
+    def report(self, file=None):
+        """Prints calls, rows and latency percentiles per statement shape, slowest total first."""
+        file = file or sys.stdout
+        print(f"{'calls':>8} {'errors':>7} {'rows':>10} {'avg ms':>9} {'p50 ms':>9} {'p95 ms':>9} "
+              f"{'max ms':>9}  statement", file=file)
+        for stats in sorted(self.stats().values(), key=lambda s: s.total, reverse=True):
+            print(f"{stats.calls:>8} {stats.errors:>7} {stats.rows:>10} {stats.total / stats.calls * 1000:>9.2f} "
+                  f"{stats.percentile(0.5) * 1000:>9.2f} {stats.percentile(0.95) * 1000:>9.2f} "
+                  f"{stats.max * 1000:>9.2f}  {stats.shape}", file=file)
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+
+
+def explain_query_plan(conn, query, params=()):
+    """Returns the EXPLAIN QUERY PLAN detail lines for query, or the error that prevented it."""
+    try:
+        return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params)]
+    except sqlite3.Error as err:
+        return [f"(no plan: {err})"]
+
+
+def count_rows(result):
+    """Rows in a query result: its length for a list of rows, 0 for None, else 1 (a single row)."""
+    if isinstance(result, list):
+        return len(result)
+    if result is None:
+        return 0
+    return 1
+
+
+profiler = QueryProfiler()
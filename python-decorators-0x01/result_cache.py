@@ -0,0 +1,272 @@
+import re
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+# String literals, quoted identifiers, or runs of whitespace.
+_SQL_TOKENS = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\s+")
+_STRING_LITERALS = re.compile(r"'(?:[^']|'')*'")
+_NAME = r"[\"`\[]?([A-Za-z_][\w$]*)[\"`\]]?(?:\s*\.\s*[\"`\[]?([A-Za-z_][\w$]*)[\"`\]]?)?"
+_READ_TABLES = re.compile(r"\b(?:FROM|JOIN)\s+" + _NAME + r"((?:\s*,\s*" + _NAME + r")*)", re.I)
+_LISTED_TABLE = re.compile(r",\s*" + _NAME)
+_WRITE_TABLES = re.compile(
+    r"\b(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?"
+    r"|DELETE\s+FROM|DROP\s+TABLE(?:\s+IF\s+EXISTS)?|ALTER\s+TABLE"
+    r"|CREATE\s+(?:TEMP\w*\s+)?TABLE(?:\s+IF\s+NOT\s+EXISTS)?)\s+" + _NAME, re.I)
+
+# Tag for results whose tables could not be determined; any write invalidates them.
+ALL_TABLES = "*"
+
+_caches = weakref.WeakSet()
+
+
+def normalize_sql(query):
+    """Collapses whitespace outside quoted literals and drops a trailing semicolon."""
+    def replace(match):
+        text = match.group(0)
+        return " " if text.isspace() else text
+    return _SQL_TOKENS.sub(replace, query).strip().rstrip(";").rstrip()
+
+
+def _table_name(match, first=1):
+    schema, table = match.group(first), match.group(first + 1)
+    return (table or schema).lower()
+
+
+def read_tables(query):
+    """Returns the set of tables a statement reads, or {ALL_TABLES} when none can be found.
+
+    A lightweight scan of FROM/JOIN clauses (including comma-separated
+    lists and subqueries); CTE names may be included, which only makes
+    invalidation more eager.
+    """
+    query = _STRING_LITERALS.sub("''", query)
+    tables = set()
+    for match in _READ_TABLES.finditer(query):
+        tables.add(_table_name(match))
+        for listed in _LISTED_TABLE.finditer(match.group(3) or ""):
+            tables.add(_table_name(listed))
+    return tables or {ALL_TABLES}
+
+
+def written_tables(query):
+    """Returns the set of tables an INSERT/REPLACE/UPDATE/DELETE or table DDL statement writes."""
+    query = _STRING_LITERALS.sub("''", query)
+    return {_table_name(match) for match in _WRITE_TABLES.finditer(query)}
+
+
+def register_cache(cache):
+    """Makes invalidate_tables() reach `cache`; ResultCache instances register themselves."""
+    _caches.add(cache)
+
+
+def invalidate_tables(tables):
+    """Drops results that read any of `tables` from every ResultCache in this process."""
+    for cache in list(_caches):
+        cache.invalidate(tables)
+
+
+def check_ttl(ttl):
+    """Returns ttl if it is None (never expire) or a positive number of seconds."""
+    if ttl is not None and ttl <= 0:
+        raise ValueError(f"ttl must be positive seconds, or None for no expiry; got {ttl!r}")
+    return ttl
+
+
+def cache_key(query, params=()):
+    """Builds a hashable key from the normalized SQL and its bound parameters."""
+    if isinstance(params, dict):
+        params = tuple(sorted(params.items()))
+    return normalize_sql(query), tuple(params)
+
+
+def estimate_size(value):
+    """Approximate memory footprint of a query result (a list of row tuples) in bytes."""
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        for item in value:
+            if isinstance(item, (list, tuple)):
+                size += sys.getsizeof(item) + sum(sys.getsizeof(field) for field in item)
+            else:
+                size += sys.getsizeof(item)
+    return size
+
+
+class ResultCache:
+    """A thread-safe LRU cache of query results bounded by entries, bytes and age.
+
+    Entries older than `ttl` seconds are treated as missing; ttl=None keeps
+    them until they are evicted or invalidated. When either
+    `max_entries` or `max_bytes` would be exceeded, least recently used
+    entries are evicted; a single result larger than `max_bytes` is not
+    cached at all. Entries can be tagged with the tables they read, and
+    invalidate(tables) drops just the entries that depend on them.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=300,
+                 clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = check_ttl(ttl)
+        self.clock = clock
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._tags = {}  # key -> tables the entry was read from
+        self._by_table = {}  # table -> keys of entries that read it
+        self._versions = {}  # table -> number of times it has been invalidated
+        self._lock = threading.Lock()
+        self._loading = {}  # key -> lock held while one thread loads that key
+        register_cache(self)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+        for table in self._tags.pop(key, ()):
+            keys = self._by_table[table]
+            keys.discard(key)
+            if not keys:
+                del self._by_table[table]
+
+    def _version(self, tables):
+        tables = {table.lower() for table in tables or ()}
+        return tuple(self._versions.get(table, 0) for table in sorted(tables))
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        value, _, expires_at = entry
+        if expires_at is not None and self.clock() >= expires_at:
+            self._remove(key)
+            self.expirations += 1
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def lookup(self, key, count_miss=True):
+        """Returns (hit, value), counting the hit (and the miss, if count_miss)."""
+        with self._lock:
+            hit, value = self._lookup(key)
+            if hit:
+                self.hits += 1
+            elif count_miss:
+                self.misses += 1
+            return hit, value
+
+    def version(self, tables):
+        """Snapshot of the invalidation counters of `tables`, for set(version=...)."""
+        with self._lock:
+            return self._version(tables)
+
+    def get(self, key, default=None):
+        hit, value = self.lookup(key)
+        return value if hit else default
+
+    def set(self, key, value, ttl=None, tables=None, version=None):
+        """Stores value under key, tagged with the tables it was read from.
+
+        `ttl` overrides the cache's ttl for this entry (None keeps the default).
+
+        `version` is what version(tables) returned before the value was
+        loaded; if those tables were invalidated since, the value may be
+        stale and is not stored.
+        """
+        size = estimate_size(value)
+        ttl = self.ttl if ttl is None else check_ttl(ttl)
+        tables = frozenset(table.lower() for table in tables or ())
+        with self._lock:
+            if version is not None and version != self._version(tables):
+                return False
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return False
+            while self._entries and (len(self._entries) >= self.max_entries
+                                     or self.bytes + size > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            expires_at = self.clock() + ttl if ttl is not None else None
+            self._entries[key] = (value, size, expires_at)
+            self.bytes += size
+            if tables:
+                self._tags[key] = tables
+                for table in tables:
+                    self._by_table.setdefault(table, set()).add(key)
+            return True
+
+    def fetch(self, key, load, tables=None):
+        """Returns (hit, value), calling load() on a miss and caching its result.
+
+        Concurrent misses on the same key wait for the first caller's load
+        instead of all running the query. A result whose tables are
+        invalidated while it loads is returned but not cached.
+        """
+        hit, value = self.lookup(key, count_miss=False)
+        if hit:
+            return True, value
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            hit, value = self.lookup(key)
+            if hit:
+                return True, value
+            version = self.version(tables)
+            try:
+                value = load()
+                self.set(key, value, tables=tables, version=version)
+            finally:
+                with self._lock:
+                    if self._loading.get(key) is key_lock:
+                        del self._loading[key]
+            return False, value
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                return True
+            return False
+
+    def invalidate(self, tables):
+        """Drops entries that read any of `tables` (and untagged-table entries); returns the count."""
+        tables = {table.lower() for table in tables}
+        with self._lock:
+            keys = set(self._by_table.get(ALL_TABLES, ()))
+            for table in tables | {ALL_TABLES}:
+                self._versions[table] = self._versions.get(table, 0) + 1
+                keys.update(self._by_table.get(table, ()))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._by_table.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,124 @@
+import random
+import sqlite3
+import threading
+import time
+
+# sqlite3 result codes for a database another connection holds locked.
+SQLITE_BUSY = 5
+SQLITE_LOCKED = 6
+_TRANSIENT_MESSAGES = ("locked", "busy")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the database while the circuit breaker is open."""
+
+
+def is_transient(error):
+    """True for errors worth retrying: SQLITE_BUSY/SQLITE_LOCKED OperationalErrors.
+
+    Programming errors, constraint violations and other failures that
+    would fail the same way again are not transient.
+    """
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None and code & 0xFF in (SQLITE_BUSY, SQLITE_LOCKED):
+        return True
+    message = str(error).lower()
+    return any(word in message for word in _TRANSIENT_MESSAGES)
+
+
+def backoff_delay(attempt, base, cap, rng=random.random):
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt))."""
+    return rng() * min(cap, base * 2 ** attempt)
+
+
+class RetryBudget:
+    """A token bucket limiting retries across every call that shares it.
+
+    Each retry spends a token and each successful call earns back `ratio`
+    tokens. Once half the tokens are spent, failures are raised without
+    retrying until successes refill the bucket, so a database that keeps
+    failing sees at most about `ratio` retries per call instead of
+    `retries` times the load.
+    """
+
+    def __init__(self, max_tokens=100, ratio=0.1):
+        self.max_tokens = max_tokens
+        self.ratio = ratio
+        self.tokens = float(max_tokens)
+        self._lock = threading.Lock()
+
+    def spend(self):
+        """Takes a token for one retry; False when the budget is exhausted."""
+        with self._lock:
+            if self.tokens - 1 < self.max_tokens / 2:
+                return False
+            self.tokens -= 1
+            return True
+
+    def earn(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+
+class CircuitBreaker:
+    """Stops calls for `reset_timeout` seconds after `failure_threshold` transient failures in a row.
+
+    When the timeout has passed a single trial call is let through
+    (half-open): its success closes the circuit, its failure opens it
+    again, and if it is abandoned (interrupted) the next call becomes the
+    trial.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=10.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._trial or self.clock() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self):
+        """True if a call may go ahead now."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if not self._trial and self.clock() - self._opened_at >= self.reset_timeout:
+                self._trial = True
+                return True
+            return False
+
+    def succeeded(self):
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def abandon(self):
+        """Ends a call that finished without an outcome, letting a new trial through."""
+        with self._lock:
+            self._trial = False
+
+    def failed(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self._opened_at = self.clock()
+                self._trial = False
+
+
+# Shared by every retry_on_failure that is not given its own, so all callers
+# of users.db back off together.
+shared_budget = RetryBudget()
+shared_breaker = CircuitBreaker()
@@ -0,0 +1,265 @@
+import hashlib
+import marshal
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+
+from result_cache import ALL_TABLES, ResultCache, check_ttl
+
+# Encoded results larger than this are zlib-compressed when that makes them smaller.
+COMPRESS_ABOVE = 1024
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS entries (
+        key BLOB PRIMARY KEY,
+        value BLOB NOT NULL,
+        size INTEGER NOT NULL,
+        expires_at REAL
+    );
+    CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at);
+    CREATE TABLE IF NOT EXISTS entry_tables (
+        table_name TEXT NOT NULL,
+        key BLOB NOT NULL,
+        PRIMARY KEY (table_name, key)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS entry_tables_key ON entry_tables (key);
+    CREATE TABLE IF NOT EXISTS versions (
+        table_name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS totals (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        entries INTEGER NOT NULL,
+        bytes INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO totals VALUES (0, 0, 0);
+    CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+        UPDATE totals SET entries = entries + 1, bytes = bytes + NEW.size;
+    END;
+    CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+        UPDATE totals SET entries = entries - 1, bytes = bytes - OLD.size;
+        DELETE FROM entry_tables WHERE key = OLD.key;
+    END;
+"""
+
+
+def encode(value):
+    """Serializes a query result compactly: marshal for plain row tuples, pickle otherwise."""
+    try:
+        data = b"m" + marshal.dumps(value)
+    except ValueError:
+        data = b"p" + pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    if len(data) > COMPRESS_ABOVE:
+        compressed = zlib.compress(data, 1)
+        if len(compressed) < len(data):
+            return b"z" + compressed
+    return data
+
+
+def decode(data):
+    data = bytes(data)
+    if data[:1] == b"z":
+        data = zlib.decompress(data[1:])
+    if data[:1] == b"m":
+        return marshal.loads(data[1:])
+    return pickle.loads(data[1:])
+
+
+def encode_key(key):
+    """A fixed 16-byte digest of a cache key (normalized SQL and params)."""
+    return hashlib.blake2b(pickle.dumps(key, 4), digest_size=16).digest()
+
+
+def _create_private(path):
+    """Creates the cache file with mode 0600, refusing an existing one others can write."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        mode = os.fstat(fd).st_mode
+    finally:
+        os.close(fd)
+    if os.name == "posix" and mode & 0o022:
+        raise PermissionError(
+            f"{path} is writable by group or others; cached values are unpickled from it")
+
+
+class SQLiteResultCache(ResultCache):
+    """A ResultCache kept in an SQLite file, shared by every process on the host.
+
+    The file runs in WAL mode, so a lookup that hits or misses reads
+    without blocking other lookups or a writer. A lookup that finds an
+    expired entry deletes it and so takes the write lock, as stores and
+    invalidations do. Hits do not record their access (that would make every
+    hit a write), so eviction deletes entries in rowid order, i.e. the least
+    recently stored first, not the least recently used. Results are serialized with marshal (pickle for types marshal
+    cannot handle) and zlib-compressed when large. Hit/miss counters are
+    per process; entry and byte totals are shared. Concurrent misses are
+    collapsed within a process, not across processes. A @transactional
+    commit drops shared entries only if the committing process has a
+    SQLiteResultCache open on the file (invalidate_tables reaches the
+    caches of its own process).
+
+    Values are unpickled, so anyone who can write to the file can run code
+    in every process that reads it. The file is created readable and
+    writable by its owner only (0600), and a file that group or others can
+    write is refused; keep it in a directory only the service user controls.
+    """
+
+    def __init__(self, path, max_entries=10000, max_bytes=256 * 1024 * 1024, ttl=300,
+                 clock=time.time):
+        super().__init__(max_entries, max_bytes, ttl, clock)
+        self.path = path
+        _create_private(path)
+        self._local = threading.local()
+        connection = self._connection()
+        connection.executescript(SCHEMA)
+
+    def _connection(self):
+        # sqlite3 connections must not cross a fork, so they are per thread and per pid.
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def __len__(self):
+        return self._connection().execute("SELECT entries FROM totals").fetchone()[0]
+
+    def lookup(self, key, count_miss=True):
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM entries WHERE key = ?", (encode_key(key),)
+        ).fetchone()
+        now = self.clock()
+        if row is not None and (row[1] is None or now < row[1]):
+            with self._lock:
+                self.hits += 1
+            return True, decode(row[0])
+        if row is not None:
+            # Expired: drop it now rather than waiting for the next set() to sweep it.
+            self._connection().execute(
+                "DELETE FROM entries WHERE key = ? AND expires_at <= ?", (encode_key(key), now)
+            )
+        with self._lock:
+            if row is not None:
+                self.expirations += 1
+            if count_miss:
+                self.misses += 1
+            return False, None
+
+    def _version(self, tables, connection=None):
+        tables = sorted({table.lower() for table in tables or ()})
+        if not tables:
+            return ()
+        connection = connection or self._connection()
+        placeholders = ", ".join("?" * len(tables))
+        versions = dict(connection.execute(
+            f"SELECT table_name, version FROM versions WHERE table_name IN ({placeholders})",
+            tables,
+        ))
+        return tuple(versions.get(table, 0) for table in tables)
+
+    def version(self, tables):
+        return self._version(tables)
+
+    def set(self, key, value, ttl=None, tables=None, version=None):
+        data = encode(value)
+        size = len(data)
+        ttl = self.ttl if ttl is None else check_ttl(ttl)
+        tables = {table.lower() for table in tables or ()}
+        encoded_key = encode_key(key)
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            if version is not None and version != self._version(tables, connection):
+                connection.execute("ROLLBACK")
+                return False
+            connection.execute("DELETE FROM entries WHERE key = ?", (encoded_key,))
+            if size > self.max_bytes:
+                connection.execute("COMMIT")
+                return False
+            now = self.clock()
+            connection.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+            evicted = self._evict(connection, size)
+            connection.execute(
+                "INSERT INTO entries (key, value, size, expires_at) VALUES (?, ?, ?, ?)",
+                (encoded_key, data, size, now + ttl if ttl is not None else None),
+            )
+            connection.executemany(
+                "INSERT OR IGNORE INTO entry_tables (table_name, key) VALUES (?, ?)",
+                [(table, encoded_key) for table in tables],
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        with self._lock:
+            self.evictions += evicted
+        return True
+
+    def _evict(self, connection, size):
+        """Deletes the oldest entries until one more of `size` bytes fits; returns the count."""
+        evicted = 0
+        while True:
+            entries, total = connection.execute("SELECT entries, bytes FROM totals").fetchone()
+            if not entries or (entries < self.max_entries and total + size <= self.max_bytes):
+                return evicted
+            excess = max(entries - self.max_entries + 1, 1)
+            deleted = connection.execute(
+                "DELETE FROM entries WHERE rowid IN "
+                "(SELECT rowid FROM entries ORDER BY rowid LIMIT ?)", (excess,)
+            ).rowcount
+            evicted += deleted
+
+    def delete(self, key):
+        connection = self._connection()
+        return connection.execute(
+            "DELETE FROM entries WHERE key = ?", (encode_key(key),)
+        ).rowcount > 0
+
+    def invalidate(self, tables):
+        tables = sorted({table.lower() for table in tables} | {ALL_TABLES})
+        placeholders = ", ".join("?" * len(tables))
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(
+                "INSERT INTO versions (table_name, version) VALUES (?, 1) "
+                "ON CONFLICT (table_name) DO UPDATE SET version = version + 1",
+                [(table,) for table in tables],
+            )
+            removed = connection.execute(
+                f"DELETE FROM entries WHERE key IN "
+                f"(SELECT key FROM entry_tables WHERE table_name IN ({placeholders}))",
+                tables,
+            ).rowcount
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        with self._lock:
+            self.invalidations += removed
+        return removed
+
+    def clear(self):
+        self._connection().execute("DELETE FROM entries")
+
+    def stats(self):
+        entries, total = self._connection().execute("SELECT entries, bytes FROM totals").fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": total,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Unit tests for db_pool.py
+"""
+import gc
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+import db_pool
+from db_pool import ConnectionPool
+
+
+def is_closed(conn):
+    try:
+        conn.execute("SELECT 1")
+    except sqlite3.ProgrammingError:
+        return True
+    return False
+
+
+class PoolTestCase(unittest.TestCase):
+    """
+    A users table in a temporary file.
+    """
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "users.db")
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT)")
+        conn.commit()
+        conn.close()
+        self.pool = ConnectionPool(path=self.path)
+
+    def tearDown(self):
+        self.pool.close()
+        self.directory.cleanup()
+
+
+class TestNesting(PoolTestCase):
+    """
+    Nested acquires on one thread share the connection.
+    """
+    def test_nested_acquire_shares_connection(self):
+        """
+        The inner release keeps the transaction; the outermost one rolls it back.
+        """
+        outer = self.pool.acquire()
+        inner = self.pool.acquire()
+        self.assertIs(inner, outer)
+        inner.execute("INSERT INTO users (email) VALUES ('a@example.com')")
+        self.pool.release(inner)
+        self.assertTrue(outer.in_transaction)
+        self.pool.release(outer)
+        self.assertFalse(outer.in_transaction)
+        self.assertEqual(outer.execute("SELECT COUNT(*) FROM users").fetchone()[0], 0)
+
+    def test_connection_is_reused_across_calls(self):
+        """
+        Later calls on the same thread get the same connection without reopening.
+        """
+        first = self.pool.acquire()
+        self.pool.release(first)
+        second = self.pool.acquire()
+        self.pool.release(second)
+        self.assertIs(first, second)
+        self.assertEqual(self.pool.opened, 1)
+
+    def test_threads_get_their_own_connection(self):
+        """
+        Each thread has its own connection, closed when the thread finishes.
+        """
+        mine = self.pool.acquire()
+        seen = []
+
+        def worker():
+            conn = self.pool.acquire()
+            seen.append(conn)
+            self.pool.release(conn)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        self.pool.release(mine)
+        self.assertIsNot(seen[0], mine)
+        del thread
+        gc.collect()
+        self.assertTrue(is_closed(seen[0]))
+        self.assertFalse(is_closed(mine))
+
+
+class TestClose(PoolTestCase):
+    """
+    Closing or reconfiguring never closes a connection underneath its thread.
+    """
+    def test_close_waits_for_busy_connection(self):
+        """
+        A connection in use on another thread stays usable until that thread releases it.
+        """
+        acquired = threading.Event()
+        closed = threading.Event()
+        results = []
+
+        def worker():
+            conn = self.pool.acquire()
+            acquired.set()
+            closed.wait(5)
+            results.append(conn.execute("SELECT COUNT(*) FROM users").fetchone()[0])
+            self.pool.release(conn)
+            results.append(is_closed(conn))
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        acquired.wait(5)
+        self.pool.close()
+        closed.set()
+        thread.join()
+        self.assertEqual(results, [0, True])
+
+    def test_close_closes_idle_connections(self):
+        """
+        Idle connections are closed at once; the thread reconnects on its next acquire.
+        """
+        conn = self.pool.acquire()
+        self.pool.release(conn)
+        self.pool.close()
+        self.assertTrue(is_closed(conn))
+        again = self.pool.acquire()
+        self.assertIsNot(again, conn)
+        self.assertFalse(is_closed(again))
+        self.pool.release(again)
+
+    def test_release_after_reconfigure(self):
+        """
+        Releasing a connection taken before configure_pool() works and then closes it.
+        """
+        db_pool.configure_pool(path=self.path)
+        pool = db_pool.get_pool()
+        conn = pool.acquire()
+        nested = pool.acquire()
+        db_pool.configure_pool(path=self.path)
+        self.assertFalse(is_closed(conn))
+        pool.release(nested)
+        self.assertFalse(is_closed(conn))
+        pool.release(conn)
+        self.assertTrue(is_closed(conn))
+        fresh = db_pool.get_pool().acquire()
+        self.assertIsNot(fresh, conn)
+        db_pool.get_pool().release(fresh)
+        db_pool.configure_pool()
+
+
+if __name__ == "__main__":
+    unittest.main()
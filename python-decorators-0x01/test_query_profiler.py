@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Unit tests for query_profiler.py
+"""
+import io
+import logging
+import sqlite3
+import unittest
+
+from query_profiler import QueryProfiler, count_rows, explain_query_plan, logger, statement_shape
+
+
+class ListHandler(logging.Handler):
+    """
+    Collects the records sent to the "queries" logger.
+    """
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestStatementShape(unittest.TestCase):
+    """
+    Statements differing only in literal values share a shape.
+    """
+    def test_literals_are_replaced(self):
+        """
+        Numbers and quoted strings become ?, identifiers with digits do not.
+        """
+        self.assertEqual(
+            statement_shape("SELECT *  FROM users2 WHERE id = 42 AND name = 'O''Brien';"),
+            "SELECT * FROM users2 WHERE id = ? AND name = ?",
+        )
+
+
+class TestQueryProfiler(unittest.TestCase):
+    """
+    Aggregation, sampling and slow-query plans.
+    """
+    def setUp(self):
+        self.handler = ListHandler()
+        logger.addHandler(self.handler)
+        self.level = logger.level
+        logger.setLevel(logging.INFO)
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT)")
+
+    def tearDown(self):
+        logger.removeHandler(self.handler)
+        logger.setLevel(self.level)
+        self.conn.close()
+
+    def test_stats_are_grouped_by_shape(self):
+        """
+        Calls, rows and max time add up per shape.
+        """
+        profiler = QueryProfiler(explain=False)
+        profiler.record("SELECT * FROM users WHERE id = 1", 0.001, 1)
+        profiler.record("SELECT * FROM users WHERE id = 2", 0.003, 0)
+        stats = profiler.stats()["SELECT * FROM users WHERE id = ?"]
+        self.assertEqual((stats.calls, stats.rows), (2, 1))
+        self.assertAlmostEqual(stats.total, 0.004)
+        self.assertEqual(stats.max, 0.003)
+
+    def test_percentiles_come_from_histogram(self):
+        """
+        Percentiles are the power-of-two bucket bounds, capped at the max.
+        """
+        profiler = QueryProfiler(explain=False, sample_first=0)
+        for _ in range(90):
+            profiler.record("SELECT 1", 0.0001, 1)
+        for _ in range(10):
+            profiler.record("SELECT 1", 0.010, 1)
+        stats = profiler.stats()["SELECT ?"]
+        self.assertEqual(stats.percentile(0.5), 128e-6)
+        self.assertEqual(stats.percentile(0.95), 0.010)
+
+    def test_fast_queries_are_sampled(self):
+        """
+        Only the first calls and every n-th call of a shape are logged.
+        """
+        profiler = QueryProfiler(sample_first=3, sample_every=10)
+        for i in range(30):
+            profiler.record(f"SELECT * FROM users WHERE id = {i}", 0.0001, 1)
+        calls = [record.args[2] for record in self.handler.records]
+        self.assertEqual(calls, [1, 2, 3, 10, 20, 30])
+
+    def test_slow_query_logs_plan_once_per_shape(self):
+        """
+        Slow queries are logged at WARNING with the EXPLAIN plan, explained only once.
+        """
+        profiler = QueryProfiler(slow_ms=1)
+        profiler.record("SELECT * FROM users WHERE email = 'a'", 0.5, 0, self.conn)
+        stats = profiler.stats()["SELECT * FROM users WHERE email = ?"]
+        plan = stats.plan
+        self.assertTrue(any("SCAN" in line for line in plan))
+        profiler.record("SELECT * FROM users WHERE email = 'b'", 0.5, 0, self.conn)
+        self.assertIs(stats.plan, plan)
+        self.assertEqual([r.levelno for r in self.handler.records], [logging.WARNING] * 2)
+        self.assertIn("SCAN", self.handler.records[0].getMessage())
+
+    def test_failed_query_is_always_logged(self):
+        """
+        A query that raised is logged at ERROR with its error and counted, even past sampling.
+        """
+        profiler = QueryProfiler(sample_first=0, sample_every=1000)
+        profiler.record("SELECT * FROM missing", 0.001, 0, error=sqlite3.OperationalError("no such table"))
+        record, = self.handler.records
+        self.assertEqual(record.levelno, logging.ERROR)
+        self.assertIn("no such table", record.getMessage())
+        self.assertEqual(profiler.stats()["SELECT * FROM missing"].errors, 1)
+
+    def test_report_lists_slowest_first(self):
+        """
+        The report has one line per shape ordered by total time.
+        """
+        profiler = QueryProfiler(explain=False)
+        profiler.record("SELECT 1", 0.001, 1)
+        profiler.record("SELECT * FROM users", 0.002, 5)
+        out = io.StringIO()
+        profiler.report(out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].endswith("SELECT * FROM users"))
+
+
+class TestHelpers(unittest.TestCase):
+    """
+    Plan capture and row counting.
+    """
+    def test_explain_error_is_returned(self):
+        """
+        A query that cannot be explained yields a note instead of raising.
+        """
+        conn = sqlite3.connect(":memory:")
+        self.assertIn("no plan", explain_query_plan(conn, "SELECT * FROM missing")[0])
+        conn.close()
+
+    def test_count_rows(self):
+        """
+        Lists count their rows, a single row counts as one.
+        """
+        self.assertEqual(count_rows([(1,), (2,)]), 2)
+        self.assertEqual(count_rows((1, "a")), 1)
+        self.assertEqual(count_rows(None), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Unit tests for result_cache.py
+"""
+import random
+import threading
+import time
+import unittest
+
+from result_cache import (ALL_TABLES, ResultCache, cache_key, estimate_size, invalidate_tables,
+                          read_tables, written_tables)
+
+
+class FakeClock:
+    """
+    A settable clock for TTL tests.
+    """
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCacheKey(unittest.TestCase):
+    """
+    Keys combine normalized SQL with the bound parameters.
+    """
+    def test_whitespace_and_semicolon_are_ignored(self):
+        """
+        Reformatted SQL maps to the same key.
+        """
+        self.assertEqual(cache_key("SELECT *\n  FROM users;"), cache_key("SELECT * FROM users"))
+
+    def test_literals_are_preserved(self):
+        """
+        Whitespace inside string literals is significant.
+        """
+        self.assertNotEqual(cache_key("SELECT * FROM users WHERE name = 'a  b'"),
+                            cache_key("SELECT * FROM users WHERE name = 'a b'"))
+
+    def test_params_are_part_of_the_key(self):
+        """
+        The same statement with different parameters gets different keys.
+        """
+        query = "SELECT * FROM users WHERE id = ?"
+        self.assertNotEqual(cache_key(query, (1,)), cache_key(query, (2,)))
+        self.assertEqual(cache_key(query, [1]), cache_key(query, (1,)))
+
+
+class TestResultCache(unittest.TestCase):
+    """
+    Bounds, expiry and statistics of ResultCache.
+    """
+    def test_lru_eviction_by_entries(self):
+        """
+        The least recently used entry is evicted first.
+        """
+        cache = ResultCache(max_entries=2)
+        cache.set("a", [(1,)])
+        cache.set("b", [(2,)])
+        cache.get("a")
+        cache.set("c", [(3,)])
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), [(1,)])
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_eviction_by_bytes(self):
+        """
+        Total size never exceeds max_bytes; oversized results are not cached.
+        """
+        size = estimate_size([(1, "x" * 100)])
+        cache = ResultCache(max_bytes=size * 2)
+        for key in range(5):
+            cache.set(key, [(1, "x" * 100)])
+        self.assertEqual(len(cache), 2)
+        self.assertLessEqual(cache.bytes, size * 2)
+        self.assertFalse(cache.set("big", [(1, "x" * 1000)]))
+
+    def test_ttl_expiry(self):
+        """
+        Entries are misses once their TTL has passed.
+        """
+        clock = FakeClock()
+        cache = ResultCache(ttl=10, clock=clock)
+        cache.set("a", [(1,)])
+        clock.now = 9.9
+        self.assertEqual(cache.get("a"), [(1,)])
+        clock.now = 10.0
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["expirations"], 1)
+        self.assertEqual(cache.bytes, 0)
+
+    def test_ttl_none_never_expires_and_zero_is_rejected(self):
+        """
+        ttl=None keeps entries indefinitely; ttl=0 or less is an error, not "forever".
+        """
+        clock = FakeClock()
+        cache = ResultCache(ttl=None, clock=clock)
+        cache.set("a", [(1,)])
+        clock.now = 1e9
+        self.assertEqual(cache.get("a"), [(1,)])
+        for ttl in (0, -1):
+            with self.assertRaises(ValueError):
+                ResultCache(ttl=ttl)
+            with self.assertRaises(ValueError):
+                cache.set("b", [(2,)], ttl=ttl)
+
+
+class TestInvalidation(unittest.TestCase):
+    """
+    Entries are tagged with the tables they read and dropped when those are written.
+    """
+    def test_read_tables(self):
+        """
+        FROM/JOIN clauses, comma lists and subqueries are found; literals are ignored.
+        """
+        self.assertEqual(read_tables("SELECT * FROM users"), {"users"})
+        self.assertEqual(read_tables("SELECT * FROM main.Users u JOIN orders o ON o.user_id = u.id"),
+                         {"users", "orders"})
+        self.assertEqual(read_tables("SELECT * FROM a, b WHERE x IN (SELECT y FROM c)"),
+                         {"a", "b", "c"})
+        self.assertEqual(read_tables("SELECT 'from users'"), {ALL_TABLES})
+
+    def test_written_tables(self):
+        """
+        INSERT/UPDATE/DELETE targets are found; reads write nothing.
+        """
+        self.assertEqual(written_tables("UPDATE users SET email = ? WHERE id = ?"), {"users"})
+        self.assertEqual(written_tables("INSERT OR IGNORE INTO users (id) VALUES (1)"), {"users"})
+        self.assertEqual(written_tables("DELETE FROM Users"), {"users"})
+        self.assertEqual(written_tables("SELECT * FROM users"), set())
+
+    def test_only_dependent_entries_are_dropped(self):
+        """
+        Writing users drops entries reading users or unknown tables, nothing else.
+        """
+        cache = ResultCache()
+        cache.set("users", [(1,)], tables={"users"})
+        cache.set("joined", [(1,)], tables={"users", "orders"})
+        cache.set("orders", [(1,)], tables={"orders"})
+        cache.set("unknown", [(1,)], tables={ALL_TABLES})
+        invalidate_tables({"users"})
+        self.assertEqual(sorted(key for key in ("users", "joined", "orders", "unknown")
+                                if cache.get(key) is not None), ["orders"])
+        self.assertEqual(cache.stats()["invalidations"], 3)
+
+    def test_result_loaded_across_a_write_is_not_cached(self):
+        """
+        A result read before a concurrent commit is returned but not stored.
+        """
+        cache = ResultCache()
+
+        def load():
+            cache.invalidate({"users"})
+            return [(1, "old")]
+
+        self.assertEqual(cache.fetch("users", load, tables={"users"}), (False, [(1, "old")]))
+        self.assertEqual(len(cache), 0)
+
+
+class TestConcurrency(unittest.TestCase):
+    """
+    ResultCache stays consistent when shared between threads.
+    """
+    def test_invariants_under_contention(self):
+        """
+        16 threads mixing get/set/delete keep counts and byte totals exact.
+        """
+        cache = ResultCache(max_entries=50, max_bytes=20000, ttl=None)
+        operations = 5000
+        gets = [0] * 16
+
+        def worker(index):
+            rng = random.Random(index)
+            for _ in range(operations):
+                key = rng.randrange(200)
+                action = rng.random()
+                if action < 0.6:
+                    cache.get(key)
+                    gets[index] += 1
+                elif action < 0.95:
+                    cache.set(key, [(key, "row")] * rng.randint(1, 5))
+                else:
+                    cache.delete(key)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = cache.stats()
+        self.assertEqual(stats["hits"] + stats["misses"], sum(gets))
+        self.assertLessEqual(stats["entries"], 50)
+        self.assertLessEqual(stats["bytes"], 20000)
+        self.assertEqual(stats["bytes"],
+                         sum(size for _, size, _ in cache._entries.values()))
+
+    def test_concurrent_misses_load_once(self):
+        """
+        Threads missing on the same key share one load.
+        """
+        cache = ResultCache()
+        calls = []
+        start = threading.Barrier(8)
+        results = []
+
+        def load():
+            calls.append(1)
+            time.sleep(0.05)
+            return [(1, "Alice")]
+
+        def worker():
+            start.wait()
+            results.append(cache.fetch("users", load)[1])
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [[(1, "Alice")]] * 8)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
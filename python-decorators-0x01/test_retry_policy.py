@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Unit tests for retry_policy.py
+"""
+import contextlib
+import importlib.util
+import io
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from retry_policy import CircuitBreaker, CircuitOpenError, RetryBudget, backoff_delay, is_transient
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_task_module():
+    """
+    Imports 3-retry_on_failure.py, whose example runs against a throwaway users.db.
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        conn = sqlite3.connect(os.path.join(directory, "users.db"))
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT)")
+        conn.close()
+        spec = importlib.util.spec_from_file_location(
+            "retry_on_failure_task", os.path.join(HERE, "3-retry_on_failure.py"))
+        module = importlib.util.module_from_spec(spec)
+        os.chdir(directory)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()), \
+                    contextlib.redirect_stderr(io.StringIO()), mock.patch("time.sleep"):
+                spec.loader.exec_module(module)
+        finally:
+            os.chdir(cwd)
+    return module
+
+
+class FakeClock:
+    """
+    A settable clock for breaker timeouts.
+    """
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestIsTransient(unittest.TestCase):
+    """
+    Only lock contention is worth retrying.
+    """
+    def test_locked_and_busy_are_transient(self):
+        """
+        Locked/busy OperationalErrors are retried.
+        """
+        self.assertTrue(is_transient(sqlite3.OperationalError("database is locked")))
+        self.assertTrue(is_transient(sqlite3.OperationalError("database table is locked")))
+
+    def test_other_errors_are_not(self):
+        """
+        Missing tables, constraint failures and programming errors fail fast.
+        """
+        self.assertFalse(is_transient(sqlite3.OperationalError("no such table: users")))
+        self.assertFalse(is_transient(sqlite3.IntegrityError("UNIQUE constraint failed")))
+        self.assertFalse(is_transient(TypeError("locked")))
+
+    def test_real_lock_error(self):
+        """
+        The error SQLite raises for a locked database is classified as transient.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "locked.db")
+            writer = sqlite3.connect(path, isolation_level=None)
+            writer.execute("CREATE TABLE t (x)")
+            writer.execute("BEGIN EXCLUSIVE")
+            other = sqlite3.connect(path, timeout=0)
+            with self.assertRaises(sqlite3.OperationalError) as caught:
+                other.execute("SELECT * FROM t")
+            self.assertTrue(is_transient(caught.exception))
+            writer.execute("ROLLBACK")
+            other.close()
+            writer.close()
+
+
+class TestBackoff(unittest.TestCase):
+    """
+    Full jitter below an exponentially growing, capped ceiling.
+    """
+    def test_ceiling_doubles_and_is_capped(self):
+        """
+        With the random factor at 1 the delay is the ceiling itself.
+        """
+        delays = [backoff_delay(attempt, 0.1, 1.0, rng=lambda: 1.0) for attempt in range(6)]
+        self.assertEqual(delays, [0.1, 0.2, 0.4, 0.8, 1.0, 1.0])
+
+    def test_jitter_is_uniform_below_ceiling(self):
+        """
+        Delays fall anywhere in [0, ceiling).
+        """
+        delays = [backoff_delay(3, 0.1, 10) for _ in range(1000)]
+        self.assertTrue(all(0 <= delay < 0.8 for delay in delays))
+        self.assertLess(min(delays), 0.1)
+        self.assertGreater(max(delays), 0.7)
+
+
+class TestRetryBudget(unittest.TestCase):
+    """
+    Retries are limited once half the tokens are spent.
+    """
+    def test_budget_runs_out_and_refills(self):
+        """
+        Half the tokens can be spent; successes earn them back slowly.
+        """
+        budget = RetryBudget(max_tokens=10, ratio=0.5)
+        self.assertEqual(sum(budget.spend() for _ in range(20)), 5)
+        budget.earn()
+        self.assertFalse(budget.spend())
+        budget.earn()
+        self.assertTrue(budget.spend())
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """
+    Closed, open and half-open states.
+    """
+    def test_opens_after_threshold_and_recovers(self):
+        """
+        Consecutive failures open the circuit; one trial call is allowed after the timeout.
+        """
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=5, clock=clock)
+        for _ in range(3):
+            self.assertTrue(breaker.allow())
+            breaker.failed()
+        self.assertEqual(breaker.state, "open")
+        self.assertFalse(breaker.allow())
+        clock.now = 5
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.succeeded()
+        self.assertEqual(breaker.state, "closed")
+        self.assertTrue(breaker.allow())
+
+    def test_failed_trial_reopens(self):
+        """
+        A failing half-open trial opens the circuit for another timeout.
+        """
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5, clock=clock)
+        breaker.failed()
+        clock.now = 5
+        self.assertTrue(breaker.allow())
+        breaker.failed()
+        self.assertFalse(breaker.allow())
+        clock.now = 10
+        self.assertTrue(breaker.allow())
+
+    def test_success_resets_failure_count(self):
+        """
+        Failures must be consecutive to open the circuit.
+        """
+        breaker = CircuitBreaker(failure_threshold=2)
+        breaker.failed()
+        breaker.succeeded()
+        breaker.failed()
+        self.assertEqual(breaker.state, "closed")
+
+
+class TestRetryOnFailure(unittest.TestCase):
+    """
+    The decorator in 3-retry_on_failure.py, with sleeps recorded instead of taken.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls.module = load_task_module()
+        cls.retry_on_failure = staticmethod(cls.module.retry_on_failure)
+
+    def setUp(self):
+        self.calls = 0
+        patcher = mock.patch("time.sleep")
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+        quiet = contextlib.redirect_stderr(io.StringIO())
+        quiet.__enter__()
+        self.addCleanup(quiet.__exit__, None, None, None)
+
+    def failing(self, error, successes_after=None):
+        """
+        A function raising `error` until it has been called `successes_after` times.
+        """
+        def func():
+            self.calls += 1
+            if successes_after is None or self.calls < successes_after:
+                raise error
+            return "ok"
+        return func
+
+    def test_transient_errors_are_retried(self):
+        """
+        Locked-database errors are retried until the call succeeds.
+        """
+        func = self.retry_on_failure(retries=3, delay=0.1, budget=RetryBudget(),
+                                     breaker=CircuitBreaker())(
+            self.failing(sqlite3.OperationalError("database is locked"), successes_after=3))
+        self.assertEqual(func(), "ok")
+        self.assertEqual(self.calls, 3)
+        self.assertEqual(self.sleep.call_count, 2)
+
+    def test_non_transient_error_is_raised_at_once(self):
+        """
+        A programming error is raised on the first attempt without sleeping.
+        """
+        func = self.retry_on_failure(retries=5, budget=None, breaker=None)(
+            self.failing(sqlite3.OperationalError("no such table: users")))
+        with self.assertRaises(sqlite3.OperationalError):
+            func()
+        self.assertEqual(self.calls, 1)
+        self.sleep.assert_not_called()
+
+    def test_deadline_stops_retries(self):
+        """
+        No retry starts whose backoff would end past the deadline.
+        """
+        func = self.retry_on_failure(retries=10, delay=5, deadline=1, budget=None, breaker=None)(
+            self.failing(sqlite3.OperationalError("database is locked")))
+        with mock.patch.object(self.module, "backoff_delay", return_value=2.5):
+            with self.assertRaises(sqlite3.OperationalError):
+                func()
+        self.assertEqual(self.calls, 1)
+        self.sleep.assert_not_called()
+
+    def test_empty_budget_stops_retries(self):
+        """
+        With the shared budget spent, failures are raised without retrying.
+        """
+        budget = RetryBudget(max_tokens=2)
+        self.assertTrue(budget.spend())
+        func = self.retry_on_failure(retries=5, delay=0.1, budget=budget, breaker=None)(
+            self.failing(sqlite3.OperationalError("database is locked")))
+        with self.assertRaises(sqlite3.OperationalError):
+            func()
+        self.assertEqual(self.calls, 1)
+
+    def test_open_breaker_short_circuits(self):
+        """
+        Once the breaker trips, calls fail with CircuitOpenError chained to the last error.
+        """
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        func = self.retry_on_failure(retries=5, delay=0.1, budget=None, breaker=breaker)(
+            self.failing(sqlite3.OperationalError("database is locked")))
+        with self.assertRaises(CircuitOpenError) as caught:
+            func()
+        self.assertIsInstance(caught.exception.__cause__, sqlite3.OperationalError)
+        self.assertEqual(self.calls, 2)
+        with self.assertRaises(CircuitOpenError):
+            func()
+        self.assertEqual(self.calls, 2)
+
+    def test_interrupted_trial_is_released(self):
+        """
+        A half-open trial interrupted by KeyboardInterrupt does not keep the circuit open.
+        """
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5, clock=clock)
+        breaker.failed()
+        clock.now = 5
+        func = self.retry_on_failure(budget=None, breaker=breaker)(
+            self.failing(KeyboardInterrupt()))
+        with self.assertRaises(KeyboardInterrupt):
+            func()
+        self.assertTrue(breaker.allow())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Unit tests for shared_result_cache.py
+"""
+import datetime
+import multiprocessing
+import os
+import tempfile
+import unittest
+from decimal import Decimal
+
+from result_cache import cache_key, invalidate_tables
+from shared_result_cache import SQLiteResultCache, decode, encode
+
+QUERY = cache_key("SELECT * FROM users WHERE id = ?", (1,))
+ROWS = [(1, "Alice", "alice@example.com")]
+
+
+def store_rows(path):
+    """
+    Runs in a child process: caches ROWS under QUERY.
+    """
+    SQLiteResultCache(path).set(QUERY, ROWS, tables={"users"})
+
+
+def read_many(path, keys, results):
+    """
+    Runs in a child process: fetches every key, loading on a miss.
+    """
+    cache = SQLiteResultCache(path)
+    for key in keys:
+        hit, value = cache.fetch(("q", key), lambda: [(key, "row")], tables={"users"})
+        results.put(value == [(key, "row")])
+
+
+class TestEncoding(unittest.TestCase):
+    """
+    Results survive serialization, compactly where possible.
+    """
+    def test_round_trip(self):
+        """
+        Plain rows, rows with marshal-unfriendly types and large results round-trip.
+        """
+        for value in (ROWS, [(Decimal("1.5"), datetime.date(2024, 1, 1))],
+                      [(i, "x" * 50) for i in range(1000)]):
+            self.assertEqual(decode(encode(value)), value)
+
+    def test_large_results_are_compressed(self):
+        """
+        Repetitive results are stored smaller than their marshal form.
+        """
+        rows = [(i, "Alice", "alice@example.com") for i in range(1000)]
+        self.assertEqual(encode(rows)[:1], b"z")
+
+
+class TestSQLiteResultCache(unittest.TestCase):
+    """
+    One cache file shared between processes.
+    """
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "query_cache.db")
+        self.context = multiprocessing.get_context("spawn")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_child(self, target, *args):
+        child = self.context.Process(target=target, args=(self.path,) + args)
+        child.start()
+        child.join()
+        self.assertEqual(child.exitcode, 0)
+
+    def test_file_is_private(self):
+        """
+        The cache file is created 0600 and a group/world-writable one is refused.
+        """
+        SQLiteResultCache(self.path)
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+        os.chmod(self.path, 0o666)
+        with self.assertRaises(PermissionError):
+            SQLiteResultCache(self.path)
+
+    def test_expired_entry_is_deleted_on_lookup(self):
+        """
+        Finding an expired entry removes it from the file.
+        """
+        now = [0.0]
+        cache = SQLiteResultCache(self.path, ttl=10, clock=lambda: now[0])
+        cache.set(QUERY, ROWS)
+        now[0] = 11
+        self.assertIsNone(cache.get(QUERY))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats()["bytes"], 0)
+
+    def test_result_stored_by_another_process_is_a_hit(self):
+        """
+        A result cached in a child process is served here without running the query.
+        """
+        self.run_child(store_rows)
+        cache = SQLiteResultCache(self.path)
+        self.assertEqual(cache.fetch(QUERY, lambda: self.fail("query ran")), (True, ROWS))
+
+    def test_invalidation_reaches_the_shared_file(self):
+        """
+        invalidate_tables() drops shared entries reading the written table.
+        """
+        self.run_child(store_rows)
+        cache = SQLiteResultCache(self.path)
+        cache.set(("other",), [(1,)], tables={"orders"})
+        invalidate_tables({"users"})
+        self.assertIsNone(cache.get(QUERY))
+        self.assertEqual(cache.get(("other",)), [(1,)])
+
+    def test_bounds_are_shared(self):
+        """
+        Entry and byte limits hold across processes, oldest entries going first.
+        """
+        cache = SQLiteResultCache(self.path, max_entries=3)
+        for key in range(5):
+            cache.set(key, [(key,)])
+        self.assertEqual(len(cache), 3)
+        self.assertIsNone(cache.get(0))
+        self.assertEqual(cache.get(4), [(4,)])
+        self.assertEqual(cache.stats()["evictions"], 2)
+
+    def test_concurrent_processes(self):
+        """
+        Four processes reading and filling the same keys all see correct rows.
+        """
+        SQLiteResultCache(self.path, max_entries=8)
+        results = self.context.Queue()
+        keys = [key % 10 for key in range(100)]
+        children = [self.context.Process(target=read_many, args=(self.path, keys, results))
+                    for _ in range(4)]
+        for child in children:
+            child.start()
+        outcomes = [results.get(timeout=60) for _ in range(len(keys) * len(children))]
+        for child in children:
+            child.join()
+            self.assertEqual(child.exitcode, 0)
+        self.assertTrue(all(outcomes))
+
+
+if __name__ == "__main__":
+    unittest.main()
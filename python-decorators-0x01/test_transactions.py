@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Unit tests for transactions.py
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from result_cache import ResultCache
+from transactions import GroupCommitter, in_transaction_scope, set_trace_callback, transaction
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """
+    A users table in a temporary file.
+    """
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "users.db")
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT UNIQUE)")
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+        self.directory.cleanup()
+
+    def emails(self):
+        check = sqlite3.connect(self.path)
+        try:
+            return [row[0] for row in check.execute("SELECT email FROM users ORDER BY id")]
+        finally:
+            check.close()
+
+
+class TestNesting(DatabaseTestCase):
+    """
+    Nested scopes run in savepoints of the outermost transaction.
+    """
+    def test_inner_failure_rolls_back_only_inner_work(self):
+        """
+        The outer work survives an inner scope that raised.
+        """
+        with transaction(self.conn):
+            self.conn.execute("INSERT INTO users (email) VALUES ('outer@example.com')")
+            with self.assertRaises(ValueError):
+                with transaction(self.conn):
+                    self.conn.execute("INSERT INTO users (email) VALUES ('inner@example.com')")
+                    raise ValueError("inner")
+        self.assertEqual(self.emails(), ["outer@example.com"])
+        self.assertFalse(in_transaction_scope(self.conn))
+
+    def test_nothing_is_committed_before_outermost_scope(self):
+        """
+        A released inner scope is not visible to other connections until the outer commit.
+        """
+        with transaction(self.conn):
+            with transaction(self.conn):
+                self.conn.execute("INSERT INTO users (email) VALUES ('a@example.com')")
+            self.assertEqual(self.emails(), [])
+        self.assertEqual(self.emails(), ["a@example.com"])
+
+    def test_outer_failure_rolls_back_everything(self):
+        """
+        Work of released inner scopes is undone with the outer transaction.
+        """
+        with self.assertRaises(ValueError):
+            with transaction(self.conn):
+                with transaction(self.conn):
+                    self.conn.execute("INSERT INTO users (email) VALUES ('a@example.com')")
+                raise ValueError("outer")
+        self.assertEqual(self.emails(), [])
+
+    def test_cache_invalidated_after_outermost_commit(self):
+        """
+        Tables written in any scope are invalidated once, after the commit.
+        """
+        cache = ResultCache()
+        cache.set("key", [], tables={"users"})
+        with transaction(self.conn):
+            with transaction(self.conn):
+                self.conn.execute("INSERT INTO users (email) VALUES ('a@example.com')")
+            self.assertEqual(cache.get("key"), [])
+        self.assertIsNone(cache.get("key"))
+
+
+class TestTracing(DatabaseTestCase):
+    """
+    Table tracking chains to the connection's own tracer instead of replacing it.
+    """
+    def test_tracer_is_chained_and_restored(self):
+        """
+        A tracer set with set_trace_callback sees the statements run in a scope and survives it.
+        """
+        cache = ResultCache()
+        cache.set("users", [(1,)], tables={"users"})
+        statements = []
+        set_trace_callback(self.conn, statements.append)
+        with transaction(self.conn):
+            with transaction(self.conn):
+                self.conn.execute("INSERT INTO users (email) VALUES ('a@example.com')")
+        self.assertIsNone(cache.get("users"))
+        self.assertTrue(any("INSERT INTO users" in statement for statement in statements))
+        statements.clear()
+        self.conn.execute("SELECT 1")
+        self.assertEqual(statements, ["SELECT 1"])
+        set_trace_callback(self.conn, None)
+
+    def test_tracer_changed_inside_a_scope(self):
+        """
+        Removing the tracer mid-transaction takes effect at once and after the scope.
+        """
+        statements = []
+        set_trace_callback(self.conn, statements.append)
+        with transaction(self.conn):
+            set_trace_callback(self.conn, None)
+            self.conn.execute("INSERT INTO users (email) VALUES ('b@example.com')")
+        self.conn.execute("SELECT 1")
+        self.assertFalse(any("b@example.com" in statement or statement == "SELECT 1"
+                             for statement in statements))
+
+
+class TestGroupCommit(DatabaseTestCase):
+    """
+    Concurrent callers share commits but keep their own outcomes.
+    """
+    def test_concurrent_calls_share_commits(self):
+        """
+        Every call lands, in fewer commits than calls.
+        """
+        committer = GroupCommitter(self.path, window=0.05)
+        barrier = threading.Barrier(20)
+
+        def insert(conn, i):
+            conn.execute("INSERT INTO users (email) VALUES (?)", (f"user{i}@example.com",))
+            return i
+
+        results = []
+
+        def caller(i):
+            barrier.wait()
+            results.append(committer.submit(insert, (i,)).result())
+
+        threads = [threading.Thread(target=caller, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        committer.close()
+        self.assertEqual(sorted(results), list(range(20)))
+        self.assertEqual(len(self.emails()), 20)
+        self.assertEqual(committer.transactions, 20)
+        self.assertLess(committer.commits, 20)
+
+    def test_failing_call_fails_alone(self):
+        """
+        A call that raises gets its own error; the rest of the batch commits.
+        """
+        committer = GroupCommitter(self.path, window=0.05)
+
+        def insert(conn, email):
+            conn.execute("INSERT INTO users (email) VALUES (?)", (email,))
+
+        first = committer.submit(insert, ("a@example.com",))
+        duplicate = committer.submit(insert, ("a@example.com",))
+        last = committer.submit(insert, ("b@example.com",))
+        committer.close()
+        self.assertIsNone(first.result())
+        self.assertIsInstance(duplicate.exception(), sqlite3.IntegrityError)
+        self.assertIsNone(last.result())
+        self.assertEqual(self.emails(), ["a@example.com", "b@example.com"])
+        self.assertEqual(committer.commits, 1)
+
+    def test_base_exception_fails_only_its_call(self):
+        """
+        A call raising SystemExit gets it as its error; the committer keeps serving.
+        """
+        committer = GroupCommitter(self.path, window=0.05)
+
+        def leave(conn):
+            raise SystemExit(3)
+
+        def insert(conn, email):
+            conn.execute("INSERT INTO users (email) VALUES (?)", (email,))
+
+        exiting = committer.submit(leave)
+        kept = committer.submit(insert, ("a@example.com",))
+        self.assertIsInstance(exiting.exception(timeout=5), SystemExit)
+        self.assertIsNone(kept.result(timeout=5))
+        self.assertIsNone(committer.submit(insert, ("b@example.com",)).result(timeout=5))
+        committer.close()
+        self.assertEqual(self.emails(), ["a@example.com", "b@example.com"])
+
+    def test_dead_committer_fails_callers(self):
+        """
+        When the database cannot be opened, queued calls fail and submit() raises.
+        """
+        committer = GroupCommitter(os.path.join(self.directory.name, "missing", "users.db"))
+        try:
+            future = committer.submit(lambda conn: None)
+        except RuntimeError:
+            pass
+        else:
+            self.assertIsInstance(future.exception(timeout=5), (RuntimeError, sqlite3.Error))
+        committer._thread.join(timeout=5)
+        with self.assertRaises(RuntimeError):
+            committer.submit(lambda conn: None)
+
+    def test_submit_after_close_raises(self):
+        """
+        A closed committer refuses new work instead of queueing it forever.
+        """
+        committer = GroupCommitter(self.path)
+        committer.close()
+        with self.assertRaises(RuntimeError):
+            committer.submit(lambda conn: None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,253 @@
+import contextlib
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from db_pool import database_path, get_pool
+from result_cache import invalidate_tables, written_tables
+
+# id(conn) -> _Scope for connections with a transaction() open; removed when the
+# outermost scope ends, so ids are never stale.
+_scopes = {}
+# id(conn) -> (conn, callback) for tracers installed with set_trace_callback().
+# Holding conn keeps its id from being reused by another connection.
+_tracers = {}
+
+
+class _Scope:
+    def __init__(self):
+        self.depth = 0
+        self.tables = set()
+        self.tracing = False
+
+
+def in_transaction_scope(conn):
+    """True while a transaction() is open on conn, i.e. a new scope would be nested."""
+    return id(conn) in _scopes
+
+
+def set_trace_callback(conn, callback):
+    """Installs a statement tracer on conn that transaction() keeps calling and restores.
+
+    sqlite3 cannot report a connection's current trace callback, so a tracer
+    set with conn.set_trace_callback() is replaced while transaction()
+    watches for written tables. One set here is chained to instead and put
+    back afterwards. None removes it (and releases conn).
+    """
+    if callback is None:
+        _tracers.pop(id(conn), None)
+    else:
+        _tracers[id(conn)] = (conn, callback)
+    scope = _scopes.get(id(conn))
+    if scope is None or not scope.tracing:
+        conn.set_trace_callback(callback)
+
+
+def _installed_tracer(conn_id):
+    entry = _tracers.get(conn_id)
+    return entry[1] if entry is not None else None
+
+
+def _tracing(conn_id, tables):
+    """A trace callback that records written tables, then calls the connection's own tracer."""
+    # Keyed by id so the callback does not hold (and form a cycle with) the connection.
+    def trace(statement):
+        tables.update(written_tables(statement))
+        callback = _installed_tracer(conn_id)
+        if callback is not None:
+            callback(statement)
+    return trace
+
+
+@contextlib.contextmanager
+def transaction(conn, writes=None):
+    """Runs the block in a transaction on conn; nested blocks become savepoints.
+
+    The outermost scope begins a transaction and commits it, or rolls it
+    back if the block raises. A scope opened inside it runs in a SAVEPOINT
+    that is released on success and rolled back to on error, so an inner
+    failure undoes only the inner work. After the outermost commit, cached
+    results that read the written tables are invalidated; the tables are
+    `writes` when given, otherwise seen through the connection's trace
+    callback, which chains to (and is then restored to) any tracer installed
+    with set_trace_callback().
+    """
+    scope = _scopes.get(id(conn))
+    outermost = scope is None
+    if outermost:
+        scope = _scopes[id(conn)] = _Scope()
+    scope.tables.update(writes or ())
+    trace = writes is None and not scope.tracing
+    if trace:
+        conn.set_trace_callback(_tracing(id(conn), scope.tables))
+        scope.tracing = True
+    savepoint = f"transactional_{scope.depth}"
+    scope.depth += 1
+    try:
+        if outermost:
+            if not conn.in_transaction:
+                # Explicit, so that a savepoint opened first cannot start (and commit) it.
+                conn.execute("BEGIN")
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        else:
+            conn.execute(f"SAVEPOINT {savepoint}")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+                raise
+            conn.execute(f"RELEASE {savepoint}")
+    finally:
+        scope.depth -= 1
+        if trace:
+            conn.set_trace_callback(_installed_tracer(id(conn)))
+            scope.tracing = False
+        if outermost:
+            del _scopes[id(conn)]
+    if outermost and scope.tables:
+        invalidate_tables(scope.tables)
+
+
+class GroupCommitter:
+    """Coalesces small transactions from many threads into one commit.
+
+    submit() queues a function; a committer thread collects the calls
+    queued while it was busy plus whatever arrives within `window` seconds
+    (at most `max_batch` calls), runs each call in its own savepoint of a
+    single transaction on a db_pool connection, and commits once. A call
+    that raises is rolled back to its savepoint and only its future fails;
+    if the commit itself fails, every call in the batch fails with that
+    error. Futures resolve after the commit, so a result means the work is
+    durable. If the committer thread stops (closed, or unable to open the
+    database), pending futures fail and submit() raises RuntimeError.
+
+    Submitted functions run on the committer thread and must not commit or
+    roll back the connection themselves.
+    """
+
+    def __init__(self, path=None, window=0.0005, max_batch=100):
+        self.path = path or database_path()
+        self.window = window
+        self.max_batch = max_batch
+        self.commits = 0
+        self.transactions = 0
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, func, args=(), kwargs=None, writes=None):
+        """Queues func(conn, *args, **kwargs); returns a Future of its result."""
+        future = Future()
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError(f"group committer for {self.path} is not running")
+            self._queue.put((future, func, args, kwargs or {}, writes))
+        return future
+
+    def close(self):
+        """Commits what is queued and stops the committer thread."""
+        with self._lock:
+            if not self._stopped:
+                self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        error = None
+        try:
+            pool = get_pool(self.path)
+            conn = pool.acquire()
+            try:
+                self._serve(conn)
+            finally:
+                pool.release(conn)
+        except BaseException as e:
+            # Reported to the callers through their futures (as __cause__).
+            error = e
+        finally:
+            with self._lock:
+                self._stopped = True
+            self._fail_pending(error)
+
+    def _serve(self, conn):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._commit(conn, batch)
+                    return
+                batch.append(item)
+            self._commit(conn, batch)
+
+    def _fail_pending(self, error):
+        """Fails the futures still queued once the thread has stopped taking work."""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None and item[0].set_running_or_notify_cancel():
+                stopped = RuntimeError(f"group committer for {self.path} stopped")
+                stopped.__cause__ = error
+                item[0].set_exception(stopped)
+
+    def _commit(self, conn, batch):
+        done = []
+        try:
+            with transaction(conn):
+                for future, func, args, kwargs, writes in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with transaction(conn, writes):
+                            result = func(conn, *args, **kwargs)
+                    except BaseException as e:
+                        # Even SystemExit only fails its own call, not the committer.
+                        future.set_exception(e)
+                    else:
+                        done.append((future, result))
+        except BaseException as e:
+            # Calls that succeeded in their savepoint were lost with the commit.
+            for future, _, _, _, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        self.commits += 1
+        self.transactions += len(done)
+        for future, result in done:
+            future.set_result(result)
+
+
+_committers = {}
+_committers_lock = threading.Lock()
+
+
+def get_committer(path=None):
+    """Returns the process-wide GroupCommitter for `path` (default: the configured path)."""
+    path = path or database_path()
+    with _committers_lock:
+        committer = _committers.get(path)
+        if committer is None:
+            committer = _committers[path] = GroupCommitter(path)
+        return committer
@@ -1,20 +1,39 @@
 
 import mysql.connector
-from seed import connect_to_prodev
+from pool import pooled_connection
+from rows import DEFAULT_ARRAYSIZE, fetch_in_chunks, row_factory
+from filters import compile_where
 
-def stream_users():
-    """Generates user data from the database one by one."""
-    connection = None
+def stream_users(row_format="dict", arraysize=DEFAULT_ARRAYSIZE, where=None):
+    """Generates user data from the database one by one.
+
+    row_format="dict" yields one dict per row. "tuple", "namedtuple" and
+    "record" switch to an unbuffered cursor read with fetchmany(arraysize),
+    yielding plain tuples, UserTuple or UserRecord rows respectively.
+
+    `where` is a filters.Predicate; what translates to SQL becomes the query's
+    WHERE clause and the rest is evaluated on each row here.
+    """
+    sql, params, residual = compile_where(where)
+    query = "SELECT user_id, name, email, age FROM user_data"
+    if sql:
+        query += f" WHERE {sql}"
     try:
-        connection = connect_to_prodev()
-        if connection:
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT user_id, name, email, age FROM user_data")
-            for row in cursor:
-                yield row
+        with pooled_connection() as connection:
+            if row_format == "dict":
+                cursor = connection.cursor(dictionary=True)
+                cursor.execute(query, params)
+                rows = cursor
+                make_row = None
+            else:
+                make_row = row_factory(row_format)
+                cursor = connection.cursor(buffered=False)
+                cursor.execute(query, params)
+                rows = fetch_in_chunks(cursor, arraysize)
+            if make_row is not None:
+                rows = map(make_row, rows)
+            if residual is not None:
+                rows = (row for row in rows if residual.matches(row))
+            yield from rows
     except mysql.connector.Error as err:
         print(f"Error streaming users: {err}")
-    finally:
-        if connection:
-            connection.close()
-
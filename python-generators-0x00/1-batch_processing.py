@@ -1,32 +1,41 @@
 
 import mysql.connector
-from seed import connect_to_prodev
+from pool import pooled_connection
+from filters import Field, compile_where
+from keyset import Page, encode_resume_token, scan_positions, start_position
 
-def stream_users_in_batches(batch_size):
-    """Generates user data from the database in batches."""
-    connection = None
+def stream_users_in_batches(batch_size, resume_token=None, keyset=True, where=None):
+    """Generates user data from the database in batches.
+
+    Batches are fetched with keyset (seek) pagination on user_id, so each page
+    costs the same no matter how deep into the table it is. Every batch is a
+    Page carrying a `resume_token`; pass it back in to continue after that
+    batch. keyset=False falls back to LIMIT/OFFSET paging.
+
+    `where` is a filters.Predicate; the parts that translate to SQL are
+    applied by the server, anything else is checked here, row by row.
+    """
     try:
-        connection = connect_to_prodev()
-        if connection:
+        with pooled_connection() as connection:
             cursor = connection.cursor(dictionary=True)
-            offset = 0
-            while True:
-                cursor.execute(f"SELECT user_id, name, email, age FROM user_data LIMIT {batch_size} OFFSET {offset}")
-                batch = cursor.fetchall()
-                if not batch:
-                    break
-                yield batch
-                offset += batch_size
+            position = start_position(resume_token, keyset)
+            sql, params, residual = compile_where(where)
+            for batch, position in scan_positions(cursor, batch_size, position, keyset,
+                                                  sql_filter=(sql, params)):
+                if residual is not None:
+                    batch = [row for row in batch if residual.matches(row)]
+                    if not batch:
+                        continue
+                yield Page(batch, encode_resume_token(position))
     except mysql.connector.Error as err:
         print(f"Error streaming users in batches: {err}")
-    finally:
-        if connection:
-            connection.close()
 
-def batch_processing(batch_size):
-    """Processes each batch to filter users over the age of 25."""
-    for batch in stream_users_in_batches(batch_size):
-        for user in batch:
-            if user['age'] > 25:
-                yield user
+def batch_processing(batch_size, where=Field('age') > 25):
+    """Processes each batch to filter users over the age of 25.
 
+    The filter is pushed down to the server, so rows that fail it are never
+    sent over the wire.
+    """
+    for batch in stream_users_in_batches(batch_size, where=where):
+        for user in batch:
+            yield user
@@ -1,22 +1,113 @@
 
+import queue
+import threading
+
 import mysql.connector
-from seed import connect_to_prodev
-
-def paginate_users(page_size, offset):
-    connection = connect_to_prodev()
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute(f"SELECT user_id, name, email, age FROM user_data LIMIT {page_size} OFFSET {offset}")
-    rows = cursor.fetchall()
-    connection.close()
-    return rows
-
-def lazy_paginate(page_size):
-    """Generates paginated user data, fetching pages only when needed."""
-    offset = 0
+from pool import pooled_connection
+from filters import compile_where
+from keyset import (Page, encode_resume_token, fetch_page_after, fetch_page_at_offset,
+                    next_position, scan_positions, start_position)
+
+def paginate_users(page_size, offset, where=None):
+    """Fetches one page with LIMIT/OFFSET (fallback path)."""
+    sql, params, _ = compile_where(where)
+    with pooled_connection() as connection:
+        cursor = connection.cursor(dictionary=True)
+        return fetch_page_at_offset(cursor, page_size, offset, sql_filter=(sql, params))
+
+def paginate_users_after(page_size, after=None, where=None):
+    """Fetches the page of users whose user_id sorts after `after`."""
+    sql, params, _ = compile_where(where)
+    with pooled_connection() as connection:
+        cursor = connection.cursor(dictionary=True)
+        return fetch_page_after(cursor, page_size, after, sql_filter=(sql, params))
+
+def _fetch_pages(page_size, position, keyset, where):
+    """Yields (page, next position) pairs, borrowing a pooled connection per page."""
     while True:
-        page = paginate_users(page_size, offset)
+        if keyset:
+            page = paginate_users_after(page_size, position.get("after"), where)
+        else:
+            page = paginate_users(page_size, position.get("offset", 0), where)
         if not page:
-            break
-        yield page
-        offset += page_size
+            return
+        position = next_position(page, position, keyset)
+        yield page, position
+
+_END_OF_PAGES = object()
+
+def _offer(pages, item, stop):
+    """Puts item on the queue, giving up if the consumer has gone away."""
+    while not stop.is_set():
+        try:
+            pages.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _prefetch_worker(page_size, position, keyset, where, pages, stop):
+    """Background thread: reads pages on one connection into the bounded queue."""
+    try:
+        with pooled_connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            sql, params, _ = compile_where(where)
+            for page, position in scan_positions(cursor, page_size, position, keyset,
+                                                 sql_filter=(sql, params)):
+                if not _offer(pages, (page, position), stop):
+                    return
+        _offer(pages, _END_OF_PAGES, stop)
+    except Exception as err:
+        _offer(pages, err, stop)
+
+def _prefetch_pages(page_size, position, keyset, where, depth):
+    """Yields (page, next position) pairs while a thread fetches up to `depth` pages ahead."""
+    pages = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    worker = threading.Thread(
+        target=_prefetch_worker,
+        args=(page_size, position, keyset, where, pages, stop),
+        name="lazy_paginate-prefetch",
+        daemon=True
+    )
+    worker.start()
+    try:
+        while True:
+            item = pages.get()
+            if item is _END_OF_PAGES:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        worker.join()
+
+def lazy_paginate(page_size, resume_token=None, keyset=True, where=None, prefetch=0):
+    """Generates paginated user data, fetching pages only when needed.
+
+    Uses keyset pagination by default; each page is a Page whose
+    `resume_token` can be passed back in to pick up after it later.
+    `where` (a filters.Predicate) is applied in SQL where possible; the
+    remainder is checked in Python, so such pages may hold fewer rows.
 
+    With prefetch=N a background thread keeps up to N pages queued ahead of
+    the consumer, reading them all over one pooled connection. Errors
+    from the fetch thread are re-raised here, and closing the generator
+    early stops the thread and returns its connection.
+    """
+    position = start_position(resume_token, keyset)
+    residual = compile_where(where)[2]
+    if prefetch > 0:
+        pages = _prefetch_pages(page_size, position, keyset, where, prefetch)
+    else:
+        pages = _fetch_pages(page_size, position, keyset, where)
+    try:
+        for page, position in pages:
+            if residual is not None:
+                page = [row for row in page if residual.matches(row)]
+                if not page:
+                    continue
+            yield Page(page, encode_resume_token(position))
+    finally:
+        pages.close()
@@ -1,25 +1,50 @@
 
 import mysql.connector
-from seed import connect_to_prodev
+from age_summary import read_summary
+from pool import pooled_connection
+from rows import DEFAULT_ARRAYSIZE, fetch_in_chunks
+from streaming_stats import summarize
 
-def stream_user_ages():
-    """Generates user ages from the database one by one."""
-    connection = None
+# ER_NO_SUCH_TABLE: the summary is not installed, which is an expected fallback.
+NO_SUCH_TABLE = 1146
+
+def stream_user_ages(arraysize=DEFAULT_ARRAYSIZE):
+    """Generates user ages from the database one by one.
+
+    Rows are read from an unbuffered tuple cursor in fetchmany(arraysize)
+    chunks rather than as one dict per row.
+    """
     try:
-        connection = connect_to_prodev()
-        if connection:
-            cursor = connection.cursor(dictionary=True)
+        with pooled_connection() as connection:
+            cursor = connection.cursor(buffered=False)
             cursor.execute("SELECT age FROM user_data")
-            for row in cursor:
-                yield row['age']
+            for (age,) in fetch_in_chunks(cursor, arraysize):
+                yield age
     except mysql.connector.Error as err:
         print(f"Error streaming user ages: {err}")
-    finally:
-        if connection:
-            connection.close()
+
+def user_age_stats():
+    """Reads count, mean, variance, min, max and bucket counts from user_age_summary.
+
+    Returns None when the summary table is missing or unreadable.
+    """
+    try:
+        with pooled_connection() as connection:
+            return read_summary(connection)
+    except mysql.connector.Error as err:
+        if err.errno != NO_SUCH_TABLE:
+            print(f"Error reading user_age_summary: {err}")
+        return None
 
 def calculate_average_age():
-    """Calculates the average age of users using the stream_user_ages generator."""
+    """Calculates the average age of users.
+
+    Reads the trigger-maintained user_age_summary when it is available, and
+    falls back to a scan with the stream_user_ages generator otherwise.
+    """
+    stats = user_age_stats()
+    if stats is not None:
+        return stats["mean"] if stats["count"] else 0
     total_age = 0
     count = 0
     for age in stream_user_ages():
@@ -30,6 +55,15 @@ def calculate_average_age():
         return total_age / count
     return 0
 
+def summarize_user_ages(stats=("count", "mean", "variance", "min", "max"),
+                        quantiles=(0.5, 0.9, 0.99), histogram=(0, 130, 13)):
+    """Computes several age statistics in a single scan of stream_user_ages.
+
+    When only count/mean/min/max are requested the work is pushed down to SQL
+    and no rows are streamed at all.
+    """
+    return summarize(stream_user_ages, stats, quantiles, histogram, pushdown=True)
+
 if __name__ == "__main__":
     average_age = calculate_average_age()
     print(f"Average age of users: {average_age}")
@@ -0,0 +1,203 @@
+#!/usr/bin/python3
+"""Maintains user_age_summary, a per-bucket rollup of user_data.age.
+
+    python3 age_summary.py show      # print the summary
+    python3 age_summary.py check     # compare it with a full scan
+    python3 age_summary.py rebuild   # install the triggers if needed and repair it from a full scan
+"""
+import argparse
+import math
+
+import mysql.connector
+
+BUCKET_WIDTH = 10
+TRIGGERS = ("user_age_summary_insert", "user_age_summary_delete", "user_age_summary_update")
+
+CREATE_SUMMARY_SQL = """
+    CREATE TABLE IF NOT EXISTS user_age_summary (
+        bucket INT PRIMARY KEY,
+        user_count BIGINT NOT NULL,
+        age_sum BIGINT NOT NULL,
+        age_sum_squares BIGINT NOT NULL,
+        min_age INT NULL,
+        max_age INT NULL
+    )
+"""
+
+# Trigger bodies; each runs inside the transaction of the write that fired it.
+_ADD_AGE = f"""
+    INSERT INTO user_age_summary
+        (bucket, user_count, age_sum, age_sum_squares, min_age, max_age)
+    VALUES (FLOOR(NEW.age / {BUCKET_WIDTH}), 1, NEW.age, NEW.age * NEW.age, NEW.age, NEW.age)
+    ON DUPLICATE KEY UPDATE
+        user_count = user_count + 1,
+        age_sum = age_sum + NEW.age,
+        age_sum_squares = age_sum_squares + NEW.age * NEW.age,
+        min_age = LEAST(COALESCE(min_age, NEW.age), NEW.age),
+        max_age = GREATEST(COALESCE(max_age, NEW.age), NEW.age);
+"""
+
+# Counts and sums are decremented; min/max are only re-read from the bucket's
+# rows when the removed age was one of them. That re-read is a range query on
+# user_data.age, so without an index on age a delete (or an update moving an
+# age out of a bucket) that removes a bucket's min or max scans the table.
+_REMOVE_AGE = f"""
+    UPDATE user_age_summary
+    SET user_count = user_count - 1,
+        age_sum = age_sum - OLD.age,
+        age_sum_squares = age_sum_squares - OLD.age * OLD.age
+    WHERE bucket = FLOOR(OLD.age / {BUCKET_WIDTH});
+    UPDATE user_age_summary
+    SET min_age = (SELECT MIN(age) FROM user_data
+                   WHERE age >= bucket * {BUCKET_WIDTH} AND age < (bucket + 1) * {BUCKET_WIDTH}),
+        max_age = (SELECT MAX(age) FROM user_data
+                   WHERE age >= bucket * {BUCKET_WIDTH} AND age < (bucket + 1) * {BUCKET_WIDTH})
+    WHERE bucket = FLOOR(OLD.age / {BUCKET_WIDTH}) AND OLD.age IN (min_age, max_age);
+"""
+
+CREATE_TRIGGER_SQL = {
+    "user_age_summary_insert":
+        f"CREATE TRIGGER user_age_summary_insert AFTER INSERT ON user_data "
+        f"FOR EACH ROW BEGIN {_ADD_AGE} END",
+    "user_age_summary_delete":
+        f"CREATE TRIGGER user_age_summary_delete AFTER DELETE ON user_data "
+        f"FOR EACH ROW BEGIN {_REMOVE_AGE} END",
+    "user_age_summary_update":
+        f"CREATE TRIGGER user_age_summary_update AFTER UPDATE ON user_data "
+        f"FOR EACH ROW BEGIN IF NOT (OLD.age <=> NEW.age) THEN {_REMOVE_AGE} {_ADD_AGE} END IF; END",
+}
+
+SCAN_SQL = f"""
+    SELECT FLOOR(age / {BUCKET_WIDTH}), COUNT(*), SUM(age), SUM(age * age), MIN(age), MAX(age)
+    FROM user_data
+    GROUP BY FLOOR(age / {BUCKET_WIDTH})
+"""
+
+REBUILD_SQL = """
+    INSERT INTO user_age_summary
+        (bucket, user_count, age_sum, age_sum_squares, min_age, max_age)
+""" + SCAN_SQL
+
+SELECT_SUMMARY_SQL = """
+    SELECT bucket, user_count, age_sum, age_sum_squares, min_age, max_age
+    FROM user_age_summary
+    WHERE user_count > 0
+    ORDER BY bucket
+"""
+
+
+def install_summary(connection):
+    """Creates user_age_summary and the user_data triggers that keep it current.
+
+    Every INSERT, DELETE or UPDATE of user_data (including INSERT IGNORE and
+    LOAD DATA) then updates the summary in the same transaction. The summary
+    is filled from a full scan only when the triggers are first installed.
+    """
+    try:
+        cursor = connection.cursor()
+        cursor.execute(CREATE_SUMMARY_SQL)
+        cursor.execute(
+            "SELECT TRIGGER_NAME FROM information_schema.TRIGGERS "
+            "WHERE EVENT_OBJECT_SCHEMA = DATABASE() AND EVENT_OBJECT_TABLE = 'user_data'"
+        )
+        existing = {name for (name,) in cursor.fetchall()}
+        missing = [name for name in TRIGGERS if name not in existing]
+        for name in missing:
+            cursor.execute(CREATE_TRIGGER_SQL[name])
+        cursor.close()
+        if missing:
+            rebuild_summary(connection)
+        print("Table user_age_summary created successfully or already exists.")
+    except mysql.connector.Error as err:
+        print(f"Error creating user_age_summary: {err}")
+        # Without its triggers the table would go stale; readers fall back to a scan.
+        try:
+            cursor = connection.cursor()
+            cursor.execute("DROP TABLE IF EXISTS user_age_summary")
+            cursor.close()
+        except mysql.connector.Error:
+            pass
+
+
+def rebuild_summary(connection):
+    """Recomputes user_age_summary from a full scan of user_data, in one transaction."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("DELETE FROM user_age_summary")
+        cursor.execute(REBUILD_SQL)
+        connection.commit()
+    except mysql.connector.Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def summary_stats(buckets):
+    """Folds (bucket, count, sum, sum of squares, min, max) rows into overall age stats."""
+    count = sum(int(row[1]) for row in buckets)
+    if not count:
+        return {"count": 0, "mean": None, "variance": 0.0, "stddev": 0.0,
+                "min": None, "max": None, "buckets": {}}
+    total = sum(int(row[2]) for row in buckets)
+    squares = sum(int(row[3]) for row in buckets)
+    mean = total / count
+    variance = max(squares / count - mean * mean, 0.0)
+    return {
+        "count": count,
+        "mean": mean,
+        "variance": variance,
+        "stddev": math.sqrt(variance),
+        "min": min(row[4] for row in buckets),
+        "max": max(row[5] for row in buckets),
+        "buckets": {int(row[0]) * BUCKET_WIDTH: int(row[1]) for row in buckets},
+    }
+
+
+def read_summary(connection):
+    """Returns count, mean, variance, min, max and per-bucket counts from the summary.
+
+    Reads one row per age bucket, however many users there are.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(SELECT_SUMMARY_SQL)
+        return summary_stats(cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def scan_summary(connection):
+    """The same statistics computed from user_data itself, for checking the summary."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(SCAN_SQL)
+        return summary_stats(sorted(cursor.fetchall()))
+    finally:
+        cursor.close()
+
+
+if __name__ == "__main__":
+    from seed import connect_to_prodev
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=("show", "check", "rebuild"))
+    args = parser.parse_args()
+    connection = connect_to_prodev()
+    if connection is None:
+        raise SystemExit(1)
+    try:
+        if args.command == "rebuild":
+            install_summary(connection)
+            rebuild_summary(connection)
+        summary = read_summary(connection)
+        if args.command == "check":
+            expected = scan_summary(connection)
+            if summary != expected:
+                print(f"user_age_summary is stale:\n  summary: {summary}\n  scan:    {expected}")
+                raise SystemExit(1)
+            print("user_age_summary matches user_data.")
+        else:
+            print(summary)
+    finally:
+        connection.close()
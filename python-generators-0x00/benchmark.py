@@ -0,0 +1,206 @@
+#!/usr/bin/python3
+"""Benchmarks for the user_data streaming generators.
+
+Every case runs in a fresh child process, so the peak RSS reported for a
+case belongs to that case alone. Cases run against the local MySQL
+ALX_prodev database, or against a SQLite stand-in filled with synthetic
+rows so the suite also works on a dev box without MySQL:
+
+    python3 benchmark.py --backend sqlite --rows 1000000 --suite paging --suite rows
+"""
+import argparse
+import functools
+import multiprocessing
+import os
+import queue
+import resource
+import sys
+import tempfile
+import time
+
+import columnar
+import pool
+import seed
+import sqlite_standin
+import synthetic_data
+batch_processing_module = __import__("1-batch_processing")
+
+BATCH_SIZES = (100, 1000, 10000)
+
+
+def stream_cases(arraysize=1000):
+    """dict vs tuple/namedtuple/record rows from stream_users, plus stream_user_ages."""
+    return [
+        ("stream_users dict", "0-stream_users", "stream_users", {"row_format": "dict"}),
+        ("stream_users tuple", "0-stream_users", "stream_users",
+         {"row_format": "tuple", "arraysize": arraysize}),
+        ("stream_users namedtuple", "0-stream_users", "stream_users",
+         {"row_format": "namedtuple", "arraysize": arraysize}),
+        ("stream_users record", "0-stream_users", "stream_users",
+         {"row_format": "record", "arraysize": arraysize}),
+        ("stream_user_ages", "4-stream_ages", "stream_user_ages", {"arraysize": arraysize}),
+    ]
+
+
+def paging_cases(batch_sizes=BATCH_SIZES):
+    """Keyset vs OFFSET paging over a range of batch sizes, plus prefetching."""
+    cases = []
+    for size in batch_sizes:
+        cases += [
+            (f"batches keyset {size}", "1-batch_processing", "stream_users_in_batches",
+             {"batch_size": size}),
+            (f"batches offset {size}", "1-batch_processing", "stream_users_in_batches",
+             {"batch_size": size, "keyset": False}),
+            (f"lazy_paginate keyset {size}", "2-lazy_paginate", "lazy_paginate",
+             {"page_size": size}),
+            (f"lazy_paginate prefetch {size}", "2-lazy_paginate", "lazy_paginate",
+             {"page_size": size, "prefetch": 2}),
+        ]
+    return cases
+
+
+COLUMNAR_CASES = [
+    ("age > 25 row-at-a-time", "benchmark", "rows_over_25", {"batch_size": 1000}),
+    ("age > 25 columnar array", "columnar", "batch_processing_columnar",
+     {"batch_size": 1000, "use_numpy": False}),
+    ("age > 25 columnar numpy", "columnar", "batch_processing_columnar",
+     {"batch_size": 1000, "use_numpy": True}),
+    ("average age row-at-a-time", "benchmark", "average_age_rows", {"batch_size": 1000}),
+    ("average age columnar array", "benchmark", "average_age_columnar",
+     {"batch_size": 1000, "use_numpy": False}),
+    ("average age columnar numpy", "benchmark", "average_age_columnar",
+     {"batch_size": 1000, "use_numpy": True}),
+]
+
+
+def rows_over_25(batch_size):
+    """Row-at-a-time baseline: dict batches filtered in Python."""
+    for batch in batch_processing_module.stream_users_in_batches(batch_size):
+        for user in batch:
+            if user["age"] > 25:
+                yield user
+
+
+def average_age_rows(batch_size):
+    """Row-at-a-time baseline for the average age; yields each batch once it is summed."""
+    total = count = 0
+    for batch in batch_processing_module.stream_users_in_batches(batch_size):
+        for user in batch:
+            total += user["age"]
+            count += 1
+        yield batch
+
+
+def average_age_columnar(batch_size, use_numpy):
+    """Columnar counterpart of average_age_rows."""
+    total = count = 0
+    for batch in columnar.stream_user_columns(batch_size, use_numpy=use_numpy):
+        total += columnar.age_total(batch)
+        count += len(batch)
+        yield batch
+
+
+def use_backend(backend, sqlite_path=None):
+    """Points the process-wide connection pool at MySQL or at the SQLite stand-in."""
+    if backend == "sqlite":
+        pool.configure_pool(connect=functools.partial(sqlite_standin.connect, sqlite_path))
+    else:
+        pool.configure_pool()
+
+
+def prepare_sqlite(path, rows, data_seed=0):
+    """Fills the SQLite stand-in at `path` with `rows` synthetic users unless it already has them."""
+    connection = sqlite_standin.connect(path)
+    try:
+        seed.create_table(connection, summary=False)
+        cursor = connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM user_data")
+        if cursor.fetchone()[0] == rows:
+            return
+        cursor.execute("DELETE FROM user_data")
+        connection.commit()
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = os.path.join(directory, "synthetic_users.csv")
+            synthetic_data.write_csv(csv_path, rows, data_seed)
+            seed.bulk_insert_data(connection, csv_path, chunk_size=50000, resume=False)
+    finally:
+        connection.close()
+
+
+def peak_rss_mb():
+    """Returns this process's peak resident set size in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def _run_case(module_name, func_name, kwargs, backend, results):
+    use_backend(*backend)
+    func = getattr(__import__(module_name), func_name)
+    rows = 0
+    first_row = None
+    start = time.perf_counter()
+    for item in func(**kwargs):
+        if first_row is None:
+            first_row = time.perf_counter() - start
+        batched = hasattr(item, "__len__") and not isinstance(item, (dict, tuple))
+        rows += len(item) if batched else 1
+    elapsed = time.perf_counter() - start
+    results.put((rows, elapsed, first_row or 0.0, peak_rss_mb()))
+
+
+def run_case(module_name, func_name, kwargs, backend=("mysql",)):
+    """Runs one generator to exhaustion in a child process and returns its measurements."""
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    child = ctx.Process(target=_run_case, args=(module_name, func_name, kwargs, backend, results))
+    child.start()
+    while True:
+        try:
+            measurement = results.get(timeout=1)
+            break
+        except queue.Empty:
+            if not child.is_alive():
+                raise RuntimeError(f"{module_name}.{func_name} failed (exit code {child.exitcode})")
+    child.join()
+    return measurement
+
+
+def report(cases, backend=("mysql",)):
+    """Runs every case and prints rows/sec, time to first row and peak RSS."""
+    print(f"{'case':<32} {'rows':>10} {'rows/sec':>12} {'first row':>10} {'peak RSS':>10}")
+    for label, module_name, func_name, kwargs in cases:
+        rows, elapsed, first_row, rss = run_case(module_name, func_name, kwargs, backend)
+        rate = rows / elapsed if elapsed else 0.0
+        print(f"{label:<32} {rows:>10} {rate:>12,.0f} {first_row * 1000:>8.1f}ms {rss:>8.1f}MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=("mysql", "sqlite"), default="mysql")
+    parser.add_argument("--sqlite-path", default=os.path.join(tempfile.gettempdir(),
+                                                              "user_data_bench.sqlite"))
+    parser.add_argument("--rows", type=int, default=100000,
+                        help="synthetic rows to load into the SQLite stand-in")
+    parser.add_argument("--suite", action="append",
+                        choices=("rows", "paging", "columnar"),
+                        help="suites to run (default: rows and paging)")
+    parser.add_argument("--arraysize", type=int, default=1000,
+                        help="fetchmany size for the tuple-based cases")
+    parser.add_argument("--batch-size", type=int, action="append",
+                        help="batch sizes for the paging suite (default: 100, 1000, 10000)")
+    args = parser.parse_args()
+
+    backend = ("mysql",)
+    if args.backend == "sqlite":
+        prepare_sqlite(args.sqlite_path, args.rows)
+        backend = ("sqlite", args.sqlite_path)
+    suites = {
+        "rows": lambda: stream_cases(args.arraysize),
+        "paging": lambda: paging_cases(args.batch_size or BATCH_SIZES),
+        "columnar": lambda: COLUMNAR_CASES,
+    }
+    for name in args.suite or ("rows", "paging"):
+        print(f"\n== {name} ({args.backend}) ==")
+        report(suites[name](), backend)
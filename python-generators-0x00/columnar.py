@@ -0,0 +1,114 @@
+
+from array import array
+from itertools import compress
+
+import mysql.connector
+from pool import pooled_connection
+from filters import compile_where
+from keyset import scan_pages
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; fall back to array('i') + lists
+    np = None
+
+if np is not None:
+    USER_DTYPE = np.dtype([
+        ("user_id", "U36"),
+        ("name", object),
+        ("email", object),
+        ("age", np.int32),
+    ])
+
+
+class UserColumns:
+    """A batch of users stored column-wise: lists for strings, array('i') for age."""
+
+    __slots__ = ("user_id", "name", "email", "age")
+
+    def __init__(self, user_id, name, email, age):
+        self.user_id = user_id
+        self.name = name
+        self.email = email
+        self.age = age
+
+    @classmethod
+    def from_rows(cls, rows):
+        if not rows:
+            return cls([], [], [], array("i"))
+        user_id, name, email, age = zip(*rows)
+        return cls(list(user_id), list(name), list(email), array("i", age))
+
+    def __len__(self):
+        return len(self.age)
+
+    def select(self, mask):
+        """Returns the rows where mask is true as a new UserColumns."""
+        return UserColumns(
+            list(compress(self.user_id, mask)),
+            list(compress(self.name, mask)),
+            list(compress(self.email, mask)),
+            array("i", compress(self.age, mask)),
+        )
+
+
+def to_columns(rows, use_numpy=None):
+    """Turns tuple rows into a NumPy structured array, or UserColumns without NumPy."""
+    if use_numpy is None:
+        use_numpy = np is not None
+    if use_numpy:
+        if np is None:
+            raise RuntimeError("numpy is not installed")
+        return np.array(rows, dtype=USER_DTYPE)
+    return UserColumns.from_rows(rows)
+
+
+def stream_user_columns(batch_size, where=None, use_numpy=None):
+    """Generates user data in column-oriented batches.
+
+    Each batch is a NumPy structured array (fields user_id, name, email, age)
+    when numpy is available, otherwise a UserColumns. Pages are read with
+    keyset pagination from a tuple cursor, so no per-row dicts are built.
+    `where` predicates must translate fully to SQL.
+    """
+    sql, params, residual = compile_where(where)
+    if residual is not None:
+        raise ValueError("Columnar streaming only supports filters that compile to SQL")
+    try:
+        with pooled_connection() as connection:
+            for rows in scan_pages(connection.cursor(), batch_size, sql_filter=(sql, params)):
+                yield to_columns(rows, use_numpy)
+    except mysql.connector.Error as err:
+        print(f"Error streaming user columns: {err}")
+
+
+def filter_age_above(batch, min_age):
+    """Keeps users older than min_age, vectorized over the whole batch."""
+    if np is not None and isinstance(batch, np.ndarray):
+        return batch[batch["age"] > min_age]
+    return batch.select([age > min_age for age in batch.age])
+
+
+def age_total(batch):
+    """Sum of the age column of a batch."""
+    if np is not None and isinstance(batch, np.ndarray):
+        return int(batch["age"].sum(dtype=np.int64))
+    return sum(batch.age)
+
+
+def batch_processing_columnar(batch_size, min_age=25, use_numpy=None):
+    """Columnar counterpart of batch_processing: yields filtered column batches."""
+    for batch in stream_user_columns(batch_size, use_numpy=use_numpy):
+        selected = filter_age_above(batch, min_age)
+        if len(selected):
+            yield selected
+
+
+def calculate_average_age_columnar(batch_size=10000, use_numpy=None):
+    """Average age computed batch by batch over the age column."""
+    total = 0
+    count = 0
+    for batch in stream_user_columns(batch_size, use_numpy=use_numpy):
+        total += age_total(batch)
+        count += len(batch)
+    return total / count if count else 0
@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+"""Streams user_data to CSV or JSON Lines files with optional compression.
+
+    python3 export.py users.jsonl.gz --format jsonl --compression gzip
+    python3 export.py exports/ --shards 8 --compression zstd
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from pool import pooled_connection
+from keyset import scan_pages
+from sharded_scan import key_ranges
+
+try:
+    import zstandard
+except ImportError:  # zstd output is optional: pip install zstandard
+    zstandard = None
+
+COLUMNS = ("user_id", "name", "email", "age")
+FORMATS = ("csv", "jsonl")
+COMPRESSIONS = (None, "gzip", "zstd")
+EXTENSIONS = {None: "", "gzip": ".gz", "zstd": ".zst"}
+BLOCK_SIZE = 1 << 20
+
+
+def open_output(path, compression=None):
+    """Opens `path` for binary writing through the requested compressor."""
+    if compression is None:
+        return open(path, "wb", buffering=BLOCK_SIZE)
+    if compression == "gzip":
+        return gzip.open(path, "wb", compresslevel=6)
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd compression needs the zstandard package")
+        return zstandard.ZstdCompressor(level=3).stream_writer(open(path, "wb"))
+    raise ValueError(f"Unknown compression: {compression!r}")
+
+
+def scan_users(batch_size=10000, low=None, high=None):
+    """Yields user tuples in user_id order, optionally only within [low, high)."""
+    with pooled_connection() as connection:
+        for rows in scan_pages(connection.cursor(), batch_size, low=low, high=high):
+            yield from rows
+
+
+def export_users(path, fmt="csv", compression=None, block_size=BLOCK_SIZE,
+                 low=None, high=None, progress_every=100000, batch_size=10000):
+    """Writes user_data to `path`, optionally only the key range [low, high).
+
+    Rows are formatted into an in-memory text block that is encoded and
+    written once it reaches `block_size` bytes, so memory use is bounded by
+    the block and one fetched page whatever the table size. Prints progress
+    every `progress_every` rows and returns the number of rows written.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt!r}")
+    rows_written = 0
+    start = time.perf_counter()
+    block = io.StringIO()
+    writer = csv.writer(block, lineterminator="\n") if fmt == "csv" else None
+    with open_output(path, compression) as out:
+        if writer is not None:
+            writer.writerow(COLUMNS)
+        for row in scan_users(batch_size, low, high):
+            if writer is not None:
+                writer.writerow(row)
+            else:
+                block.write(json.dumps(dict(zip(COLUMNS, row)), ensure_ascii=False))
+                block.write("\n")
+            rows_written += 1
+            if block.tell() >= block_size:
+                out.write(block.getvalue().encode("utf-8"))
+                block.seek(0)
+                block.truncate()
+            if progress_every and rows_written % progress_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"{path}: {rows_written} rows ({rows_written / elapsed:,.0f} rows/sec)")
+        out.write(block.getvalue().encode("utf-8"))
+    return rows_written
+
+
+def shard_path(directory, index, shards, fmt, compression):
+    return os.path.join(
+        directory, f"user_data-{index:05d}-of-{shards:05d}.{fmt}{EXTENSIONS[compression]}"
+    )
+
+
+def export_users_sharded(directory, shards, fmt="csv", compression=None, workers=None,
+                         block_size=BLOCK_SIZE):
+    """Exports user_data as `shards` files, one per user_id range, written in parallel.
+
+    Returns a list of (path, rows written) in key order.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=workers or min(shards, os.cpu_count() or 1)) as executor:
+        futures = []
+        for index, (low, high) in enumerate(key_ranges(shards)):
+            path = shard_path(directory, index, shards, fmt, compression)
+            futures.append((path, executor.submit(
+                export_users, path, fmt, compression, block_size, low, high, 0
+            )))
+        return [(path, future.result()) for path, future in futures]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="output file, or directory when --shards is given")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--compression", choices=("gzip", "zstd"))
+    parser.add_argument("--shards", type=int, help="split into N files by user_id range")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+    if args.shards:
+        for path, rows in export_users_sharded(args.path, args.shards, args.format,
+                                               args.compression, args.workers):
+            print(f"{path}: {rows} rows")
+    else:
+        rows = export_users(args.path, args.format, args.compression)
+        print(f"{args.path}: {rows} rows")
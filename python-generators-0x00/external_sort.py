@@ -0,0 +1,135 @@
+
+import heapq
+import os
+import pickle
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from filters import FILTER_COLUMNS, column_value
+
+DEFAULT_RUN_SIZE = 100000
+# Rows pickled per record in a run file; amortizes pickle overhead per row.
+BLOCK_ROWS = 1000
+MAX_FAN_IN = 128
+
+
+class ColumnKey:
+    """Sort key over one or more user columns; picklable, unlike a lambda."""
+
+    def __init__(self, columns):
+        if isinstance(columns, str):
+            columns = (columns,)
+        unknown = [column for column in columns if column not in FILTER_COLUMNS]
+        if not columns or unknown:
+            raise ValueError(f"Cannot sort by {unknown or columns!r}")
+        self.columns = tuple(columns)
+
+    def __call__(self, row):
+        if len(self.columns) == 1:
+            return column_value(row, self.columns[0])
+        return tuple(column_value(row, column) for column in self.columns)
+
+
+def _write_rows(path, rows):
+    with open(path, "wb") as f:
+        for start in range(0, len(rows), BLOCK_ROWS):
+            pickle.dump(rows[start:start + BLOCK_ROWS], f, pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def _sort_run(rows, key, reverse, path):
+    """Sorts one run and spills it to `path`; runs in a worker process."""
+    rows.sort(key=key, reverse=reverse)
+    return _write_rows(path, rows)
+
+
+def _read_run(path):
+    with open(path, "rb", buffering=1 << 20) as f:
+        while True:
+            try:
+                block = pickle.load(f)
+            except EOFError:
+                return
+            yield from block
+
+
+def _merge_runs(paths, key, reverse, path):
+    """Merges sorted run files into one larger run at `path`."""
+    with open(path, "wb") as f:
+        merged = heapq.merge(*(_read_run(run) for run in paths), key=key, reverse=reverse)
+        while True:
+            block = list(islice(merged, BLOCK_ROWS))
+            if not block:
+                break
+            pickle.dump(block, f, pickle.HIGHEST_PROTOCOL)
+    for run in paths:
+        os.remove(run)
+    return path
+
+
+def external_sort(source, key, reverse=False, run_size=DEFAULT_RUN_SIZE, workers=None,
+                  tmpdir=None, max_fan_in=MAX_FAN_IN):
+    """Yields the rows of `source` in key order without holding them all in memory.
+
+    `key` is a column name, a tuple of column names, or any picklable
+    callable. Rows are read in runs of `run_size`; each full run is sorted
+    and spilled to a temp file by a pool of `workers` processes (0 sorts
+    in this process), then the runs are merged lazily with heapq.merge.
+    At most `workers` runs are in flight while reading, so memory is about
+    (workers + 1) * run_size rows. The sort is stable; input that fits in
+    one run is sorted in memory and never touches disk.
+    """
+    if not callable(key):
+        key = ColumnKey(key)
+    if workers is None:
+        workers = min(4, os.cpu_count() or 1)
+    rows_in = iter(source)
+    first = list(islice(rows_in, run_size))
+    if len(first) < run_size:
+        first.sort(key=key, reverse=reverse)
+        yield from first
+        return
+
+    directory = tempfile.mkdtemp(prefix="external_sort-", dir=tmpdir)
+    executor = ProcessPoolExecutor(max_workers=workers) if workers else None
+    try:
+        runs = []
+        in_flight = deque()
+        rows = first
+        while rows:
+            path = os.path.join(directory, f"run-{len(runs) + len(in_flight):06d}")
+            if executor is None:
+                runs.append(_sort_run(rows, key, reverse, path))
+            else:
+                in_flight.append(executor.submit(_sort_run, rows, key, reverse, path))
+                if len(in_flight) >= workers:
+                    runs.append(in_flight.popleft().result())
+            rows = list(islice(rows_in, run_size))
+        runs.extend(future.result() for future in in_flight)
+        in_flight.clear()
+
+        # Too many open runs cost file handles and heap depth; merge them in passes.
+        merge_pass = 0
+        while len(runs) > max_fan_in:
+            merge_pass += 1
+            groups = [runs[start:start + max_fan_in] for start in range(0, len(runs), max_fan_in)]
+            paths = [os.path.join(directory, f"merge-{merge_pass}-{index:06d}")
+                     for index in range(len(groups))]
+            if executor is None:
+                runs = [_merge_runs(group, key, reverse, path) for group, path in zip(groups, paths)]
+            else:
+                runs = list(executor.map(_merge_runs, groups, [key] * len(groups),
+                                         [reverse] * len(groups), paths))
+        if executor is not None:
+            executor.shutdown()
+            executor = None
+        yield from heapq.merge(*(_read_run(path) for path in runs), key=key, reverse=reverse)
+    finally:
+        if executor is not None:
+            for future in in_flight:
+                future.cancel()
+            executor.shutdown(wait=True, cancel_futures=True)
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,199 @@
+
+import operator
+from abc import ABC, abstractmethod
+
+# Columns a filter may reference, in the order the generators select them.
+FILTER_COLUMNS = ("user_id", "name", "email", "age")
+
+OPERATORS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def column_value(row, name):
+    """Reads a column from a dict, a named row (namedtuple/UserRecord) or a plain tuple."""
+    if isinstance(row, dict):
+        return row[name]
+    if hasattr(row, name):
+        return getattr(row, name)
+    return row[FILTER_COLUMNS.index(name)]
+
+
+class Predicate(ABC):
+    """A filter over user rows, combinable with & (AND) and | (OR).
+
+    to_sql() returns a parameterized (sql, params) pair, or None when the
+    predicate can only be evaluated in Python; matches(row) evaluates it
+    in Python either way.
+    """
+
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+    def to_sql(self):
+        return None
+
+    @abstractmethod
+    def matches(self, row):
+        """True if the row (a dict, tuple or record) satisfies the predicate."""
+
+
+class Field:
+    """Names a column; comparing it builds a Predicate, e.g. Field('age') > 25."""
+
+    def __init__(self, name):
+        if name not in FILTER_COLUMNS:
+            raise ValueError(f"Unknown column: {name!r}")
+        self.name = name
+
+    def __eq__(self, value):
+        return Compare(self.name, "=", value)
+
+    def __ne__(self, value):
+        return Compare(self.name, "!=", value)
+
+    def __lt__(self, value):
+        return Compare(self.name, "<", value)
+
+    def __le__(self, value):
+        return Compare(self.name, "<=", value)
+
+    def __gt__(self, value):
+        return Compare(self.name, ">", value)
+
+    def __ge__(self, value):
+        return Compare(self.name, ">=", value)
+
+    __hash__ = None
+
+    def isin(self, values):
+        return In(self.name, values)
+
+    def between(self, low, high):
+        """Inclusive range, like SQL BETWEEN."""
+        return Between(self.name, low, high)
+
+
+class Compare(Predicate):
+    def __init__(self, name, op, value):
+        self.name = name
+        self.op = op
+        self.value = value
+
+    def to_sql(self):
+        return f"{self.name} {self.op} %s", [self.value]
+
+    def matches(self, row):
+        return OPERATORS[self.op](column_value(row, self.name), self.value)
+
+
+class In(Predicate):
+    def __init__(self, name, values):
+        self.name = name
+        self.values = tuple(values)
+
+    def to_sql(self):
+        if not self.values:
+            return "1 = 0", []
+        placeholders = ", ".join(["%s"] * len(self.values))
+        return f"{self.name} IN ({placeholders})", list(self.values)
+
+    def matches(self, row):
+        return column_value(row, self.name) in self.values
+
+
+class Between(Predicate):
+    def __init__(self, name, low, high):
+        self.name = name
+        self.low = low
+        self.high = high
+
+    def to_sql(self):
+        return f"{self.name} BETWEEN %s AND %s", [self.low, self.high]
+
+    def matches(self, row):
+        return self.low <= column_value(row, self.name) <= self.high
+
+
+class Where(Predicate):
+    """Wraps an arbitrary Python callable; always evaluated client-side."""
+
+    def __init__(self, func):
+        self.func = func
+
+    def matches(self, row):
+        return bool(self.func(row))
+
+
+class And(Predicate):
+    def __init__(self, *predicates):
+        self.predicates = tuple(
+            inner
+            for predicate in predicates
+            for inner in (predicate.predicates if isinstance(predicate, And) else (predicate,))
+        )
+
+    def to_sql(self):
+        parts = [predicate.to_sql() for predicate in self.predicates]
+        if any(part is None for part in parts):
+            return None
+        return _join(parts, "AND")
+
+    def matches(self, row):
+        return all(predicate.matches(row) for predicate in self.predicates)
+
+
+class Or(Predicate):
+    def __init__(self, *predicates):
+        self.predicates = tuple(
+            inner
+            for predicate in predicates
+            for inner in (predicate.predicates if isinstance(predicate, Or) else (predicate,))
+        )
+
+    def to_sql(self):
+        parts = [predicate.to_sql() for predicate in self.predicates]
+        if any(part is None for part in parts):
+            return None
+        return _join(parts, "OR")
+
+    def matches(self, row):
+        return any(predicate.matches(row) for predicate in self.predicates)
+
+
+def _join(parts, keyword):
+    sql = f" {keyword} ".join(f"({part_sql})" for part_sql, _ in parts)
+    params = [param for _, part_params in parts for param in part_params]
+    return sql, params
+
+
+def compile_where(where):
+    """Splits a predicate into a SQL part and a Python residual.
+
+    Returns (sql, params, residual): sql is "" when nothing can be pushed
+    down, residual is None when everything was. The top-level AND is split
+    term by term, so only the untranslatable terms are left for Python.
+    """
+    if where is None:
+        return "", [], None
+    terms = where.predicates if isinstance(where, And) else (where,)
+    pushed = []
+    residual = []
+    for term in terms:
+        part = term.to_sql()
+        if part is None:
+            residual.append(term)
+        else:
+            pushed.append(part)
+    sql, params = _join(pushed, "AND") if pushed else ("", [])
+    if not residual:
+        return sql, params, None
+    return sql, params, residual[0] if len(residual) == 1 else And(*residual)
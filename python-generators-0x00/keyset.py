@@ -0,0 +1,128 @@
+
+import base64
+import json
+
+USER_COLUMNS = "user_id, name, email, age"
+
+
+class Page(list):
+    """A batch of user rows that remembers where the next batch starts."""
+
+    def __init__(self, rows, resume_token=None):
+        super().__init__(rows)
+        self.resume_token = resume_token
+
+
+def encode_resume_token(position):
+    """Packs a scan position ({'after': key} or {'offset': n}) into an opaque token."""
+    raw = json.dumps(position, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_resume_token(token):
+    """Unpacks a token made by encode_resume_token; None means start of table."""
+    if not token:
+        return {}
+    try:
+        position = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+    except (ValueError, TypeError, AttributeError) as err:
+        raise ValueError(f"Invalid resume token: {token!r}") from err
+    if not isinstance(position, dict) or not ({"after", "offset"} & position.keys()):
+        raise ValueError(f"Invalid resume token: {token!r}")
+    return position
+
+
+def start_position(resume_token, keyset=True):
+    """Decodes a resume token, checking it was made by the same paging mode."""
+    position = decode_resume_token(resume_token)
+    if position and ("after" in position) != keyset:
+        mode = "keyset" if keyset else "offset"
+        raise ValueError(f"Resume token was not produced by {mode} paging")
+    return position
+
+
+def row_key(row):
+    """Returns the user_id of a dict or tuple row."""
+    return row["user_id"] if isinstance(row, dict) else row[0]
+
+
+def fetch_page_after(cursor, page_size, after=None, columns=USER_COLUMNS, low=None,
+                     high=None, sql_filter=None):
+    """Fetches the next page ordered by user_id, seeking past `after` instead of using OFFSET.
+
+    `low`/`high` optionally restrict the scan to the key range [low, high);
+    `sql_filter` is an extra (sql, params) condition, as built by filters.compile_where.
+    """
+    conditions = []
+    params = []
+    for condition, value in (("user_id > %s", after), ("user_id >= %s", low), ("user_id < %s", high)):
+        if value is not None:
+            conditions.append(condition)
+            params.append(value)
+    if sql_filter and sql_filter[0]:
+        conditions.append(f"({sql_filter[0]})")
+        params.extend(sql_filter[1])
+    where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+    cursor.execute(
+        f"SELECT {columns} FROM user_data {where}ORDER BY user_id LIMIT %s",
+        (*params, page_size)
+    )
+    return cursor.fetchall()
+
+
+def scan_pages(cursor, page_size, after=None, low=None, high=None, sql_filter=None,
+               columns=USER_COLUMNS):
+    """Yields successive keyset pages of up to `page_size` rows past `after`, in user_id order.
+
+    Takes the same `low`/`high` bounds and `sql_filter` as fetch_page_after
+    and stops after the first short page, so an exhausted scan costs no
+    extra query. Only one page is held at a time.
+    """
+    while True:
+        page = fetch_page_after(cursor, page_size, after, columns, low, high, sql_filter)
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        after = row_key(page[-1])
+
+
+def scan_positions(cursor, page_size, position, keyset=True, sql_filter=None):
+    """Yields (page, position after it) pairs from a decoded resume position.
+
+    Keyset positions are read with scan_pages; keyset=False pages with
+    LIMIT/OFFSET instead.
+    """
+    if keyset:
+        for page in scan_pages(cursor, page_size, position.get("after"), sql_filter=sql_filter):
+            position = next_position(page, position, keyset)
+            yield page, position
+        return
+    while True:
+        page = fetch_page_at_offset(cursor, page_size, position.get("offset", 0),
+                                    sql_filter=sql_filter)
+        if not page:
+            return
+        position = next_position(page, position, keyset)
+        yield page, position
+
+
+def fetch_page_at_offset(cursor, page_size, offset, columns=USER_COLUMNS, sql_filter=None):
+    """Fetches a page with LIMIT/OFFSET; kept as a fallback for non-keyed scans."""
+    where = ""
+    params = []
+    if sql_filter and sql_filter[0]:
+        where = f"WHERE {sql_filter[0]} "
+        params.extend(sql_filter[1])
+    cursor.execute(
+        f"SELECT {columns} FROM user_data {where}ORDER BY user_id LIMIT %s OFFSET %s",
+        (*params, page_size, offset)
+    )
+    return cursor.fetchall()
+
+
+def next_position(rows, position, keyset=True):
+    """Returns the scan position that follows `rows`."""
+    if keyset:
+        return {"after": row_key(rows[-1])}
+    return {"offset": position.get("offset", 0) + len(rows)}
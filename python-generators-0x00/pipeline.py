@@ -0,0 +1,305 @@
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+from external_sort import DEFAULT_RUN_SIZE, external_sort
+
+MODES = ("inline", "thread", "process")
+# Stages that carry state from one item to the next cannot be split over a pool.
+STATEFUL_MODES = ("inline", "thread")
+DEFAULT_QUEUE_SIZE = 64
+
+_END = object()
+
+
+class StageStats:
+    """Throughput counters for one pipeline stage."""
+
+    def __init__(self, name, workers=1):
+        self.name = name
+        self.workers = workers
+        self.items_in = 0
+        self.items_out = 0
+        self.busy = 0.0
+        self.started = None
+        self.finished = None
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def rate(self):
+        """Items emitted per second of wall time."""
+        return self.items_out / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def utilization(self):
+        """Share of the stage's worker time spent inside its function (1.0 = saturated)."""
+        capacity = self.elapsed * self.workers
+        return self.busy / capacity if capacity else 0.0
+
+
+def _timed_map(func, items):
+    start = time.perf_counter()
+    results = [func(item) for item in items]
+    return results, time.perf_counter() - start
+
+
+def _timed_filter(predicate, items):
+    start = time.perf_counter()
+    kept = [item for item in items if predicate(item)]
+    return kept, time.perf_counter() - start
+
+
+def _handoff(upstream, size, name):
+    """Runs the `upstream` generator in a background thread and yields its items.
+
+    Items pass through a queue of at most `size`, so the thread blocks while
+    the consumer is behind. Errors are re-raised to the consumer; closing
+    this generator stops the thread and closes `upstream`.
+    """
+    items = queue.Queue(maxsize=size)
+    stop = threading.Event()
+
+    def offer(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in upstream:
+                if not offer(item):
+                    return
+            offer(_END)
+        except BaseException as err:
+            offer(err)
+        finally:
+            upstream.close()
+
+    worker = threading.Thread(target=produce, name=f"pipeline-{name}", daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _END:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        worker.join()
+
+
+class Pipeline:
+    """Chains generator stages: source -> map -> filter -> sort -> batch -> window -> sink.
+
+    Every stage takes a mode. "inline" runs it in the consumer's thread,
+    pulled one item at a time. "thread" gives map/filter a thread pool and
+    runs batch/window/sort in a thread of their own; "process" gives
+    map/filter a process pool (sort spreads its runs over processes with
+    `workers` instead, and batch/window, which carry state between items,
+    have no process mode). Stages off the consumer's thread hand their
+    output on through at most `queue_size` items or chunks in flight, and
+    buffer() runs everything upstream in one background thread behind such
+    a queue, so a slow stage applies backpressure instead of letting work
+    pile up in memory. Output order is preserved. stats() / report() show
+    per-stage throughput and utilization to find the bottleneck.
+    """
+
+    def __init__(self, source, name="source"):
+        self._source = source
+        self._stages = []
+        self._stats = [StageStats(name)]
+
+    def _add(self, name, build, workers=1, mode="inline", queue_size=DEFAULT_QUEUE_SIZE):
+        if mode not in STATEFUL_MODES:
+            raise ValueError(f"Stage {name} cannot run in mode {mode!r}; use one of {STATEFUL_MODES}")
+        if mode == "thread":
+            inline = build
+
+            def build(upstream, stats):
+                return _handoff(inline(upstream, stats), queue_size, stats.name)
+        stats = StageStats(name, workers)
+        self._stages.append((build, stats))
+        self._stats.append(stats)
+        return self
+
+    def map(self, func, mode="inline", workers=1, chunksize=1,
+            queue_size=DEFAULT_QUEUE_SIZE, name=None):
+        return self._pooled(partial(_timed_map, func), mode, workers, chunksize, queue_size,
+                            name or f"map({getattr(func, '__name__', 'func')})")
+
+    def filter(self, predicate, mode="inline", workers=1, chunksize=1,
+               queue_size=DEFAULT_QUEUE_SIZE, name=None):
+        return self._pooled(partial(_timed_filter, predicate), mode, workers, chunksize,
+                            queue_size, name or f"filter({getattr(predicate, '__name__', 'func')})")
+
+    def batch(self, size, mode="inline", queue_size=DEFAULT_QUEUE_SIZE, name=None):
+        """Groups items into lists of `size` (the last one may be shorter)."""
+        def build(upstream, stats):
+            iterator = iter(upstream)
+            while True:
+                chunk = list(islice(iterator, size))
+                if not chunk:
+                    return
+                stats.items_in += len(chunk)
+                stats.items_out += 1
+                yield chunk
+        return self._add(name or f"batch({size})", build, mode=mode, queue_size=queue_size)
+
+    def window(self, size, step=None, mode="inline", queue_size=DEFAULT_QUEUE_SIZE, name=None):
+        """Yields sliding windows (tuples) of `size` items, advancing by `step` (default 1).
+
+        Windows start at items 0, step, 2 * step, ...; with step > size the
+        items between windows are skipped.
+        """
+        step = step or 1
+
+        def build(upstream, stats):
+            buffer = deque(maxlen=size)
+            for index, item in enumerate(upstream):
+                stats.items_in += 1
+                buffer.append(item)
+                # The window starting at item index - size + 1 is complete.
+                start = index - size + 1
+                if start >= 0 and start % step == 0:
+                    stats.items_out += 1
+                    yield tuple(buffer)
+        return self._add(name or f"window({size},{step})", build, mode=mode,
+                         queue_size=queue_size)
+
+    def sort(self, key, reverse=False, run_size=DEFAULT_RUN_SIZE, workers=None, mode="inline",
+             queue_size=DEFAULT_QUEUE_SIZE, name=None):
+        """Orders items by `key` (column name(s) or callable) with an external merge sort."""
+        def build(upstream, stats):
+            def counted():
+                for item in upstream:
+                    stats.items_in += 1
+                    yield item
+            for item in external_sort(counted(), key, reverse, run_size, workers):
+                stats.items_out += 1
+                yield item
+        return self._add(name or f"sort({key if not callable(key) else 'key'})", build,
+                         mode=mode, queue_size=queue_size)
+
+    def buffer(self, size=DEFAULT_QUEUE_SIZE, name=None):
+        """Runs all upstream stages in a background thread feeding a bounded queue."""
+        def build(upstream, stats):
+            items = _handoff(upstream, size, stats.name)
+            try:
+                for item in items:
+                    stats.items_in += 1
+                    stats.items_out += 1
+                    yield item
+            finally:
+                items.close()
+        return self._add(name or f"buffer({size})", build)
+
+    def _pooled(self, call, mode, workers, chunksize, queue_size, name):
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode: {mode!r}")
+
+        def build(upstream, stats):
+            iterator = iter(upstream)
+            if mode == "inline":
+                for item in iterator:
+                    stats.items_in += 1
+                    results, busy = call([item])
+                    stats.busy += busy
+                    stats.items_out += len(results)
+                    yield from results
+                return
+            executor_class = ThreadPoolExecutor if mode == "thread" else ProcessPoolExecutor
+            executor = executor_class(max_workers=workers)
+            in_flight = deque()
+            try:
+                while True:
+                    while len(in_flight) < queue_size:
+                        chunk = list(islice(iterator, chunksize))
+                        if not chunk:
+                            break
+                        stats.items_in += len(chunk)
+                        in_flight.append(executor.submit(call, chunk))
+                    if not in_flight:
+                        return
+                    results, busy = in_flight.popleft().result()
+                    stats.busy += busy
+                    stats.items_out += len(results)
+                    yield from results
+            finally:
+                for future in in_flight:
+                    future.cancel()
+                executor.shutdown(wait=True, cancel_futures=True)
+        return self._add(name, build, workers if mode != "inline" else 1)
+
+    def _counted_source(self):
+        stats = self._stats[0]
+        iterator = iter(self._source() if callable(self._source) else self._source)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                stats.busy += time.perf_counter() - started
+            stats.items_in += 1
+            stats.items_out += 1
+            yield item
+
+    def _timed(self, stream, stats):
+        stats.started = time.perf_counter()
+        try:
+            yield from stream
+        finally:
+            stats.finished = time.perf_counter()
+
+    def __iter__(self):
+        stream = self._timed(self._counted_source(), self._stats[0])
+        for build, stats in self._stages:
+            stream = self._timed(build(stream, stats), stats)
+        return iter(stream)
+
+    def sink(self, func):
+        """Runs the pipeline, calling func(item) on every output; returns the stats."""
+        stats = StageStats(f"sink({getattr(func, '__name__', 'func')})")
+        self._stats.append(stats)
+        stats.started = time.perf_counter()
+        try:
+            for item in self:
+                stats.items_in += 1
+                started = time.perf_counter()
+                func(item)
+                stats.busy += time.perf_counter() - started
+                stats.items_out += 1
+        finally:
+            stats.finished = time.perf_counter()
+        return self.stats()
+
+    def run(self):
+        """Runs the pipeline to completion, discarding the outputs."""
+        return self.sink(lambda item: None)
+
+    def stats(self):
+        return list(self._stats)
+
+    def report(self):
+        """Prints per-stage counts, throughput and utilization."""
+        print(f"{'stage':<28} {'in':>10} {'out':>10} {'items/sec':>12} {'busy':>8}")
+        for stats in self._stats:
+            print(f"{stats.name:<28} {stats.items_in:>10} {stats.items_out:>10} "
+                  f"{stats.rate:>12,.0f} {stats.utilization:>7.0%}")
@@ -0,0 +1,194 @@
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector.errors import PoolError
+from seed import connect_to_prodev
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_TIMEOUT = 30
+
+
+class ConnectionPool:
+    """A thread-safe pool of ALX_prodev connections.
+
+    Idle connections are pinged before being handed out (pre_ping) and are
+    reset when given back: any open transaction is rolled back. A
+    connection still holding an unread result (e.g. an unbuffered stream
+    closed early) is closed rather than drained, since draining would pull
+    the rest of the result over the wire. Dropped connections are counted
+    in `discarded` and replaced on demand.
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, connect=connect_to_prodev,
+                 pre_ping=True, timeout=DEFAULT_TIMEOUT):
+        self.size = size
+        self.connect = connect
+        self.pre_ping = pre_ping
+        self.timeout = timeout
+        self._idle = deque()
+        self._open = 0
+        self._available = threading.Condition()
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.discarded = 0
+
+    def acquire(self, timeout=None):
+        """Returns a live connection, waiting up to `timeout` seconds when all are in use."""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._available:
+                if not self._idle and self._open >= self.size:
+                    self.waits += 1
+                    started = time.monotonic()
+                    while not self._idle and self._open >= self.size:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0 or not self._available.wait(remaining):
+                            self.wait_time += time.monotonic() - started
+                            raise PoolError(f"No connection available within {timeout}s")
+                    self.wait_time += time.monotonic() - started
+                if self._idle:
+                    connection = self._idle.pop()
+                    reused = True
+                else:
+                    self._open += 1
+                    connection = None
+                    reused = False
+            if reused:
+                if self._is_alive(connection):
+                    with self._available:
+                        self.hits += 1
+                    return connection
+                self._discard(connection)
+                continue
+            try:
+                connection = self.connect()
+            except BaseException:
+                self._discard(None)
+                raise
+            if connection is None:
+                self._discard(None)
+                raise PoolError("Could not open a connection to ALX_prodev")
+            with self._available:
+                self.misses += 1
+            return connection
+
+    def release(self, connection):
+        """Resets a connection and returns it to the pool."""
+        if getattr(connection, "unread_result", False):
+            self._discard(connection)
+            return
+        try:
+            connection.consume_results()
+            connection.rollback()
+        except mysql.connector.Error:
+            self._discard(connection)
+            return
+        with self._available:
+            if self._open <= self.size:
+                self._idle.append(connection)
+                self._available.notify()
+                return
+        self._discard(connection)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Borrows a connection for the duration of a with block."""
+        connection = self.acquire(timeout)
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def close(self):
+        """Closes every idle connection; borrowed ones are closed when released."""
+        with self._available:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+            self.size = 0
+        for connection in idle:
+            _close_quietly(connection)
+
+    def stats(self):
+        with self._available:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "wait_time": self.wait_time,
+                "discarded": self.discarded,
+            }
+
+    def _is_alive(self, connection):
+        if not self.pre_ping:
+            return True
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except mysql.connector.Error:
+            return False
+
+    def _discard(self, connection):
+        if connection is not None:
+            _close_quietly(connection)
+        with self._available:
+            self._open -= 1
+            if connection is not None:
+                self.discarded += 1
+            self._available.notify()
+
+
+def _close_quietly(connection):
+    try:
+        connection.close()
+    except mysql.connector.Error:
+        pass
+
+
+_pool = None
+_pool_pid = None
+_pool_settings = {}
+_pool_lock = threading.Lock()
+
+
+def configure_pool(**settings):
+    """Replaces the process-wide pool, e.g. configure_pool(size=10, pre_ping=False)."""
+    global _pool, _pool_pid, _pool_settings
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.close()
+        _pool_settings = settings
+        _pool = ConnectionPool(**settings)
+        _pool_pid = os.getpid()
+    return _pool
+
+
+def get_pool():
+    """Returns the process-wide pool, creating a fresh one after a fork."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ConnectionPool(**_pool_settings)
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def pooled_connection(timeout=None):
+    """Context manager borrowing a connection from the process-wide pool."""
+    return get_pool().connection(timeout)
+
+
+def pool_stats():
+    """Hit/miss/wait counters of the process-wide pool."""
+    return get_pool().stats()
@@ -0,0 +1,50 @@
+
+from collections import namedtuple
+
+UserTuple = namedtuple("UserTuple", ["user_id", "name", "email", "age"])
+
+
+class UserRecord:
+    """A user row with named attributes and no per-instance __dict__."""
+
+    __slots__ = ("user_id", "name", "email", "age")
+
+    def __init__(self, user_id, name, email, age):
+        self.user_id = user_id
+        self.name = name
+        self.email = email
+        self.age = age
+
+    def __iter__(self):
+        return iter((self.user_id, self.name, self.email, self.age))
+
+    def __repr__(self):
+        return (f"UserRecord(user_id={self.user_id!r}, name={self.name!r}, "
+                f"email={self.email!r}, age={self.age!r})")
+
+
+ROW_FACTORIES = {
+    "tuple": None,
+    "namedtuple": UserTuple._make,
+    "record": lambda row: UserRecord(*row),
+}
+
+DEFAULT_ARRAYSIZE = 1000
+
+
+def fetch_in_chunks(cursor, arraysize=DEFAULT_ARRAYSIZE):
+    """Yields rows from an executed cursor, pulling `arraysize` rows per fetchmany call."""
+    cursor.arraysize = arraysize
+    while True:
+        rows = cursor.fetchmany(arraysize)
+        if not rows:
+            break
+        yield from rows
+
+
+def row_factory(row_format):
+    """Returns the callable that shapes a raw tuple row, or None to keep the tuple."""
+    try:
+        return ROW_FACTORIES[row_format]
+    except KeyError:
+        raise ValueError(f"Unknown row format: {row_format!r}") from None
@@ -1,8 +1,31 @@
 
 import mysql.connector
+import age_summary
 import csv
 import os
-from uuid import uuid4
+import hashlib
+import json
+import tempfile
+import time
+from uuid import UUID, uuid5
+
+from rows import fetch_in_chunks
+from sketches import BloomFilter
+
+INSERT_USER_SQL = "INSERT IGNORE INTO user_data (user_id, name, email, age) VALUES (%s, %s, %s, %s)"
+
+# Namespace for user ids: the same email always maps to the same user_id.
+USER_ID_NAMESPACE = UUID("6f1c3e52-8a0b-5d1e-9c47-2b7e4f0a9d13")
+
+# Bytes hashed at the start of the CSV and just before the checkpoint offset
+# to detect that a checkpoint no longer matches the file.
+FINGERPRINT_BYTES = 4096
+
+# Rough lower bound on the bytes per CSV row, used to size the email Bloom filter.
+MIN_CSV_ROW_BYTES = 32
+
+# Server/client error codes meaning LOAD DATA LOCAL INFILE is switched off.
+LOCAL_INFILE_DISABLED = (1148, 2068, 3948)
 
 def connect_db():
     """Connects to the MySQL database server."""
@@ -27,22 +50,27 @@ def create_database(connection):
     except mysql.connector.Error as err:
         print(f"Error creating database: {err}")
 
-def connect_to_prodev():
+def connect_to_prodev(allow_local_infile=False):
     """Connects to the ALX_prodev database in MySQL."""
     try:
         connection = mysql.connector.connect(
             host="localhost",
             user="alxuser",
             password="root",
-            database="ALX_prodev"
+            database="ALX_prodev",
+            allow_local_infile=allow_local_infile
         )
         return connection
     except mysql.connector.Error as err:
         print(f"Error connecting to ALX_prodev database: {err}")
         return None
 
-def create_table(connection):
-    """Creates a table user_data if it does not exist with the required fields."""
+def create_table(connection, summary=True):
+    """Creates a table user_data if it does not exist with the required fields.
+
+    summary=False skips the MySQL-only age summary table and triggers, for
+    the SQLite stand-in.
+    """
     try:
         cursor = connection.cursor()
         cursor.execute("""
@@ -57,26 +85,269 @@ def create_table(connection):
         cursor.close()
     except mysql.connector.Error as err:
         print(f"Error creating table: {err}")
+        return
+    if summary:
+        age_summary.install_summary(connection)
+
+def normalize_email(email):
+    """Returns the form emails are compared in: stripped and lower-cased."""
+    return email.strip().lower()
+
+def user_id_for(email):
+    """Returns the deterministic user_id for an email address."""
+    return str(uuid5(USER_ID_NAMESPACE, normalize_email(email)))
+
+def checkpoint_path(data_file):
+    """Returns where the ingest checkpoint for data_file is kept."""
+    return f"{data_file}.checkpoint"
 
-def insert_data(connection, data_file):
-    """Inserts data in the database if it does not exist."""
+def file_fingerprint(data_file, offset):
+    """Hashes the first bytes of the file and the bytes just before offset."""
+    digest = hashlib.sha1()
+    with open(data_file, 'rb') as f:
+        digest.update(f.read(min(offset, FINGERPRINT_BYTES)))
+        f.seek(max(0, offset - FINGERPRINT_BYTES))
+        digest.update(f.read(min(offset, FINGERPRINT_BYTES)))
+    return digest.hexdigest()
+
+def save_checkpoint(data_file, offset, rows, last_user_id):
+    """Atomically records how far into data_file the committed load got."""
+    checkpoint = {
+        "offset": offset,
+        "rows": rows,
+        "last_user_id": last_user_id,
+        "fingerprint": file_fingerprint(data_file, offset),
+    }
+    tmp_path = checkpoint_path(data_file) + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, checkpoint_path(data_file))
+
+def load_checkpoint(connection, data_file):
+    """Returns the saved checkpoint if it still matches the file and the table, else None.
+
+    A checkpoint is discarded when the file shrank or its leading bytes / the
+    bytes before the offset changed, or when its last loaded user is missing
+    from user_data (e.g. the table was recreated).
+    """
     try:
+        with open(checkpoint_path(data_file)) as f:
+            checkpoint = json.load(f)
+        if os.path.getsize(data_file) < checkpoint["offset"]:
+            return None
+        if file_fingerprint(data_file, checkpoint["offset"]) != checkpoint["fingerprint"]:
+            return None
+    except (OSError, ValueError, KeyError):
+        return None
+    cursor = connection.cursor()
+    cursor.execute("SELECT 1 FROM user_data WHERE user_id = %s", (checkpoint["last_user_id"],))
+    found = cursor.fetchone()
+    cursor.close()
+    return checkpoint if found else None
+
+def iter_csv_rows(data_file, start_offset=0):
+    """Yields ((name, email, age), end_offset) pairs, starting at a byte offset.
+
+    end_offset is the byte position just past the row, suitable for a later
+    start_offset. A final line without a trailing newline counts as a
+    complete row, so a resumed load does not read it again. The header is
+    skipped when reading from the start.
+    """
+    consumed = [start_offset]
+
+    def lines(f):
+        for line in f:
+            consumed[0] += len(line)
+            yield line.decode('utf-8')
+
+    with open(data_file, 'rb') as f:
+        f.seek(start_offset)
+        reader = csv.reader(lines(f))
+        if start_offset == 0:
+            next(reader, None)  # Skip header
+        for row in reader:
+            if row:
+                yield row, consumed[0]
+
+def read_csv_chunks(data_file, chunk_size, start_offset=0):
+    """Yields (rows, end_offset) with at most chunk_size (name, email, age) rows per chunk."""
+    chunk = []
+    end_offset = start_offset
+    for row, end_offset in iter_csv_rows(data_file, start_offset):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk, end_offset
+            chunk = []
+    if chunk:
+        yield chunk, end_offset
+
+def resume_offset(connection, data_file, resume):
+    """Returns (byte offset, rows already loaded) to start ingesting data_file from."""
+    checkpoint = load_checkpoint(connection, data_file) if resume else None
+    if checkpoint is None:
+        return 0, 0
+    print(f"Resuming {data_file} after {checkpoint['rows']} previously loaded rows.")
+    return checkpoint["offset"], checkpoint["rows"]
+
+def load_email_filter(connection, data_file, error_rate=0.01):
+    """Streams the email column once into a Bloom filter sized for the table plus data_file."""
+    cursor = connection.cursor()
+    cursor.execute("SELECT COUNT(*) FROM user_data")
+    existing = cursor.fetchone()[0]
+    cursor.close()
+    capacity = existing + os.path.getsize(data_file) // MIN_CSV_ROW_BYTES + 1
+    emails = BloomFilter(capacity, error_rate)
+    cursor = connection.cursor(buffered=False)
+    cursor.execute("SELECT email FROM user_data")
+    for (email,) in fetch_in_chunks(cursor, 10000):
+        emails.add(normalize_email(email))
+    cursor.close()
+    return emails
+
+def drop_duplicates(cursor, rows, emails, counts):
+    """Returns the (user_id, name, email, age) rows whose email is not in user_data yet.
+
+    Rows whose email misses the Bloom filter are new without asking the
+    server; only filter hits are checked, in one email lookup per call, so
+    rows loaded under any user_id (older loaders, hand-inserted rows) count.
+    Kept rows are added to the filter, so repeats later in the file are
+    caught too. Updates the "inserted", "duplicates", "filter_hits" and
+    "false_positives" counts.
+    """
+    candidates = []
+    batch_emails = set()
+    for _, _, email, _ in rows:
+        key = normalize_email(email)
+        if key in emails and key not in batch_emails:
+            candidates.append(key)
+        batch_emails.add(key)
+        emails.add(key)
+    found = set()
+    if candidates:
+        placeholders = ", ".join(["%s"] * len(candidates))
+        cursor.execute("SELECT LOWER(TRIM(email)) FROM user_data "
+                       f"WHERE LOWER(TRIM(email)) IN ({placeholders})", candidates)
+        found = {email for (email,) in cursor.fetchall()}
+    kept = []
+    seen = set()
+    for row in rows:
+        key = normalize_email(row[2])
+        if key in found or key in seen:
+            continue
+        seen.add(key)
+        kept.append(row)
+    counts["filter_hits"] += len(candidates)
+    counts["false_positives"] += len(candidates) - len(found)
+    counts["duplicates"] += len(rows) - len(kept)
+    counts["inserted"] += len(kept)
+    return kept
+
+def new_dedupe_counts():
+    return {"inserted": 0, "duplicates": 0, "filter_hits": 0, "false_positives": 0}
+
+def report_dedupe(counts):
+    print(f"{counts['inserted']} rows inserted, {counts['duplicates']} duplicates skipped "
+          f"({counts['filter_hits']} Bloom filter hits checked, "
+          f"{counts['false_positives']} false positives).")
+
+def insert_data(connection, data_file, resume=True, dedupe=False):
+    """Inserts data in the database if it does not exist.
+
+    User ids are derived from the email, so re-inserting a row is a no-op, and
+    a checkpoint next to the CSV lets a re-run skip rows already loaded. With
+    dedupe=True a Bloom filter of the existing emails is loaded first and rows
+    already in user_data are skipped client-side instead of being sent as
+    INSERT IGNOREs; only filter hits cost a lookup.
+    """
+    try:
+        offset, loaded = resume_offset(connection, data_file, resume)
+        emails = load_email_filter(connection, data_file) if dedupe else None
+        counts = new_dedupe_counts()
         cursor = connection.cursor()
-        with open(data_file, 'r') as f:
-            reader = csv.reader(f)
-            next(reader)  # Skip header
-            for row in reader:
-                user_id = str(uuid4())
-                name, email, age = row
-                cursor.execute(
-                    "INSERT IGNORE INTO user_data (user_id, name, email, age) VALUES (%s, %s, %s, %s)",
-                    (user_id, name, email, int(age))
-                )
+        user_id = None
+        for (name, email, age), offset in iter_csv_rows(data_file, offset):
+            user_id = user_id_for(email)
+            row = (user_id, name, email, int(age))
+            if emails is None or drop_duplicates(cursor, [row], emails, counts):
+                cursor.execute(INSERT_USER_SQL, row)
+            loaded += 1
         connection.commit()
+        if user_id is not None:
+            save_checkpoint(data_file, offset, loaded, user_id)
         print(f"Data from {data_file} inserted successfully.")
+        if emails is not None:
+            report_dedupe(counts)
         cursor.close()
     except mysql.connector.Error as err:
         print(f"Error inserting data: {err}")
     except FileNotFoundError:
         print(f"Error: {data_file} not found.")
 
+def load_data_infile(cursor, rows):
+    """Pushes rows through LOAD DATA LOCAL INFILE via a temporary CSV file.
+
+    csv.writer quotes with " and doubles embedded quotes; ESCAPED BY ''
+    stops MySQL from also treating backslashes as escapes.
+    """
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', delete=False) as tmp:
+        csv.writer(tmp, lineterminator='\n').writerows(rows)
+    try:
+        cursor.execute(
+            "LOAD DATA LOCAL INFILE %s IGNORE INTO TABLE user_data "
+            "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+            "LINES TERMINATED BY '\\n' (user_id, name, email, age)",
+            (tmp.name,)
+        )
+    finally:
+        os.remove(tmp.name)
+
+def bulk_insert_data(connection, data_file, chunk_size=5000, use_load_data=False, resume=True,
+                     dedupe=False):
+    """Streams the CSV into user_data in chunks, committing after each one.
+
+    Each chunk goes to the server as one multi-row executemany INSERT, or as a
+    LOAD DATA LOCAL INFILE when use_load_data is set (the connection must be
+    opened with allow_local_infile=True). If the server refuses LOAD DATA the
+    load carries on with executemany. Only one chunk is held in memory at a
+    time. A checkpoint is saved after every commit, so with resume=True a
+    re-run only ingests rows appended since the last load. dedupe=True skips
+    rows already in user_data as insert_data does, with one lookup per chunk
+    for the Bloom filter hits. Returns the number of rows read.
+    """
+    total = 0
+    start = time.perf_counter()
+    try:
+        offset, loaded = resume_offset(connection, data_file, resume)
+        emails = load_email_filter(connection, data_file) if dedupe else None
+        counts = new_dedupe_counts()
+        cursor = connection.cursor()
+        for chunk, offset in read_csv_chunks(data_file, chunk_size, offset):
+            rows = [(user_id_for(email), name, email, int(age)) for name, email, age in chunk]
+            last_user_id = rows[-1][0]
+            if emails is not None:
+                rows = drop_duplicates(cursor, rows, emails, counts)
+            if rows and use_load_data:
+                try:
+                    load_data_infile(cursor, rows)
+                except mysql.connector.Error as err:
+                    if err.errno not in LOCAL_INFILE_DISABLED:
+                        raise
+                    print(f"LOAD DATA LOCAL INFILE unavailable ({err}), using executemany.")
+                    use_load_data = False
+            if rows and not use_load_data:
+                cursor.executemany(INSERT_USER_SQL, rows)
+            connection.commit()
+            total += len(chunk)
+            save_checkpoint(data_file, offset, loaded + total, last_user_id)
+            elapsed = time.perf_counter() - start
+            print(f"Loaded {total} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/sec)")
+        cursor.close()
+        print(f"Data from {data_file} bulk inserted successfully.")
+        if emails is not None:
+            report_dedupe(counts)
+    except mysql.connector.Error as err:
+        connection.rollback()
+        print(f"Error bulk inserting data after {total} rows: {err}")
+    except FileNotFoundError:
+        print(f"Error: {data_file} not found.")
+    return total
@@ -0,0 +1,138 @@
+
+import multiprocessing
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from pool import pooled_connection
+from keyset import row_key, scan_pages
+
+# Length of the hex prefix used to cut the UUID key space into ranges.
+KEY_PREFIX_LENGTH = 4
+
+_cancelled = None
+
+
+def key_ranges(shards, prefix_length=KEY_PREFIX_LENGTH):
+    """Splits the user_id key space into `shards` contiguous [low, high) ranges.
+
+    user_id is a hex UUID string, so evenly spaced hex prefixes give evenly
+    sized shards. The first range has no lower bound and the last no upper one.
+    """
+    space = 16 ** prefix_length
+    bounds = [format(space * i // shards, f"0{prefix_length}x") for i in range(1, shards)]
+    bounds = [None] + bounds + [None]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _init_worker(cancelled):
+    global _cancelled
+    _cancelled = cancelled
+
+
+def scan_range(low, high, func=None, batch_size=1000, after=None, chunk_size=None):
+    """Scans one chunk of a key range; returns (func(row) for each row, resume key).
+
+    Reads pages of `batch_size` rows past `after` until `chunk_size` rows
+    (default 10 pages) have been read. The resume key is None once the
+    range is exhausted. Runs inside a worker process, on a connection from
+    that process's own pool; stops early once the scan is cancelled.
+    """
+    chunk_size = chunk_size or batch_size * 10
+    results = []
+    read = 0
+    with pooled_connection() as connection:
+        cursor = connection.cursor(dictionary=True)
+        for page in scan_pages(cursor, batch_size, after, low=low, high=high):
+            results.extend(page if func is None else map(func, page))
+            read += len(page)
+            if _cancelled is not None and _cancelled.is_set():
+                return results, None
+            if read >= chunk_size:
+                return results, row_key(page[-1])
+    return results, None
+
+
+class _Shard:
+    """Progress of one key range: its buffered chunks, running chunk and resume key."""
+
+    def __init__(self, low, high):
+        self.low = low
+        self.high = high
+        self.after = None
+        self.chunks = deque()
+        self.future = None
+        self.finished = False
+
+
+def sharded_scan(func=None, workers=4, shards=None, ordered=True, batch_size=1000,
+                 chunk_size=None):
+    """Scans user_data in parallel key ranges and yields func(row) for every row.
+
+    The table is split into `shards` user_id ranges (default 4 per worker);
+    each range is read chunk by chunk (`chunk_size` rows, default 10 pages)
+    by worker processes with their own pools. With ordered=True results
+    come back in user_id order, otherwise in whatever order chunks finish.
+    `func` must be picklable (a module-level function). At most two ranges
+    per worker are open, each with one chunk running and at most two
+    waiting, so memory is bounded by the chunk size, not the table size.
+    If any worker fails, or the consumer stops early, the scan is cancelled
+    at once: pending chunks are dropped, running ones stop at their next
+    page, and the error is raised.
+    """
+    ranges = deque(key_ranges(shards or workers * 4))
+    context = multiprocessing.get_context()
+    cancelled = context.Event()
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                   initializer=_init_worker, initargs=(cancelled,))
+    active = deque()
+    in_flight = {}
+
+    def cancel_on_error(future):
+        if not future.cancelled() and future.exception() is not None:
+            cancelled.set()
+
+    def schedule():
+        while ranges and len(active) < workers * 2:
+            active.append(_Shard(*ranges.popleft()))
+        for shard in active:
+            if shard.future is None and not shard.finished and len(shard.chunks) < 2:
+                shard.future = executor.submit(scan_range, shard.low, shard.high, func,
+                                               batch_size, shard.after, chunk_size)
+                shard.future.add_done_callback(cancel_on_error)
+                in_flight[shard.future] = shard
+
+    def collect():
+        for future in [future for future in in_flight if future.done()]:
+            shard = in_flight.pop(future)
+            shard.future = None
+            # Raises as soon as any chunk has failed, not when its turn comes.
+            results, shard.after = future.result()
+            shard.finished = shard.after is None
+            shard.chunks.append(results)
+
+    def next_chunk():
+        for shard in active:
+            if shard.chunks:
+                return shard.chunks.popleft()
+            if ordered:
+                return None
+        return None
+
+    try:
+        while True:
+            schedule()
+            collect()
+            for shard in [shard for shard in active if shard.finished and not shard.chunks]:
+                active.remove(shard)
+            chunk = next_chunk()
+            if chunk is not None:
+                yield from chunk
+            elif in_flight:
+                wait(list(in_flight), return_when=FIRST_COMPLETED)
+            else:
+                break
+    finally:
+        cancelled.set()
+        for future in in_flight:
+            future.cancel()
+        executor.shutdown(wait=True, cancel_futures=True)
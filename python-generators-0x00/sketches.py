@@ -0,0 +1,205 @@
+
+import hashlib
+import heapq
+import math
+import random
+from array import array
+
+
+def hash64(value, salt=b""):
+    """Stable 64-bit hash of a str/bytes/int value (unlike hash(), the same in every process)."""
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    elif not isinstance(value, bytes):
+        value = repr(value).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(value, digest_size=8, salt=salt).digest(), "little")
+
+
+class HyperLogLog:
+    """Approximate distinct count in 2**precision bytes.
+
+    The relative standard error is about 1.04 / sqrt(2**precision): 1.6% for
+    the default precision of 12 (4 KiB), 0.8% for 14 (16 KiB).
+    """
+
+    def __init__(self, precision=12):
+        if not 4 <= precision <= 18:
+            raise ValueError("HyperLogLog precision must be between 4 and 18")
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+
+    def push(self, value):
+        hashed = hash64(value)
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """Folds in another sketch of the same precision (e.g. from a parallel shard)."""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLogs of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        size = self.size
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * size and zeros:
+            # Small-range correction: linear counting is more accurate here.
+            return round(size * math.log(size / zeros))
+        return round(estimate)
+
+    def __len__(self):
+        return self.count()
+
+
+class ReservoirSample:
+    """A uniform random sample of `size` items from a stream of unknown length.
+
+    Uses Algorithm L: after the reservoir fills, it draws how many items to
+    skip rather than a random number per item.
+    """
+
+    def __init__(self, size, seed=None):
+        if size < 1:
+            raise ValueError("Reservoir size must be at least 1")
+        self.size = size
+        self.seen = 0
+        self.items = []
+        self._random = random.Random(seed)
+        self._weight = 1.0
+        self._next = size
+
+    def _advance(self):
+        self._weight *= math.exp(math.log(self._random.random() or 1e-300) / self.size)
+        skip = math.floor(math.log(self._random.random() or 1e-300) / math.log1p(-self._weight))
+        self._next += skip + 1
+
+    def push(self, item):
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+            if len(self.items) == self.size:
+                self._advance()
+        elif self.seen == self._next:
+            self.items[self._random.randrange(self.size)] = item
+            self._advance()
+
+    def consume(self, source):
+        for item in source:
+            self.push(item)
+        return self
+
+
+class CountMinSketch:
+    """Approximate frequencies in width * depth counters.
+
+    Estimates never undercount; they overcount by at most epsilon * total
+    with probability 1 - delta, where width = ceil(e / epsilon) and
+    depth = ceil(ln(1 / delta)).
+    """
+
+    def __init__(self, epsilon=0.001, delta=0.01):
+        self.width = int(math.ceil(math.e / epsilon))
+        self.depth = int(math.ceil(math.log(1 / delta)))
+        self.total = 0
+        self._table = [array("Q", bytes(8 * self.width)) for _ in range(self.depth)]
+
+    def _columns(self, item):
+        first = hash64(item)
+        second = hash64(item, salt=b"cms") | 1
+        return [(first + row * second) % self.width for row in range(self.depth)]
+
+    def push(self, item, count=1):
+        self.total += count
+        for row, column in zip(self._table, self._columns(item)):
+            row[column] += count
+
+    def estimate(self, item):
+        return min(row[column] for row, column in zip(self._table, self._columns(item)))
+
+
+class SpaceSaving:
+    """Top-k heavy hitters with at most `capacity` counters (Space-Saving).
+
+    Every item that occurs more than total / capacity times is guaranteed to
+    be tracked, and each reported count overestimates the true count by at
+    most the error stored alongside it.
+    """
+
+    def __init__(self, capacity=100):
+        if capacity < 1:
+            raise ValueError("SpaceSaving capacity must be at least 1")
+        self.capacity = capacity
+        self.total = 0
+        self.counts = {}
+        self.errors = {}
+        self._heap = []
+
+    def push(self, item, count=1):
+        self.total += count
+        counts = self.counts
+        if item in counts:
+            counts[item] += count
+        elif len(counts) < self.capacity:
+            counts[item] = count
+            self.errors[item] = 0
+        else:
+            floor, victim = self._pop_min()
+            del counts[victim]
+            del self.errors[victim]
+            counts[item] = floor + count
+            self.errors[item] = floor
+        heapq.heappush(self._heap, (counts[item], item))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(value, key) for key, value in counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        # Heap entries go stale as counts grow; skip those that no longer match.
+        while True:
+            value, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == value:
+                return value, item
+
+    def top(self, n=10):
+        """Returns up to n (item, count, error) tuples, most frequent first."""
+        ranked = sorted(self.counts.items(), key=lambda pair: pair[1], reverse=True)
+        return [(item, count, self.errors[item]) for item, count in ranked[:n]]
+
+
+class BloomFilter:
+    """Set membership with no false negatives and about `error_rate` false positives.
+
+    Sized for `capacity` items: about 9.6 bits per item at a 1% error rate.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError("BloomFilter needs capacity >= 1 and 0 < error_rate < 1")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        first = hash64(item)
+        second = hash64(item, salt=b"bloom") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        bits = self._bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
@@ -0,0 +1,194 @@
+
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from array import array
+
+from pool import pooled_connection
+from keyset import scan_pages
+
+MAGIC = b"UDSNAP01"
+STRING_COLUMNS = ("user_id", "name", "email")
+MAX_KEY_BYTES = 64
+# magic, row count, max key length, max key, then the start offset of the age
+# column and of each string column's offsets and data sections.
+HEADER = struct.Struct(f"<8sQH{MAX_KEY_BYTES}s" + "Q" * (1 + 2 * len(STRING_COLUMNS)))
+ALIGNMENT = 8
+
+
+def _pad(f):
+    f.write(b"\0" * (-f.tell() % ALIGNMENT))
+
+
+def export_snapshot(path, batch_size=10000):
+    """Exports user_data into a compact column file at `path` and returns the row count.
+
+    Layout: a fixed header, the age column as int32, then for each string
+    column an array of uint64 end offsets followed by the UTF-8 bytes. Rows
+    are streamed by key into per-column temp files, so memory stays flat; the
+    finished file replaces `path` atomically.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    section_names = ["age"] + [f"{column}.{kind}" for column in STRING_COLUMNS
+                               for kind in ("offsets", "data")]
+    parts = {name: tempfile.TemporaryFile(dir=directory) for name in section_names}
+    ends = dict.fromkeys(STRING_COLUMNS, 0)
+    row_count = 0
+    max_key = ""
+    try:
+        with pooled_connection() as connection:
+            for rows in scan_pages(connection.cursor(), batch_size):
+                parts["age"].write(array("i", (row[3] for row in rows)).tobytes())
+                for index, column in enumerate(STRING_COLUMNS):
+                    encoded = [row[index].encode("utf-8") for row in rows]
+                    offsets = array("Q")
+                    for value in encoded:
+                        ends[column] += len(value)
+                        offsets.append(ends[column])
+                    parts[f"{column}.offsets"].write(offsets.tobytes())
+                    parts[f"{column}.data"].write(b"".join(encoded))
+                row_count += len(rows)
+                max_key = rows[-1][0]
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".snapshot")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(b"\0" * HEADER.size)
+                starts = []
+                for name in parts:
+                    _pad(out)
+                    starts.append(out.tell())
+                    parts[name].seek(0)
+                    shutil.copyfileobj(parts[name], out, 1 << 20)
+                key = max_key.encode("utf-8")
+                out.seek(0)
+                out.write(HEADER.pack(MAGIC, row_count, len(key), key, *starts))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    finally:
+        for part in parts.values():
+            part.close()
+    return row_count
+
+
+class Snapshot:
+    """A read-only, memory-mapped view of an exported user_data snapshot.
+
+    Columns are exposed as memoryviews into the mapping, so slicing them does
+    not copy; strings are only decoded when a row is materialized.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        self._views = [view]
+        magic, self.row_count, key_length, key, age_start, *starts = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a user_data snapshot")
+        self.max_key = key[:key_length].decode("utf-8")
+        n = self.row_count
+        self.age = self._view(view, age_start, 4 * n, "i")
+        self._offsets = {}
+        self._data = {}
+        for index, column in enumerate(STRING_COLUMNS):
+            offsets_start, data_start = starts[2 * index], starts[2 * index + 1]
+            offsets = self._view(view, offsets_start, 8 * n, "Q")
+            self._offsets[column] = offsets
+            self._data[column] = self._view(view, data_start, offsets[n - 1] if n else 0)
+
+    def _view(self, view, start, length, fmt=None):
+        section = view[start:start + length]
+        self._views.append(section)
+        if fmt is not None:
+            section = section.cast(fmt)
+            self._views.append(section)
+        return section
+
+    def raw(self, column, index):
+        """Zero-copy bytes of one string cell; release it before closing the snapshot."""
+        offsets = self._offsets[column]
+        start = offsets[index - 1] if index else 0
+        return self._data[column][start:offsets[index]]
+
+    def value(self, column, index):
+        if column == "age":
+            return self.age[index]
+        return str(self.raw(column, index), "utf-8")
+
+    def rows(self, start=0, stop=None):
+        """Yields rows as dicts, like stream_users, for the index range [start, stop)."""
+        stop = self.row_count if stop is None else min(stop, self.row_count)
+        for index in range(start, stop):
+            yield {
+                "user_id": self.value("user_id", index),
+                "name": self.value("name", index),
+                "email": self.value("email", index),
+                "age": self.age[index],
+            }
+
+    def close(self):
+        """Releases the column views and unmaps the file."""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+def table_fingerprint():
+    """Returns (row count, max user_id) of user_data, used to detect stale snapshots."""
+    with pooled_connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT COUNT(*), MAX(user_id) FROM user_data")
+        count, max_key = cursor.fetchone()
+        cursor.close()
+    return count, max_key or ""
+
+
+def snapshot_is_fresh(path):
+    """True when the snapshot at `path` exists and matches the table's row count and max key."""
+    if not os.path.exists(path):
+        return False
+    try:
+        with Snapshot(path) as snapshot:
+            current = (snapshot.row_count, snapshot.max_key)
+    except (OSError, ValueError, struct.error):
+        return False
+    return current == table_fingerprint()
+
+
+def ensure_snapshot(path, batch_size=10000):
+    """Re-exports the snapshot if it is missing or stale; returns True if it was rebuilt.
+
+    This is the only call that queries the database; passes that read the
+    snapshot afterwards do not.
+    """
+    if snapshot_is_fresh(path):
+        return False
+    export_snapshot(path, batch_size)
+    return True
+
+
+def stream_users_from_snapshot(path):
+    """Generates user rows from a snapshot file without touching the database."""
+    with Snapshot(path) as snapshot:
+        yield from snapshot.rows()
+
+
+def stream_user_ages_from_snapshot(path):
+    """Generates ages straight from the snapshot's int32 column."""
+    with Snapshot(path) as snapshot:
+        yield from snapshot.age
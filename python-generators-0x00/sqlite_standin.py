@@ -0,0 +1,98 @@
+
+import sqlite3
+
+import mysql.connector
+
+
+def _translate(sql):
+    """Rewrites the MySQL dialect used in this package into SQLite's."""
+    return sql.replace("%s", "?").replace("INSERT IGNORE", "INSERT OR IGNORE")
+
+
+class StandinCursor:
+    """The subset of a mysql.connector cursor the generators use, over sqlite3."""
+
+    def __init__(self, connection, dictionary=False):
+        self._cursor = connection.cursor()
+        self.dictionary = dictionary
+        self.arraysize = 1
+
+    def _shape(self, row):
+        if row is None or not self.dictionary:
+            return row
+        return dict(zip(self.column_names, row))
+
+    def execute(self, sql, params=()):
+        try:
+            self._cursor.execute(_translate(sql), tuple(params or ()))
+        except sqlite3.Error as err:
+            raise mysql.connector.Error(msg=str(err)) from err
+
+    def executemany(self, sql, seq_params):
+        try:
+            self._cursor.executemany(_translate(sql), seq_params)
+        except sqlite3.Error as err:
+            raise mysql.connector.Error(msg=str(err)) from err
+
+    @property
+    def column_names(self):
+        return tuple(column[0] for column in self._cursor.description or ())
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        return self._shape(self._cursor.fetchone())
+
+    def fetchmany(self, size=None):
+        rows = self._cursor.fetchmany(size or self.arraysize)
+        return [self._shape(row) for row in rows] if self.dictionary else rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        return [self._shape(row) for row in rows] if self.dictionary else rows
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield self._shape(row)
+
+    def close(self):
+        self._cursor.close()
+
+
+class StandinConnection:
+    """Lets the MySQL-based generators run against a local SQLite file.
+
+    Only meant for benchmarks and development without a MySQL server;
+    placeholders and INSERT IGNORE are translated, nothing else is.
+    """
+
+    def __init__(self, path):
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+
+    def cursor(self, dictionary=False, buffered=None):
+        return StandinCursor(self._connection, dictionary)
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def ping(self, reconnect=False):
+        try:
+            self._connection.execute("SELECT 1")
+        except sqlite3.Error as err:
+            raise mysql.connector.Error(msg=str(err)) from err
+
+    def consume_results(self):
+        pass
+
+    def close(self):
+        self._connection.close()
+
+
+def connect(path):
+    """Opens a stand-in connection; usable as the pool's connect factory via functools.partial."""
+    return StandinConnection(path)
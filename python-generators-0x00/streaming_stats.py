@@ -0,0 +1,288 @@
+
+import math
+import random
+
+import mysql.connector
+from pool import pooled_connection
+from sketches import HyperLogLog, ReservoirSample, SpaceSaving
+
+# Aggregates MySQL can compute itself, and the SQL for each.
+SQL_AGGREGATES = {
+    "count": "COUNT({column})",
+    "mean": "AVG({column})",
+    "min": "MIN({column})",
+    "max": "MAX({column})",
+}
+
+NUMERIC_COLUMNS = ("age",)
+
+
+class RunningStats:
+    """Count, mean, variance (Welford's algorithm) and exact min/max in O(1) memory."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def push(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Folds in the stats of another stream (e.g. a parallel shard), as if pushed here."""
+        if not other.count:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        """Population variance."""
+        return self._m2 / self.count if self.count else 0.0
+
+    @property
+    def sample_variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.variance)
+
+
+class QuantileSketch:
+    """Approximate quantiles in bounded memory (a KLL-style compactor sketch).
+
+    Items are buffered in levels; when the sketch is full, the lowest full
+    level is sorted and every other item is promoted with double weight. The
+    rank error is roughly 1/k of the stream length; memory is O(k log(n/k)).
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.count = 0
+        self._levels = [[]]
+        self._random = random.Random(seed)
+
+    def _capacity(self, level):
+        depth = len(self._levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def push(self, value):
+        self.count += 1
+        self._levels[0].append(value)
+        if len(self._levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def _compress(self):
+        for level, items in enumerate(self._levels):
+            if len(items) < self._capacity(level):
+                continue
+            if level + 1 == len(self._levels):
+                self._levels.append([])
+            items.sort()
+            offset = self._random.randint(0, 1)
+            self._levels[level + 1].extend(items[offset::2])
+            self._levels[level] = []
+
+    def merge(self, other):
+        """Folds in another sketch (e.g. from a parallel shard), as if its stream were pushed here."""
+        while len(self._levels) < len(other._levels):
+            self._levels.append([])
+        for level, items in enumerate(other._levels):
+            self._levels[level].extend(items)
+        self.count += other.count
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """Returns an approximate q-quantile (0 <= q <= 1), or None when empty."""
+        weighted = sorted(
+            (value, 1 << level)
+            for level, items in enumerate(self._levels)
+            for value in items
+        )
+        if not weighted:
+            return None
+        total = sum(weight for _, weight in weighted)
+        target = q * total
+        seen = 0
+        for value, weight in weighted:
+            seen += weight
+            if seen >= target:
+                return value
+        return weighted[-1][0]
+
+    def __len__(self):
+        return sum(len(items) for items in self._levels)
+
+
+class Histogram:
+    """Fixed-width bins over [low, high) plus underflow/overflow counters."""
+
+    def __init__(self, low, high, bins):
+        if high <= low or bins < 1:
+            raise ValueError("Histogram needs low < high and at least one bin")
+        self.low = low
+        self.high = high
+        self.width = (high - low) / bins
+        self.counts = [0] * bins
+        self.underflow = 0
+        self.overflow = 0
+
+    def push(self, value):
+        if value < self.low:
+            self.underflow += 1
+        elif value >= self.high:
+            self.overflow += 1
+        else:
+            index = min(int((value - self.low) / self.width), len(self.counts) - 1)
+            self.counts[index] += 1
+
+    def merge(self, other):
+        """Adds the counts of a histogram with the same bins."""
+        if (other.low, other.high, len(other.counts)) != (self.low, self.high, len(self.counts)):
+            raise ValueError("Cannot merge histograms with different bins")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        return self
+
+    def edges(self):
+        return [self.low + i * self.width for i in range(len(self.counts) + 1)]
+
+
+class StreamingAggregator:
+    """Feeds one pass over a generator into running stats, a quantile sketch and a histogram."""
+
+    def __init__(self, quantiles=(), histogram=None, sketch_size=200):
+        self.stats = RunningStats()
+        self.quantiles = tuple(quantiles)
+        self.sketch = QuantileSketch(sketch_size) if self.quantiles else None
+        self.histogram = Histogram(*histogram) if histogram else None
+
+    def push(self, value):
+        self.stats.push(value)
+        if self.sketch is not None:
+            self.sketch.push(value)
+        if self.histogram is not None:
+            self.histogram.push(value)
+
+    def consume(self, source, key=None):
+        """Consumes an iterable of values (or of rows, with key extracting the value)."""
+        for item in source:
+            self.push(key(item) if key else item)
+        return self
+
+    def summary(self):
+        stats = self.stats
+        result = {
+            "count": stats.count,
+            "mean": stats.mean if stats.count else None,
+            "variance": stats.variance,
+            "stddev": stats.stddev,
+            "min": stats.min,
+            "max": stats.max,
+        }
+        if self.sketch is not None:
+            result["quantiles"] = {q: self.sketch.quantile(q) for q in self.quantiles}
+        if self.histogram is not None:
+            result["histogram"] = {
+                "edges": self.histogram.edges(),
+                "counts": list(self.histogram.counts),
+                "underflow": self.histogram.underflow,
+                "overflow": self.histogram.overflow,
+            }
+        return result
+
+
+def can_push_down(stats, quantiles=(), histogram=None):
+    """True when every requested statistic can be computed by SQL alone."""
+    return bool(stats) and not quantiles and not histogram and set(stats) <= SQL_AGGREGATES.keys()
+
+
+def pushdown_aggregates(stats=("count", "mean", "min", "max"), column="age"):
+    """Computes simple aggregates of a user_data column in a single SQL query."""
+    if column not in NUMERIC_COLUMNS:
+        raise ValueError(f"Cannot aggregate column {column!r}")
+    stats = tuple(stats)
+    if not stats:
+        raise ValueError("No aggregates requested")
+    select = ", ".join(SQL_AGGREGATES[name].format(column=column) for name in stats)
+    try:
+        with pooled_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {select} FROM user_data")
+            row = cursor.fetchone()
+            cursor.close()
+    except mysql.connector.Error as err:
+        print(f"Error aggregating user_data: {err}")
+        return None
+    result = dict(zip(stats, row))
+    if result.get("mean") is not None:
+        result["mean"] = float(result["mean"])
+    return result
+
+
+def summarize(source, stats=("count", "mean", "min", "max"), quantiles=(),
+              histogram=None, key=None, column="age", sketch_size=200, pushdown=False):
+    """Summarizes a stream of values in one pass, or in SQL when that is enough.
+
+    `source` is a zero-argument callable returning the generator to scan, so it
+    is only invoked when the rows are actually needed. `histogram` is a
+    (low, high, bins) tuple. Only the requested `stats` are returned, plus
+    "quantiles"/"histogram" when asked for.
+
+    pushdown=True declares that `source` yields every value of the user_data
+    `column`, unfiltered; only then are count/mean/min/max computed by one
+    SQL query instead of a scan. A filtered source or a `key` always streams.
+    """
+    if not stats and not quantiles and not histogram:
+        return {}
+    if pushdown and key is None and can_push_down(stats, quantiles, histogram):
+        return pushdown_aggregates(stats, column)
+    aggregator = StreamingAggregator(quantiles, histogram, sketch_size)
+    aggregator.consume(source(), key)
+    summary = aggregator.summary()
+    result = {name: summary[name] for name in stats}
+    for extra in ("quantiles", "histogram"):
+        if extra in summary:
+            result[extra] = summary[extra]
+    return result
+
+
+def profile_users(source, sample_size=100, top=10, precision=12, capacity=1000, seed=None):
+    """Distinct email domains, a random sample of users and the most common names, in one pass.
+
+    `source` is a zero-argument callable returning a generator of user dicts
+    (e.g. ``lambda: stream_users()``). Memory stays bounded whatever the
+    table size: a HyperLogLog for the domains, a reservoir for the sample and
+    Space-Saving counters for the names.
+    """
+    domains = HyperLogLog(precision)
+    sample = ReservoirSample(sample_size, seed)
+    names = SpaceSaving(capacity)
+    for user in source():
+        domains.push(user["email"].rpartition("@")[2].lower())
+        sample.push(user)
+        names.push(user["name"])
+    return {
+        "users": sample.seen,
+        "distinct_domains": domains.count(),
+        "sample": sample.items,
+        "top_names": [(name, count) for name, count, _ in names.top(top)],
+    }
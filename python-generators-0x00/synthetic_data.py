@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+"""Generates realistic synthetic user_data rows in the shape of user_data.csv.
+
+    python3 synthetic_data.py synthetic_users.csv 1000000 --seed 7
+"""
+import argparse
+import csv
+import random
+import time
+
+FIRST_NAMES = [
+    "Johnnie", "Myrtle", "Flora", "Dan", "Glenda", "Cary", "Clint", "Jennifer",
+    "Herman", "Christy", "Marcus", "Alicia", "Tyrone", "Leah", "Omar", "Priya",
+    "Wei", "Sofia", "Mateo", "Amara", "Elena", "Kwame", "Hana", "Lucas",
+    "Olivia", "Noah", "Emma", "Liam", "Ava", "Ethan", "Mia", "James",
+    "Isabella", "Benjamin", "Charlotte", "Henry", "Amelia", "Samuel", "Harper", "Daniel",
+]
+LAST_NAMES = [
+    "Mayer", "Waters", "Bahringer", "Klocko", "Howe", "Lebsack", "Ortiz", "Bartell",
+    "Reynolds", "Funk", "Schimmel", "Roob", "Okafor", "Nguyen", "Garcia", "Patel",
+    "Kim", "Rossi", "Silva", "Mensah", "Ivanova", "Tanaka", "Smith", "Johnson",
+    "Williams", "Brown", "Jones", "Miller", "Davis", "Wilson", "Anderson", "Thomas",
+]
+DOMAINS = [
+    ("gmail.com", 40), ("yahoo.com", 20), ("hotmail.com", 15), ("outlook.com", 10),
+    ("icloud.com", 5), ("proton.me", 3), ("example.org", 4), ("alx.africa", 3),
+]
+EMAIL_FORMATS = [
+    "{first}.{last}{n}", "{first}_{last}", "{first}{n}", "{last}.{first}", "{first}.{last}",
+]
+
+
+def generate_users(count, seed=0):
+    """Yields `count` (name, email, age) tuples; emails are unique within a run."""
+    rng = random.Random(seed)
+    domains = [domain for domain, _ in DOMAINS]
+    weights = [weight for _, weight in DOMAINS]
+    for index in range(count):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        local = rng.choice(EMAIL_FORMATS).format(first=first, last=last, n=rng.randint(1, 99))
+        email = f"{local}.{index:x}@{rng.choices(domains, weights)[0]}"
+        age = min(120, max(1, int(rng.gauss(42, 20))))
+        yield f"{first} {last}", email, age
+
+
+def write_csv(path, count, seed=0, progress_every=1000000):
+    """Streams `count` synthetic users into a CSV with the user_data.csv header."""
+    start = time.perf_counter()
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(["name", "email", "age"])
+        for written, row in enumerate(generate_users(count, seed), 1):
+            writer.writerow(row)
+            if progress_every and written % progress_every == 0:
+                elapsed = time.perf_counter() - start
+                print(f"Generated {written} rows ({written / elapsed:,.0f} rows/sec)")
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_csv(args.path, args.rows, args.seed)
+    print(f"Wrote {args.rows} rows to {args.path}")
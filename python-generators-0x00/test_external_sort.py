@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for external_sort.py, checked against sorted() on the same rows.
+"""
+import os
+import random
+import tempfile
+import unittest
+from collections import namedtuple
+from unittest import mock
+
+import external_sort as module
+from external_sort import ColumnKey, external_sort
+
+User = namedtuple("User", "user_id name email age")
+
+
+def users(n, seed=0):
+    """
+    Returns n user tuples with many repeated ages and names, so keys collide.
+    """
+    rng = random.Random(seed)
+    return [(f"id-{i:05d}", rng.choice("ABCDE"), f"u{i}@example.com", rng.randint(18, 30))
+            for i in range(n)]
+
+
+def by_age(row):
+    """
+    A picklable key function, usable by the worker processes.
+    """
+    return row[3]
+
+
+class TestExternalSort(unittest.TestCase):
+    """
+    Spilled and merged runs give exactly the rows sorted() would, in the same order.
+    """
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def sort(self, rows, key, **kwargs):
+        kwargs.setdefault("tmpdir", self.directory.name)
+        kwargs.setdefault("workers", 0)
+        return list(external_sort(iter(rows), key, **kwargs))
+
+    def test_small_input_is_sorted_in_memory(self):
+        """
+        Input shorter than one run never creates a spill directory.
+        """
+        rows = users(50)
+        self.assertEqual(self.sort(rows, "age", run_size=100), sorted(rows, key=by_age))
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_many_runs_with_duplicate_keys_are_stable(self):
+        """
+        A tiny run size forces many spilled runs; equal keys keep their input order.
+        """
+        rows = users(1000)
+        self.assertEqual(self.sort(rows, "age", run_size=37), sorted(rows, key=by_age))
+
+    def test_reverse_and_composite_key(self):
+        """
+        reverse=True and multi-column keys match sorted(), ties still in input order.
+        """
+        rows = users(500, seed=1)
+        expected = sorted(rows, key=lambda row: (row[3], row[1]), reverse=True)
+        self.assertEqual(self.sort(rows, ("age", "name"), reverse=True, run_size=20), expected)
+
+    def test_merge_passes(self):
+        """
+        More runs than max_fan_in are merged in passes with the same result.
+        """
+        rows = users(600, seed=2)
+        self.assertEqual(self.sort(rows, by_age, run_size=10, max_fan_in=4), sorted(rows, key=by_age))
+
+    def test_blocks_span_run_files(self):
+        """
+        Runs longer than one pickled block read back whole.
+        """
+        rows = users(300, seed=3)
+        with mock.patch.object(module, "BLOCK_ROWS", 7):
+            self.assertEqual(self.sort(rows, by_age, run_size=50, max_fan_in=2),
+                             sorted(rows, key=by_age))
+
+    def test_worker_processes(self):
+        """
+        Runs sorted and merged in a process pool give the same order.
+        """
+        rows = users(2000, seed=4)
+        self.assertEqual(self.sort(rows, "age", run_size=150, workers=2, max_fan_in=4),
+                         sorted(rows, key=by_age))
+
+    def test_spill_files_are_removed(self):
+        """
+        The temp directory is gone after a full read and after the consumer stops early.
+        """
+        rows = users(400, seed=5)
+        self.sort(rows, "age", run_size=30)
+        stream = external_sort(iter(rows), "age", run_size=30, workers=0, tmpdir=self.directory.name)
+        next(stream)
+        self.assertEqual(len(os.listdir(self.directory.name)), 1)
+        stream.close()
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+
+class TestColumnKey(unittest.TestCase):
+    """
+    Column keys read the same columns from every row shape.
+    """
+    def test_row_shapes(self):
+        """
+        Tuples, named rows and dicts give the same key.
+        """
+        values = ("id-1", "Ann", "ann@example.com", 30)
+        key = ColumnKey(("age", "name"))
+        for row in (values, User(*values), dict(zip(User._fields, values))):
+            self.assertEqual(key(row), (30, "Ann"))
+        self.assertEqual(ColumnKey("age")(values), 30)
+
+    def test_unknown_column(self):
+        """
+        Unknown or missing columns are rejected.
+        """
+        for columns in ("password", ()):
+            with self.assertRaises(ValueError):
+                ColumnKey(columns)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Tests for the filter expressions and their SQL pushdown in filters.py.
+"""
+import unittest
+from collections import namedtuple
+
+from filters import And, Field, Or, Predicate, Where, column_value, compile_where
+
+User = namedtuple("User", "user_id name email age")
+
+ROWS = [
+    {"user_id": "a", "name": "Ann", "email": "ann@example.com", "age": 30},
+    {"user_id": "b", "name": "Bob", "email": "bob@test.org", "age": 41},
+    {"user_id": "c", "name": "Cy", "email": "cy@example.com", "age": 19},
+]
+
+
+def is_example(row):
+    """
+    A test no SQL translation exists for.
+    """
+    return column_value(row, "email").endswith("@example.com")
+
+
+class TestColumnValue(unittest.TestCase):
+    """
+    Columns are read from every row shape the generators produce.
+    """
+    def test_row_shapes(self):
+        """
+        Dicts by key, named rows by attribute, plain tuples by column position.
+        """
+        values = ("a", "Ann", "ann@example.com", 30)
+        for row in (dict(zip(User._fields, values)), User(*values), values):
+            self.assertEqual(column_value(row, "email"), "ann@example.com")
+            self.assertEqual(column_value(row, "age"), 30)
+
+    def test_unknown_column(self):
+        """
+        Field() refuses columns outside FILTER_COLUMNS.
+        """
+        with self.assertRaises(ValueError):
+            Field("password")
+
+    def test_predicate_is_abstract(self):
+        """
+        Predicate itself cannot be instantiated.
+        """
+        with self.assertRaises(TypeError):
+            Predicate()
+
+
+class TestToSql(unittest.TestCase):
+    """
+    Predicates translate to parameterized SQL that agrees with matches().
+    """
+    def test_comparisons(self):
+        """
+        Comparisons, IN and BETWEEN become placeholders with their values as params.
+        """
+        self.assertEqual((Field("age") >= 25).to_sql(), ("age >= %s", [25]))
+        self.assertEqual(Field("name").isin(["Ann", "Bob"]).to_sql(),
+                         ("name IN (%s, %s)", ["Ann", "Bob"]))
+        self.assertEqual(Field("age").between(20, 40).to_sql(), ("age BETWEEN %s AND %s", [20, 40]))
+
+    def test_empty_isin_matches_nothing(self):
+        """
+        isin([]) is the always-false 1 = 0, not invalid IN ().
+        """
+        predicate = Field("age").isin([])
+        self.assertEqual(predicate.to_sql(), ("1 = 0", []))
+        self.assertFalse(any(predicate.matches(row) for row in ROWS))
+
+    def test_matches(self):
+        """
+        Python evaluation gives the rows the SQL would select.
+        """
+        predicate = (Field("age") > 20) & (Field("name") != "Bob") | Field("user_id").isin(["c"])
+        self.assertEqual([row["user_id"] for row in ROWS if predicate.matches(row)], ["a", "c"])
+        self.assertEqual(predicate.to_sql(),
+                         ("((age > %s) AND (name != %s)) OR (user_id IN (%s))", [20, "Bob", "c"]))
+
+    def test_nested_operators_are_flattened(self):
+        """
+        a & b & c is one And of three terms, a | b | c one Or.
+        """
+        a, b, c = Field("age") > 1, Field("age") > 2, Field("age") > 3
+        self.assertEqual(len((a & b & c).predicates), 3)
+        self.assertEqual(len((a | b | c).predicates), 3)
+        self.assertIsInstance(a & b, And)
+        self.assertIsInstance(a | b, Or)
+
+
+class TestCompileWhere(unittest.TestCase):
+    """
+    compile_where() pushes down what SQL can evaluate and leaves the rest to Python.
+    """
+    def test_no_filter(self):
+        """
+        No predicate means no SQL and no residual.
+        """
+        self.assertEqual(compile_where(None), ("", [], None))
+
+    def test_fully_pushed_down(self):
+        """
+        A predicate with only SQL terms has no residual.
+        """
+        sql, params, residual = compile_where((Field("age") > 25) & (Field("name") == "Ann"))
+        self.assertEqual((sql, params, residual), ("(age > %s) AND (name = %s)", [25, "Ann"], None))
+
+    def test_top_level_and_is_split(self):
+        """
+        SQL terms of a top-level AND are pushed down; only the Python-only term is residual.
+        """
+        where = (Field("age") > 25) & Where(is_example) & (Field("age") < 40)
+        sql, params, residual = compile_where(where)
+        self.assertEqual((sql, params), ("(age > %s) AND (age < %s)", [25, 40]))
+        self.assertIsInstance(residual, Where)
+        pushed = [row for row in ROWS if 25 < row["age"] < 40]
+        self.assertEqual([row for row in pushed if residual.matches(row)],
+                         [row for row in ROWS if where.matches(row)])
+
+    def test_several_residual_terms_are_anded(self):
+        """
+        More than one Python-only term is returned as an And.
+        """
+        where = Where(is_example) & (Field("age") > 18) & Where(lambda row: row["age"] < 25)
+        sql, params, residual = compile_where(where)
+        self.assertEqual((sql, params), ("(age > %s)", [18]))
+        self.assertIsInstance(residual, And)
+        self.assertEqual([row["user_id"] for row in ROWS if residual.matches(row)], ["c"])
+
+    def test_or_with_client_only_branch_is_residual(self):
+        """
+        An OR with any Python-only branch cannot be split, so all of it stays client-side.
+        """
+        where = (Field("age") > 40) | Where(is_example)
+        sql, params, residual = compile_where(where)
+        self.assertEqual((sql, params), ("", []))
+        self.assertIs(residual, where)
+        self.assertEqual([row["user_id"] for row in ROWS if residual.matches(row)], ["a", "b", "c"])
+
+
+if __name__ == "__main__":
+    unittest.main()
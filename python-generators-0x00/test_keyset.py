@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests for the resume tokens and keyset paging in keyset.py.
+"""
+import base64
+import unittest
+
+from keyset import (Page, decode_resume_token, encode_resume_token, next_position,
+                    start_position)
+
+try:
+    import mysql.connector  # noqa: F401
+except ImportError:
+    mysql = None
+
+
+class TestResumeToken(unittest.TestCase):
+    """
+    Tokens round-trip scan positions and reject anything they did not produce.
+    """
+    def test_round_trip(self):
+        """
+        Keyset and offset positions decode to what was encoded.
+        """
+        for position in ({"after": "0b7e4f0a-9d13-5c47-8a0b-6f1c3e528a0b"}, {"offset": 2500},
+                         {"after": "ünïcode key"}):
+            token = encode_resume_token(position)
+            self.assertIsInstance(token, str)
+            self.assertEqual(decode_resume_token(token), position)
+
+    def test_empty_token_is_start_of_table(self):
+        """
+        None and "" both mean "from the beginning".
+        """
+        self.assertEqual(decode_resume_token(None), {})
+        self.assertEqual(decode_resume_token(""), {})
+
+    def test_garbage_is_rejected(self):
+        """
+        Malformed tokens raise ValueError("Invalid resume token ...").
+        """
+        def b64(raw):
+            return base64.urlsafe_b64encode(raw).decode("ascii")
+
+        for token in ("not a token!", "abc", "ünï", b64(b"\xff\xfe"), b64(b"{oops"),
+                      b64(b"[1, 2]"), b64(b'{"page": 3}'), 12345):
+            with self.subTest(token=token):
+                with self.assertRaisesRegex(ValueError, "Invalid resume token"):
+                    decode_resume_token(token)
+
+    def test_mode_mismatch(self):
+        """
+        A keyset token is refused by offset paging and vice versa.
+        """
+        keyset_token = encode_resume_token({"after": "a"})
+        offset_token = encode_resume_token({"offset": 10})
+        self.assertEqual(start_position(keyset_token, keyset=True), {"after": "a"})
+        with self.assertRaises(ValueError):
+            start_position(keyset_token, keyset=False)
+        with self.assertRaises(ValueError):
+            start_position(offset_token, keyset=True)
+
+    def test_next_position(self):
+        """
+        Keyset positions follow the last key; offset positions add the page length.
+        """
+        page = Page([("a", "Ann"), ("b", "Bob")])
+        self.assertEqual(next_position(page, {}, keyset=True), {"after": "b"})
+        self.assertEqual(next_position([{"user_id": "c"}], {}, keyset=True), {"after": "c"})
+        self.assertEqual(next_position(page, {"offset": 10}, keyset=False), {"offset": 12})
+
+
+@unittest.skipIf(mysql is None, "mysql-connector-python is not installed")
+class TestScanPages(unittest.TestCase):
+    """
+    Keyset scans over the SQLite stand-in, resumed from their tokens.
+    """
+    def setUp(self):
+        import sqlite_standin
+        self.connection = sqlite_standin.connect(":memory:")
+        self.cursor = self.connection.cursor()
+        self.cursor.execute("CREATE TABLE user_data (user_id TEXT PRIMARY KEY, name TEXT, "
+                            "email TEXT, age INT)")
+        self.cursor.executemany("INSERT INTO user_data VALUES (%s, %s, %s, %s)",
+                                [(f"id-{i:03d}", f"User {i}", f"u{i}@example.com", 18 + i % 50)
+                                 for i in range(25)])
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_scan_pages(self):
+        """
+        Pages come in key order, within [low, high), and a filter is applied in SQL.
+        """
+        from keyset import scan_pages
+        pages = list(scan_pages(self.cursor, 10))
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual([row[0] for page in pages for row in page],
+                         [f"id-{i:03d}" for i in range(25)])
+        ranged = [row[0] for page in scan_pages(self.cursor, 4, low="id-005", high="id-012")
+                  for row in page]
+        self.assertEqual(ranged, [f"id-{i:03d}" for i in range(5, 12)])
+        filtered = [row[3] for page in scan_pages(self.cursor, 4, sql_filter=("age >= %s", [40]))
+                    for row in page]
+        self.assertEqual(filtered, [40, 41, 42])
+
+    def test_resume_from_token(self):
+        """
+        Resuming keyset or offset paging from a page's token continues right after it.
+        """
+        from keyset import scan_positions
+        for keyset in (True, False):
+            with self.subTest(keyset=keyset):
+                first, position = next(scan_positions(self.cursor, 10, {}, keyset))
+                token = encode_resume_token(position)
+                rest = [row for page, _ in scan_positions(self.cursor, 10,
+                                                          start_position(token, keyset), keyset)
+                        for row in page]
+                self.assertEqual([row[0] for row in first + rest],
+                                 [f"id-{i:03d}" for i in range(25)])
+
+
+if __name__ == "__main__":
+    unittest.main()
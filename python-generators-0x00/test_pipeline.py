@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Tests for pipeline.py stages.
+"""
+import threading
+import time
+import unittest
+
+from pipeline import Pipeline
+
+
+def square(item):
+    """
+    Module-level, so a process pool can run it.
+    """
+    return item * item
+
+
+def is_even(item):
+    return item % 2 == 0
+
+
+class TestWindow(unittest.TestCase):
+    """
+    Sliding windows start at items 0, step, 2 * step, ...
+    """
+    def windows(self, size, step, items=10):
+        return list(Pipeline(range(items)).window(size, step))
+
+    def test_overlapping_windows(self):
+        """
+        step < size yields overlapping windows.
+        """
+        self.assertEqual(self.windows(3, 1, 5), [(0, 1, 2), (1, 2, 3), (2, 3, 4)])
+        self.assertEqual(self.windows(4, 2, 8), [(0, 1, 2, 3), (2, 3, 4, 5), (4, 5, 6, 7)])
+
+    def test_tumbling_windows(self):
+        """
+        step == size yields back-to-back windows.
+        """
+        self.assertEqual(self.windows(2, 2, 5), [(0, 1), (2, 3)])
+
+    def test_step_larger_than_size(self):
+        """
+        step > size skips the items between windows, starting with the first item.
+        """
+        self.assertEqual(self.windows(2, 5), [(0, 1), (5, 6)])
+        self.assertEqual(self.windows(1, 3), [(0,), (3,), (6,), (9,)])
+
+
+class TestStageModes(unittest.TestCase):
+    """
+    Every stage runs inline or off the consumer's thread with the same output.
+    """
+    def test_modes_give_the_same_output(self):
+        """
+        map/filter in every mode and batch/window/sort in thread mode match inline.
+        """
+        def build(pool_mode, stage_mode):
+            return list(Pipeline(range(200))
+                        .map(square, mode=pool_mode, workers=2, chunksize=7)
+                        .filter(is_even, mode=pool_mode, workers=2)
+                        .sort(lambda item: -item, mode=stage_mode, workers=0)
+                        .window(3, 2, mode=stage_mode, queue_size=2)
+                        .batch(4, mode=stage_mode, queue_size=1))
+
+        expected = build("inline", "inline")
+        self.assertEqual(len(expected), 13)
+        self.assertEqual(build("thread", "thread"), expected)
+        self.assertEqual(build("process", "thread"), expected)
+
+    def test_stateful_stages_have_no_process_mode(self):
+        """
+        batch, window and sort refuse mode="process" and unknown modes.
+        """
+        pipeline = Pipeline(range(3))
+        for add in (lambda: pipeline.batch(2, mode="process"),
+                    lambda: pipeline.window(2, mode="process"),
+                    lambda: pipeline.sort("age", mode="process"),
+                    lambda: pipeline.map(square, mode="fiber")):
+            with self.assertRaises(ValueError):
+                add()
+
+    def test_thread_stage_is_bounded(self):
+        """
+        A thread stage reads at most about queue_size items ahead of its consumer.
+        """
+        read = []
+
+        def source():
+            for item in range(1000):
+                read.append(item)
+                yield item
+
+        stream = iter(Pipeline(source).batch(1, mode="thread", queue_size=3))
+        self.assertEqual(next(stream), [0])
+        time.sleep(0.3)
+        self.assertLessEqual(len(read), 6)
+        stream.close()
+
+    def test_errors_and_early_close(self):
+        """
+        An error in a thread stage reaches the consumer, and closing early stops its thread.
+        """
+        def failing():
+            yield 1
+            raise RuntimeError("boom")
+
+        with self.assertRaisesRegex(RuntimeError, "boom"):
+            list(Pipeline(failing).window(1, mode="thread"))
+        before = threading.active_count()
+        stream = iter(Pipeline(range(10 ** 6)).batch(10, mode="thread"))
+        next(stream)
+        stream.close()
+        self.assertEqual(threading.active_count(), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for pool.py with in-memory stand-ins for MySQL connections.
+"""
+import unittest
+from itertools import islice
+
+try:
+    import mysql.connector  # noqa: F401
+except ImportError:
+    mysql = None
+
+
+class FakeCursor:
+    """
+    An unbuffered cursor over `rows` that counts the rows read from the server.
+    """
+    def __init__(self, connection):
+        self.connection = connection
+        self.arraysize = 1
+
+    def execute(self, query, params=()):
+        self.connection.pending = iter(self.connection.rows)
+        self.connection.unread_result = True
+
+    def fetchmany(self, size=None):
+        rows = list(islice(self.connection.pending, size or self.arraysize))
+        self.connection.read += len(rows)
+        if not rows:
+            self.connection.unread_result = False
+        return rows
+
+
+class FakeConnection:
+    """
+    Just enough of a mysql.connector connection for the pool and stream_users.
+    """
+    def __init__(self, rows):
+        self.rows = rows
+        self.read = 0
+        self.pending = iter(())
+        self.unread_result = False
+        self.closed = False
+
+    def cursor(self, **kwargs):
+        return FakeCursor(self)
+
+    def consume_results(self):
+        self.read += sum(1 for _ in self.pending)
+        self.unread_result = False
+
+    def rollback(self):
+        pass
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@unittest.skipIf(mysql is None, "mysql-connector-python is not installed")
+class TestRelease(unittest.TestCase):
+    """
+    Connections are reset on release without reading abandoned results.
+    """
+    def setUp(self):
+        import pool
+        self.pool_module = pool
+        self.rows = [(i, f"User {i}", f"user{i}@example.com", 20 + i % 50) for i in range(1000)]
+        self.connections = []
+
+        def connect():
+            connection = FakeConnection(self.rows)
+            self.connections.append(connection)
+            return connection
+
+        self.pool = pool.configure_pool(size=2, connect=connect)
+
+    def tearDown(self):
+        self.pool_module.configure_pool()
+
+    def test_clean_connection_is_reused(self):
+        """
+        A connection with nothing left to read goes back to the idle list.
+        """
+        with self.pool.connection() as connection:
+            pass
+        with self.pool.connection() as again:
+            self.assertIs(again, connection)
+        self.assertEqual(self.pool.stats()["discarded"], 0)
+
+    def test_early_close_does_not_drain_stream(self):
+        """
+        Closing stream_users early discards the connection instead of reading every row.
+        """
+        stream_users = __import__("0-stream_users").stream_users
+        stream = stream_users(row_format="tuple", arraysize=10)
+        self.assertEqual(len(list(islice(stream, 6))), 6)
+        stream.close()
+        connection, = self.connections
+        self.assertEqual(connection.read, 10)
+        self.assertTrue(connection.closed)
+        self.assertEqual(self.pool.stats()["discarded"], 1)
+        self.assertEqual(self.pool.stats()["open"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
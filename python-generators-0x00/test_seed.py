@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for the CSV reading, checkpoint offsets and deduplication in seed.py.
+"""
+import os
+import tempfile
+import unittest
+
+try:
+    import mysql.connector  # noqa: F401
+except ImportError:
+    mysql = None
+
+CSV = 'name,email,age\n"Ann","ann@example.com","30"\n"Bob","bob@example.com","41"'
+
+
+@unittest.skipIf(mysql is None, "mysql-connector-python is not installed")
+class TestCsvOffsets(unittest.TestCase):
+    """
+    Row offsets let a resumed load start exactly after the last loaded row.
+    """
+    def setUp(self):
+        import seed
+        self.seed = seed
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "users.csv")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, text):
+        with open(self.path, "w", newline="") as f:
+            f.write(text)
+
+    def test_final_line_without_newline_is_counted(self):
+        """
+        The last row's offset is the end of the file even with no trailing newline.
+        """
+        self.write(CSV)
+        rows = list(self.seed.iter_csv_rows(self.path))
+        self.assertEqual([row for row, _ in rows],
+                         [["Ann", "ann@example.com", "30"], ["Bob", "bob@example.com", "41"]])
+        self.assertEqual(rows[-1][1], os.path.getsize(self.path))
+
+    def test_resume_at_end_reads_nothing(self):
+        """
+        Resuming from the last offset yields no rows, with or without a trailing newline.
+        """
+        for text in (CSV, CSV + "\n"):
+            self.write(text)
+            _, end = list(self.seed.read_csv_chunks(self.path, 10))[-1]
+            self.assertEqual(list(self.seed.iter_csv_rows(self.path, end)), [])
+
+    def test_resume_mid_file(self):
+        """
+        Resuming after the first row yields only the rows after it.
+        """
+        self.write(CSV)
+        (_, first_end), _ = self.seed.iter_csv_rows(self.path)
+        rows = [row for row, _ in self.seed.iter_csv_rows(self.path, first_end)]
+        self.assertEqual(rows, [["Bob", "bob@example.com", "41"]])
+
+
+@unittest.skipIf(mysql is None, "mysql-connector-python is not installed")
+class TestDropDuplicates(unittest.TestCase):
+    """
+    Bloom filter hits are confirmed by email against the SQLite stand-in.
+    """
+    def setUp(self):
+        import seed
+        import sqlite_standin
+        self.seed = seed
+        self.connection = sqlite_standin.connect(":memory:")
+        self.cursor = self.connection.cursor()
+        self.cursor.execute("CREATE TABLE user_data (user_id VARCHAR(36) PRIMARY KEY, "
+                            "name VARCHAR(255), email VARCHAR(255), age INT)")
+        # Loaded by an older loader: the user_id is not derived from the email.
+        self.cursor.execute("INSERT INTO user_data VALUES (%s, %s, %s, %s)",
+                            ("0b7e4f0a-0000-4000-8000-000000000001", "Ann", "Ann@Example.com ", 30))
+        self.connection.commit()
+
+    def tearDown(self):
+        self.connection.close()
+
+    def rows(self, *emails):
+        return [(self.seed.user_id_for(email), "Name", email, 40) for email in emails]
+
+    def test_existing_email_with_foreign_user_id_is_dropped(self):
+        """
+        A row whose email is already stored under another user_id is a duplicate.
+        """
+        emails = self.seed.load_email_filter(self.connection, __file__)
+        counts = self.seed.new_dedupe_counts()
+        kept = self.seed.drop_duplicates(self.cursor, self.rows("ann@example.com", "bob@example.com"),
+                                         emails, counts)
+        self.assertEqual([row[2] for row in kept], ["bob@example.com"])
+        self.assertEqual(counts["duplicates"], 1)
+        self.assertEqual(counts["filter_hits"], 1)
+        self.assertEqual(counts["false_positives"], 0)
+
+    def test_repeats_within_and_across_calls_are_dropped(self):
+        """
+        An email repeated in one batch, or in a later batch, is kept only once.
+        """
+        emails = self.seed.load_email_filter(self.connection, __file__)
+        counts = self.seed.new_dedupe_counts()
+        kept = self.seed.drop_duplicates(self.cursor, self.rows("bob@example.com", " BOB@example.com"),
+                                         emails, counts)
+        self.assertEqual(len(kept), 1)
+        self.cursor.executemany(self.seed.INSERT_USER_SQL, kept)
+        kept = self.seed.drop_duplicates(self.cursor, self.rows("bob@example.com"), emails, counts)
+        self.assertEqual(kept, [])
+        self.assertEqual(counts["inserted"], 1)
+        self.assertEqual(counts["duplicates"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Accuracy tests for sketches.py, measured against exact counts.
+"""
+import random
+import unittest
+from collections import Counter
+
+from sketches import BloomFilter, CountMinSketch, HyperLogLog, ReservoirSample, SpaceSaving
+
+
+def zipf_stream(n, distinct, seed=0):
+    """
+    Returns n items drawn from `distinct` values with Zipf-like frequencies.
+    """
+    rng = random.Random(seed)
+    values = [f"name-{i}" for i in range(distinct)]
+    weights = [1 / (rank + 1) for rank in range(distinct)]
+    return rng.choices(values, weights, k=n)
+
+
+class TestHyperLogLog(unittest.TestCase):
+    """
+    HyperLogLog estimates stay within a few standard errors of len(set(...)).
+    """
+    def test_small_cardinality(self):
+        """
+        Below 2.5 * registers, linear counting is within 2% of the exact count.
+        """
+        sketch = HyperLogLog(12)
+        for i in range(1000):
+            sketch.push(f"domain-{i}.example")
+            sketch.push(f"domain-{i}.example")
+        self.assertAlmostEqual(sketch.count(), 1000, delta=20)
+
+    def test_large_cardinality(self):
+        """
+        200k distinct values at precision 12 (std error 1.6%) are within 5%.
+        """
+        sketch = HyperLogLog(12)
+        exact = set()
+        for i in range(200000):
+            value = f"user{i % 150000}@example.com"
+            sketch.push(value)
+            exact.add(value)
+        error = abs(sketch.count() - len(exact)) / len(exact)
+        self.assertLess(error, 0.05)
+
+    def test_merge_matches_single_pass(self):
+        """
+        Merging per-shard sketches gives the same estimate as one sketch.
+        """
+        whole, left, right = HyperLogLog(10), HyperLogLog(10), HyperLogLog(10)
+        for i in range(50000):
+            whole.push(i)
+            (left if i % 2 else right).push(i)
+        self.assertEqual(left.merge(right).count(), whole.count())
+
+
+class TestReservoirSample(unittest.TestCase):
+    """
+    Every item is kept with probability size / n.
+    """
+    def test_inclusion_is_uniform(self):
+        """
+        Over 20000 runs each of 20 items is sampled 25% of the time, within 1.5 points.
+        """
+        hits = Counter()
+        trials = 20000
+        rng = random.Random(1)
+        for _ in range(trials):
+            sample = ReservoirSample(5, seed=rng.random()).consume(range(20))
+            hits.update(sample.items)
+        for item in range(20):
+            self.assertAlmostEqual(hits[item] / trials, 5 / 20, delta=0.015)
+
+    def test_short_stream_is_kept_whole(self):
+        """
+        A stream shorter than the reservoir is returned as is.
+        """
+        sample = ReservoirSample(10, seed=0).consume(range(4))
+        self.assertEqual(sample.items, [0, 1, 2, 3])
+        self.assertEqual(sample.seen, 4)
+
+
+class TestCountMinSketch(unittest.TestCase):
+    """
+    Count-Min never undercounts and overcounts by at most epsilon * total.
+    """
+    def test_error_bound(self):
+        """
+        Every estimate over a Zipf stream is within [exact, exact + epsilon * n].
+        """
+        stream = zipf_stream(100000, 5000)
+        exact = Counter(stream)
+        sketch = CountMinSketch(epsilon=0.001, delta=0.01)
+        for item in stream:
+            sketch.push(item)
+        bound = 0.001 * len(stream)
+        for item, count in exact.items():
+            estimate = sketch.estimate(item)
+            self.assertGreaterEqual(estimate, count)
+            self.assertLessEqual(estimate - count, bound)
+
+
+class TestSpaceSaving(unittest.TestCase):
+    """
+    Space-Saving finds the exact top-k of a skewed stream with few counters.
+    """
+    def test_top_k_matches_exact(self):
+        """
+        With 200 counters over 5000 distinct names, the top 10 match Counter.most_common.
+        """
+        stream = zipf_stream(100000, 5000)
+        exact = Counter(stream)
+        sketch = SpaceSaving(200)
+        for item in stream:
+            sketch.push(item)
+        top = sketch.top(10)
+        self.assertEqual([item for item, _, _ in top],
+                         [item for item, _ in exact.most_common(10)])
+        for item, count, error in top:
+            self.assertGreaterEqual(count, exact[item])
+            self.assertLessEqual(count - error, exact[item])
+
+    def test_bounded_memory(self):
+        """
+        No more than `capacity` counters are kept.
+        """
+        sketch = SpaceSaving(50)
+        for i in range(10000):
+            sketch.push(i)
+        self.assertEqual(len(sketch.counts), 50)
+        self.assertEqual(sketch.total, 10000)
+
+
+class TestBloomFilter(unittest.TestCase):
+    """
+    A Bloom filter never misses an added item and rarely reports others.
+    """
+    def test_false_positive_rate(self):
+        """
+        At capacity, the false positive rate stays below 1.5x the 1% target.
+        """
+        bloom = BloomFilter(50000, error_rate=0.01)
+        for i in range(50000):
+            bloom.add(f"user{i}@example.com")
+        self.assertTrue(all(f"user{i}@example.com" in bloom for i in range(50000)))
+        false_positives = sum(f"other{i}@example.com" in bloom for i in range(50000))
+        self.assertLess(false_positives / 50000, 0.015)
+
+
+if __name__ == "__main__":
+    unittest.main()
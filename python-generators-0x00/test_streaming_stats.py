@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Accuracy tests for the one-pass aggregators in streaming_stats.py.
+"""
+import random
+import statistics
+import unittest
+from bisect import bisect_left, bisect_right
+
+try:
+    import mysql.connector  # noqa: F401
+except ImportError:
+    mysql = None
+
+
+def ages(n, seed=0):
+    """
+    Returns n ages drawn from a skewed distribution.
+    """
+    rng = random.Random(seed)
+    return [min(130, int(rng.expovariate(1 / 35))) for _ in range(n)]
+
+
+@unittest.skipIf(mysql is None, "mysql-connector-python is not installed")
+class TestRunningStats(unittest.TestCase):
+    """
+    Welford's running stats match the statistics module.
+    """
+    def setUp(self):
+        from streaming_stats import RunningStats
+        self.RunningStats = RunningStats
+
+    def stats_of(self, values):
+        stats = self.RunningStats()
+        for value in values:
+            stats.push(value)
+        return stats
+
+    def test_matches_statistics(self):
+        """
+        Mean, population and sample variance and min/max agree with the exact values.
+        """
+        values = [value + 0.25 for value in ages(10000)]
+        stats = self.stats_of(values)
+        self.assertEqual(stats.count, len(values))
+        self.assertAlmostEqual(stats.mean, statistics.fmean(values), places=9)
+        self.assertAlmostEqual(stats.variance, statistics.pvariance(values), places=6)
+        self.assertAlmostEqual(stats.sample_variance, statistics.variance(values), places=6)
+        self.assertEqual((stats.min, stats.max), (min(values), max(values)))
+
+    def test_large_offset_is_stable(self):
+        """
+        A large common offset does not swamp the variance.
+        """
+        values = [1e9 + value for value in (4, 7, 13, 16)]
+        self.assertAlmostEqual(self.stats_of(values).variance, 22.5)
+
+    def test_merge_matches_single_pass(self):
+        """
+        Merging per-shard stats gives the single-pass results, and empty stats merge as no-ops.
+        """
+        values = ages(5000)
+        whole = self.stats_of(values)
+        merged = self.stats_of(values[:1234]).merge(self.stats_of(values[1234:]))
+        merged.merge(self.RunningStats())
+        self.assertEqual(merged.count, whole.count)
+        self.assertAlmostEqual(merged.mean, whole.mean, places=9)
+        self.assertAlmostEqual(merged.variance, whole.variance, places=6)
+        self.assertEqual((merged.min, merged.max), (whole.min, whole.max))
+        self.assertEqual(self.RunningStats().merge(whole).max, whole.max)
+
+
+@unittest.skipIf(mysql is None, "mysql-connector-python is not installed")
+class TestQuantileSketch(unittest.TestCase):
+    """
+    Sketch quantiles are within the rank error bound of the exact quantiles.
+    """
+    def setUp(self):
+        from streaming_stats import QuantileSketch
+        self.QuantileSketch = QuantileSketch
+
+    def assert_rank_error(self, sketch, values, bound):
+        ordered = sorted(values)
+        for q in (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99):
+            estimate = sketch.quantile(q)
+            # Ties make a value cover a range of ranks; use the closest one.
+            low = bisect_left(ordered, estimate) / len(ordered)
+            high = bisect_right(ordered, estimate) / len(ordered)
+            error = max(0, low - q, q - high)
+            self.assertLessEqual(error, bound, f"q={q}")
+
+    def test_rank_error_bound(self):
+        """
+        With k=200 over 100k values every quantile is within 2% in rank, in bounded memory.
+        """
+        rng = random.Random(3)
+        values = [rng.random() for _ in range(100000)]
+        sketch = self.QuantileSketch(200, seed=1)
+        for value in values:
+            sketch.push(value)
+        self.assertEqual(sketch.count, len(values))
+        self.assertLess(len(sketch), 2000)
+        self.assert_rank_error(sketch, values, 0.02)
+
+    def test_merge(self):
+        """
+        Merged shard sketches keep the same rank error bound.
+        """
+        values = ages(60000, seed=2)
+        shards = [self.QuantileSketch(200, seed=shard) for shard in range(3)]
+        for index, value in enumerate(values):
+            shards[index % 3].push(value)
+        merged = shards[0].merge(shards[1]).merge(shards[2])
+        self.assertEqual(merged.count, len(values))
+        self.assert_rank_error(merged, values, 0.02)
+
+    def test_empty(self):
+        """
+        An empty sketch has no quantiles.
+        """
+        self.assertIsNone(self.QuantileSketch().quantile(0.5))
+
+
+@unittest.skipIf(mysql is None, "mysql-connector-python is not installed")
+class TestHistogram(unittest.TestCase):
+    """
+    Fixed-width bins count exactly, with under- and overflow.
+    """
+    def setUp(self):
+        from streaming_stats import Histogram
+        self.Histogram = Histogram
+
+    def test_bins(self):
+        """
+        Values land in [low + i * width, low + (i + 1) * width); out of range values are counted apart.
+        """
+        histogram = self.Histogram(0, 100, 10)
+        for value in (-1, 0, 9.99, 10, 55, 99.9, 100, 250):
+            histogram.push(value)
+        self.assertEqual(histogram.counts, [2, 1, 0, 0, 0, 1, 0, 0, 0, 1])
+        self.assertEqual((histogram.underflow, histogram.overflow), (1, 2))
+        self.assertEqual(histogram.edges()[:3], [0, 10, 20])
+
+    def test_merge(self):
+        """
+        Merging adds counts; histograms with different bins are refused.
+        """
+        left, right = self.Histogram(0, 130, 13), self.Histogram(0, 130, 13)
+        values = ages(1000)
+        for index, value in enumerate(values):
+            (left if index % 2 else right).push(value)
+        whole = self.Histogram(0, 130, 13)
+        for value in values:
+            whole.push(value)
+        left.merge(right)
+        self.assertEqual(left.counts, whole.counts)
+        self.assertEqual(left.overflow, whole.overflow)
+        with self.assertRaises(ValueError):
+            left.merge(self.Histogram(0, 100, 13))
+
+    def test_invalid_bins(self):
+        """
+        An empty range or no bins is rejected.
+        """
+        with self.assertRaises(ValueError):
+            self.Histogram(10, 10, 5)
+        with self.assertRaises(ValueError):
+            self.Histogram(0, 10, 0)
+
+
+@unittest.skipIf(mysql is None, "mysql-connector-python is not installed")
+class TestSummarize(unittest.TestCase):
+    """
+    summarize() consumes the source unless pushdown is requested.
+    """
+    def test_streams_source_without_pushdown(self):
+        """
+        SQL-able stats over a filtered source are computed from the source itself.
+        """
+        from streaming_stats import summarize
+        values = [age for age in ages(1000) if age > 40]
+        result = summarize(lambda: iter(values), ("count", "mean", "min", "max"))
+        self.assertEqual(result["count"], len(values))
+        self.assertAlmostEqual(result["mean"], statistics.fmean(values))
+        self.assertEqual(result["min"], min(values))
+
+    def test_nothing_requested(self):
+        """
+        An empty request returns {} without reading the source.
+        """
+        from streaming_stats import summarize
+        self.assertEqual(summarize(lambda: self.fail("source read"), ()), {})
+
+
+if __name__ == "__main__":
+    unittest.main()